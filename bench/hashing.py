@@ -0,0 +1,112 @@
+#!/usr/bin/python
+
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the original ``DtfChange.hash()`` read loop with
+:func:`dtf.digest.compute_digest()` on files of several sizes. Run from the
+root of the repository: ::
+
+   python bench/hashing.py --sizes 10M 1G 10G --block-size 1048576
+
+Files are written to ``--dir`` (default: the system temporary directory) and
+removed afterwards; make sure it has room for the largest size. With
+``--cold``, the page cache for each file is dropped before every run.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dtf import digest
+
+UNITS = { 'K': 2**10, 'M': 2**20, 'G': 2**30 }
+
+def parse_size(value):
+    if value[-1].upper() in UNITS:
+        return int(value[:-1]) * UNITS[value[-1].upper()]
+    else:
+        return int(value)
+
+def original_loop(path, algorithm):
+    h = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(128*h.block_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def compute_digest(path, algorithm):
+    return digest.compute_digest(path, algorithm)
+
+def make_file(directory, size):
+    fd, path = tempfile.mkstemp(dir=directory, prefix='dtf-bench-')
+    block = os.urandom(2**20)
+    with os.fdopen(fd, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+    return path
+
+def drop_cache(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def timed(func, path, algorithm, repeat, cold):
+    best = None
+    for i in range(repeat):
+        if cold:
+            drop_cache(path)
+        start = time.time()
+        result = func(path, algorithm)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser('benchmark dtf file hashing')
+    parser.add_argument('--sizes', nargs='+', default=['10M', '1G', '10G'])
+    parser.add_argument('--algorithm', default='md5')
+    parser.add_argument('--block-size', type=int, default=digest.BLOCK_SIZE, dest='block_size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cold', action='store_true', default=False)
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    digest.BLOCK_SIZE = args.block_size
+
+    print('{0:>8} {1:>14} {2:>14} {3:>8}'.format('size', 'original (s)', 'digest (s)', 'speedup'))
+    for size in args.sizes:
+        path = make_file(args.dir, parse_size(size))
+        try:
+            old, a = timed(original_loop, path, args.algorithm, args.repeat, args.cold)
+            new, b = timed(compute_digest, path, args.algorithm, args.repeat, args.cold)
+            assert a == b
+        finally:
+            os.remove(path)
+
+        print('{0:>8} {1:>14.4f} {2:>14.4f} {3:>7.2f}x'.format(size, old, new, old / new))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/python
+
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the original ``DtfLineLength.check_file()`` loop with
+:func:`dtf.linelength.first_long_line()` on generated files where every
+line passes, so that both read the whole file. Run from the root of the
+repository: ::
+
+   python bench/linelength.py --sizes 10M 100M --max-length 100
+
+With ``--segment-size``, also times
+:func:`dtf.linelength.segmented_long_lines()` with ``--jobs`` worker
+processes.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dtf import linelength
+
+UNITS = { 'K': 2**10, 'M': 2**20, 'G': 2**30 }
+
+def parse_size(value):
+    if value[-1].upper() in UNITS:
+        return int(value[:-1]) * UNITS[value[-1].upper()]
+    else:
+        return int(value)
+
+def check_line(line, max_length):
+    if len(line) > max_length:
+        return True
+    else:
+        return False
+
+def original_loop(path, max_length):
+    with open(path, 'r') as f:
+        ln = 1
+        for line in f.readlines():
+            ln += 1
+            if check_line(line, max_length):
+                return ln
+    return None
+
+def make_file(directory, size, max_length):
+    r = random.Random(0)
+    words = [ 'documentation', 'test', 'the', 'of', 'framework', 'a', 'reference' ]
+
+    fd, path = tempfile.mkstemp(dir=directory, prefix='dtf-bench-')
+    with os.fdopen(fd, 'w') as f:
+        written = 0
+        while written < size:
+            line = ' '.join(r.choice(words) for i in range(r.randint(0, 12)))[:max_length - 1] + '\n'
+            f.write(line)
+            written += len(line)
+    return path
+
+def timed(func, path, max_length, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        result = func(path, max_length)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser('benchmark dtf line length checks')
+    parser.add_argument('--sizes', nargs='+', default=['10M', '100M'])
+    parser.add_argument('--max-length', type=int, default=100, dest='max_length')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--dir', default=None)
+    parser.add_argument('--segment-size', default=None, dest='segment_size')
+    parser.add_argument('--jobs', type=int, default=linelength.JOBS)
+    args = parser.parse_args()
+
+    def segmented(path, max_length):
+        for found in linelength.segmented_long_lines(path, max_length, parse_size(args.segment_size), args.jobs):
+            return found[0]
+        return None
+
+    print('numpy: {0}'.format(linelength.numpy is not None))
+    print('{0:>8} {1:>14} {2:>14} {3:>8} {4:>14}'.format('size', 'original (s)', 'engine (s)', 'speedup', 'segmented (s)'))
+    for size in args.sizes:
+        path = make_file(args.dir, parse_size(size), args.max_length)
+        try:
+            old, a = timed(original_loop, path, args.max_length, args.repeat)
+            new, b = timed(linelength.first_long_line, path, args.max_length, args.repeat)
+            assert a is None and b is None
+
+            if args.segment_size is None:
+                parallel = float('nan')
+            else:
+                parallel, c = timed(segmented, path, args.max_length, args.repeat)
+                assert c is None
+        finally:
+            os.remove(path)
+
+        print('{0:>8} {1:>14.4f} {2:>14.4f} {3:>7.2f}x {4:>14.4f}'.format(size, old, new, old / new, parallel))
+
+if __name__ == '__main__':
+    main()
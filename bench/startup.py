@@ -0,0 +1,92 @@
+#!/usr/bin/python
+
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures the start up time of ``dtf``: the time to run a bare interpreter,
+``dtf --help``, and an import of each command's modules, in fresh
+processes. Run from the root of the repository: ::
+
+   python bench/startup.py --repeat 20
+
+With ``--modules``, also lists the slowest imports of ``dtf --help``, as
+reported by ``python -X importtime``.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+COMMANDS = [
+    ('interpreter', 'pass'),
+    ('import dtf.dtf', 'import dtf.dtf'),
+    ('dtf --help', 'import sys; sys.argv = ["dtf", "--help"]; import dtf.dtf; dtf.dtf.main()'),
+    ('import dtf.core', 'import dtf.core'),
+]
+
+def run(code, extra=[]):
+    with open(os.devnull, 'w') as null:
+        return subprocess.call([sys.executable] + extra + ['-c', code], cwd=ROOT, stdout=null)
+
+def timed(code, repeat):
+    found = []
+    for i in range(repeat):
+        start = time.time()
+        run(code)
+        found.append(time.time() - start)
+    found.sort()
+    return found[0], found[len(found) // 2]
+
+def slowest_imports(code, n):
+    p = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    out, err = p.communicate()
+
+    found = []
+    for line in err.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        found.append((int(parts[1]), parts[2].rstrip()))
+
+    found.sort(reverse=True)
+    return found[:n]
+
+def main():
+    parser = argparse.ArgumentParser('benchmark dtf start up time')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--modules', type=int, default=0,
+                        help='list this many of the slowest imports of "dtf --help".')
+    args = parser.parse_args()
+
+    print('{0:>16} {1:>10} {2:>12}'.format('command', 'best (ms)', 'median (ms)'))
+    for name, code in COMMANDS:
+        best, median = timed(code, args.repeat)
+        print('{0:>16} {1:>10.1f} {2:>12.1f}'.format(name, best * 1000, median * 1000))
+
+    if args.modules > 0:
+        print('')
+        print('{0:>16}  {1}'.format('cumulative (us)', 'module'))
+        for cumulative, module in slowest_imports(COMMANDS[2][1], args.modules):
+            print('{0:>16}  {1}'.format(cumulative, module))
+
+if __name__ == '__main__':
+    main()
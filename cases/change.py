@@ -14,24 +14,46 @@
 #
 # Part of the example distribution of DTF: https://pypi.python.org/pypi/dtf/
 
-import hashlib
 import os
-import yaml
 
 from dtf.cases import DtfCase
-from dtf.dtf import results
+from dtf.digest import file_digest, digest_options, DEFAULT_ALGORITHM
+from dtf.results import results
+from dtf.schema import Optional, string
+
+digest_schema = {
+    'algorithm': Optional(string),
+    'mode': Optional(string),
+    'segment_size': Optional(int),
+}
+
+schema = dict(digest_schema, name=string, type=string, file=string, hash=string)
 
 class DtfChange(DtfCase):
     @staticmethod
-    def hash(file, block_size=2**20):
-        md5 = hashlib.md5()
-        with open(file, 'rb') as f:
-            for chunk in iter(lambda: f.read(128*md5.block_size), b''):
-                md5.update(chunk)
-        return md5.hexdigest()
+    def hash(file, block_size=None, algorithm=DEFAULT_ALGORITHM, segment_size=None):
+        return file_digest(file, algorithm, block_size, segment_size)
+
+    @property
+    def algorithm(self):
+        return digest_options(self.test_spec)[0]
+
+    @property
+    def segment_size(self):
+        return digest_options(self.test_spec)[1]
+
+    def digest(self, path):
+        return self.hash(path, algorithm=self.algorithm, segment_size=self.segment_size)
+
+    def record_options(self):
+        self.test_spec['algorithm'] = self.algorithm
+
+        if self.segment_size is not None:
+            self.test_spec['mode'] = 'tree'
+            self.test_spec['segment_size'] = self.segment_size
 
     def test(self):
-        if self.hash(self.test_spec['file']) == self.test_spec['hash']:
+        if self.digest(self.test_spec['file']) == self.test_spec['hash']:
             r = True
         else:
             r = False
@@ -44,7 +66,10 @@ class DtfChange(DtfCase):
         return r, msg.format(self.test_spec['file'])
 
     def passing(self):
-        self.test_spec['hash'] = self.hash(self.test_spec['file'])
+        self.record_options()
+        self.test_spec['hash'] = self.digest(self.test_spec['file'])
+
+        import yaml
 
         return yaml.dump(self.test_spec, default_flow_style=False)
 
@@ -53,4 +78,5 @@ def main(name, test_spec):
     c.required_keys(['file', 'hash', 'type', 'name'])
     c.run()
 
-    results.extend(name, 'passing', c.passing())
+    if results.passing:
+        results.extend(name, 'passing', c.passing())
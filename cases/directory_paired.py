@@ -15,38 +15,49 @@
 # Part of the example distribution of DTF: https://pypi.python.org/pypi/dtf/
 
 
-from change import DtfChange
-import os
-import yaml
+from change import DtfChange, digest_schema
 
-from dtf.dtf import results
+from dtf.results import results
+from dtf.utils import count_directory
+from dtf.schema import Optional, string
+
+schema = dict(digest_schema, name=string, type=string, directory=string, count=int,
+              file={ 'path': string, 'hash': string },
+              recursive=Optional(bool), extension=Optional(string), pattern=Optional(string))
 
 class DtfDirectoryPaired(DtfChange):
-    def test(self, a=False, b=False):
-        if self.hash(self.test_spec['file']['path']) == self.test_spec['file']['hash']:
-            a = True 
+    def count(self):
+        return count_directory(self.test_spec['directory'],
+                               recursive=self.test_spec.get('recursive', False),
+                               extension=self.test_spec.get('extension'),
+                               pattern=self.test_spec.get('pattern'))
 
-        self.new_directory_count = len(os.listdir(self.test_spec['directory']))
+    def test(self, a=False, b=False):
+        self.new_directory_count = self.count()
 
-        if self.test_spec['count'] == self.new_directory_count: 
+        if self.test_spec['count'] == self.new_directory_count:
             b = True
 
-        if a is True and b is True: 
+        # counting is much cheaper than hashing: only hash if the count passed.
+        if b is True and self.digest(self.test_spec['file']['path']) == self.test_spec['file']['hash']:
+            a = True
+
+        if a is True and b is True:
             msg = 'number of files in "{0}" and the content of "{1}" has not changed.'
-        else: 
-            if a is False and b is False: 
-                msg = 'number of files in "{0}" and the content of "{1}" have changed.'
-            elif a is False: 
-                msg = 'content of "{1}" has changed in {0}. Likely false positive.' 
-            elif b is False:
-                msg = 'number of files in "{0}" changed. Update "{1}" now.' 
-                
+        elif b is False:
+            msg = 'number of files in "{0}" changed. Update "{1}" now.'
+        else:
+            msg = 'content of "{1}" has changed in {0}. Likely false positive.'
+
         return a and b, msg.format(self.test_spec['directory'], self.test_spec['file']['path'])
 
     def passing(self):
-        self.test_spec['file']['hash'] = self.hash(self.test_spec['file']['path'])
+        self.record_options()
+        self.test_spec['file']['hash'] = self.digest(self.test_spec['file']['path'])
         self.test_spec['count'] = self.new_directory_count
 
+        import yaml
+
         return yaml.dump(self.test_spec, default_flow_style=False)
 
 def main(name, test_spec):
@@ -54,4 +65,5 @@ def main(name, test_spec):
     c.required_keys(['directory', 'file', 'count', 'type', 'name'])
     c.run()
 
-    results.extend(name, 'passing', c.passing())
+    if results.passing:
+        results.extend(name, 'passing', c.passing())
@@ -15,6 +15,9 @@
 # Part of the example distribution of DTF: https://pypi.python.org/pypi/dtf/
 
 from dtf.cases import DtfCase
+from dtf.schema import string
+
+schema = { 'name': string, 'type': string, 'value0': object, 'value1': object }
 
 class DtfInequality(DtfCase):
     def test(self):
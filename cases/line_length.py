@@ -15,7 +15,22 @@
 # Part of the example distribution of DTF: https://pypi.python.org/pypi/dtf/
 
 from dtf.cases import DtfCase
+from dtf.err import DtfException
 from dtf.utils import expand_tree
+from dtf.linelength import first_long_line, changed_long_lines, SEGMENT_SIZE
+from dtf.gitdiff import changed_lines
+from dtf.schema import Optional, string
+
+import os.path
+
+schema = {
+    'name': string,
+    'file': string,
+    'max_length': int,
+    'base': Optional(string),
+    'mode': Optional(string),
+    'segment_size': Optional(int),
+}
 
 class DtfLineLength(DtfCase):
     @staticmethod
@@ -25,33 +40,46 @@ class DtfLineLength(DtfCase):
         else:
             return False
 
+    def changed_ranges(self, source_file):
+        # the lines of source_file changed since the spec's base revision.
+        return changed_lines(self.test_spec['base']).get(os.path.normpath(source_file), [])
+
     def check_file(self, source_file):
-        p = True
-
-        with open(source_file, 'r') as f:
-            ln = 1
-            for line in f.readlines():
-                ln += 1
-                if self.check_line(line, self.test_spec['max_length']):
-                    p = False
-                    break
-
-        if p is False:
-            return ln
+        if 'base' in self.test_spec:
+            found = changed_long_lines(source_file, self.test_spec['max_length'], self.changed_ranges(source_file))
+            if found:
+                return found[0][0]
+            else:
+                return None
+
+        if self.test_spec.get('mode') == 'parallel':
+            segment_size = self.test_spec.get('segment_size', SEGMENT_SIZE)
         else:
-            return None
+            segment_size = None
+
+        return first_long_line(source_file, self.test_spec['max_length'], segment_size)
+
+    def base_failure(self, error):
+        # git cannot compare with the base: fails this test, not the run.
+        return False, 'cannot find the lines changed since {0}: {1}'.format(self.test_spec['base'], error.msg)
 
     def test(self):
-        result = self.check_file(self.test_spec['file'])
+        try:
+            result = self.check_file(self.test_spec['file'])
+        except DtfException as e:
+            return self.base_failure(e)
 
         if result is None:
             r = True 
-            msg = '{0} has no lines longer than {1} characters.'
+            if 'base' in self.test_spec:
+                msg = '{0} has no lines changed since %s longer than {1} characters.' % self.test_spec['base']
+            else:
+                msg = '{0} has no lines longer than {1} characters.'
         else:
             r = False
             msg = 'line %s in "{0}" is longer than {1} characters.' % result
 
-        return result, msg.format(self.test_spec['file'], self.test_spec['max_length'])
+        return r, msg.format(self.test_spec['file'], self.test_spec['max_length'])
 
 def main(name, test_spec):
     c = DtfLineLength(name, test_spec)
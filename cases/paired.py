@@ -14,17 +14,21 @@
 #
 # Part of the example distribution of DTF: https://pypi.python.org/pypi/dtf/
 
-from change import DtfChange
-import yaml
+from change import DtfChange, digest_schema
 
-from dtf.dtf import results
+from dtf.results import results
+from dtf.schema import string
+
+hashed = { 'path': string, 'hash': string }
+
+schema = dict(digest_schema, name=string, type=string, file0=hashed, file1=hashed)
 
 class DtfPaired(DtfChange):
     def test(self, a=False, b=False):
-        if self.hash(self.test_spec['file0']['path']) == self.test_spec['file0']['hash']:
+        if self.digest(self.test_spec['file0']['path']) == self.test_spec['file0']['hash']:
             a = True
 
-        if self.hash(self.test_spec['file1']['path']) == self.test_spec['file1']['hash']:
+        if self.digest(self.test_spec['file1']['path']) == self.test_spec['file1']['hash']:
             b = True
 
         if a is True and b is True:
@@ -41,8 +45,11 @@ class DtfPaired(DtfChange):
         return a and b, msg.format(self.test_spec['file0']['path'], self.test_spec['file1']['path'])
 
     def passing(self):
-        self.test_spec['file0']['hash'] = self.hash(self.test_spec['file0']['path'])
-        self.test_spec['file1']['hash'] = self.hash(self.test_spec['file1']['path'])
+        self.record_options()
+        self.test_spec['file0']['hash'] = self.digest(self.test_spec['file0']['path'])
+        self.test_spec['file1']['hash'] = self.digest(self.test_spec['file1']['path'])
+
+        import yaml
 
         return yaml.dump(self.test_spec, default_flow_style=False)
 
@@ -51,4 +58,5 @@ def main(name, test_spec):
     c.required_keys(['file1', 'file0', 'type', 'name'])
     c.run()
 
-    results.extend(name, 'passing', c.passing())
+    if results.passing:
+        results.extend(name, 'passing', c.passing())
@@ -15,23 +15,48 @@
 # Part of the example distribution of DTF: https://pypi.python.org/pypi/dtf/
 
 from dtf.cases import DtfCase
+from dtf.err import DtfException
 from dtf.utils import expand_tree
+from dtf.linelength import scan_files, changed_long_lines
+from dtf.gitdiff import changed_lines
+from dtf.ignore import PathSet
+from dtf.schema import Optional, string
+
+import os.path
 
 from line_length import DtfLineLength
 
+schema = {
+    'name': string,
+    'type': string,
+    'directory': string,
+    'extension': (string, [string]),
+    'max_length': int,
+    'exceptions': (string, [string]),
+    'base': Optional(string),
+    'report': Optional(string),
+    'mode': Optional(string),
+    'segment_size': Optional(int),
+}
+
 class DtfTreeLineLength(DtfLineLength):
     def render_source_tree(self):
         self.msg('crawling "%s" for files.' % self.test_spec['directory'])
 
-        output = [ item for item
-                        in expand_tree(self.test_spec['directory'], self.test_spec['extension'])
-                        if item not in self.test_spec['exceptions'] ]
+        # exceptions may be paths, globs or directories, which prune the walk.
+        exceptions = PathSet(self.test_spec['exceptions'])
+        output = expand_tree(self.test_spec['directory'], self.test_spec['extension'], exceptions)
+
+        if 'base' in self.test_spec:
+            changed = changed_lines(self.test_spec['base'])
+            output = ( item for item in output if os.path.normpath(item) in changed )
 
         return output
 
     def check_directory(self):
         p = True
         failing = None
+        result = None
 
         for source_file in self.render_source_tree():
             result = self.check_file(source_file)
@@ -47,12 +72,58 @@ class DtfTreeLineLength(DtfLineLength):
         # boolean, int-or-None
         return failing, result 
 
+    def check_all(self):
+        # every long line in the tree: [ (<file>, <line>, <length>), ... ]
+        if 'base' not in self.test_spec:
+            return scan_files(self.render_source_tree(), self.test_spec['max_length'])
+
+        found = []
+        for source_file in self.render_source_tree():
+            for ln, length in changed_long_lines(source_file, self.test_spec['max_length'], self.changed_ranges(source_file)):
+                found.append((source_file, ln, length))
+
+        return sorted(found)
+
+    def report(self, found):
+        lines = []
+        for source_file, ln, length in found:
+            if lines and lines[-1][0] == source_file:
+                lines[-1][1].append('{0} ({1})'.format(ln, length))
+            else:
+                lines.append((source_file, ['{0} ({1})'.format(ln, length)]))
+
+        msg = '{0} lines in {1} files in {2} are longer than {3} characters:'.format(len(found), len(lines),
+                                                                                    self.test_spec['directory'],
+                                                                                    self.test_spec['max_length'])
+        for source_file, violations in lines:
+            msg += '\n    {0}: {1}'.format(source_file, ', '.join(violations))
+
+        return msg
+
+    def success(self):
+        if 'base' in self.test_spec:
+            return 'no lines in {0} changed since {1} are longer than {2} characters.'.format(self.test_spec['directory'], self.test_spec['base'], self.test_spec['max_length'])
+        else:
+            return 'all files in {0} have no lines longer than {1} characters.'.format(self.test_spec['directory'], self.test_spec['max_length'])
+
     def test(self):
-        result = self.check_directory()
+        try:
+            if self.test_spec.get('report') == 'all':
+                found = self.check_all()
+            else:
+                result = self.check_directory()
+        except DtfException as e:
+            return self.base_failure(e)
+
+        if self.test_spec.get('report') == 'all':
+            if not found:
+                return True, self.success()
+            else:
+                return False, self.report(found)
 
         if result[0] is None:
             r = True
-            msg = 'all files in {0} have no lines longer than {1} characters.'.format(self.test_spec['directory'], self.test_spec['max_length'])
+            msg = self.success()
         else:
             r = False
             msg = 'line {0} in "{1}" is longer than {2} characters.'.format(result[1], result[0], self.test_spec['max_length'])
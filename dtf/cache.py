@@ -0,0 +1,297 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`cache` provides a small persistent key-value store that :mod:`dtf` uses
+to carry expensive, derived data (e.g. file digests) from one run to the next.
+
+Every entry lives in its own file beneath :data:`CACHE_DIR`, and all writes go
+through a temporary file and an atomic :func:`~python:os.rename()`, so that
+concurrent thread and process runners, or several ``dtf`` invocations sharing
+a cache, never observe partial entries.
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+import errno
+import pickle
+import hashlib
+import tempfile
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get('DTF_CACHE_DIR', '.dtf-cache')
+"""The root directory of all :class:`~cache.DtfCache` namespaces. Override
+with the ``DTF_CACHE_DIR`` environment variable, or :option:`dtf --cachedir`."""
+
+RACY_WINDOW = 2
+"""Files modified less than this many seconds ago may change again without a
+visible change in their modification time. :func:`~cache.cacheable()` refuses
+to cache data derived from these files."""
+
+def mtime_ns(st):
+    """
+    :param st: A :func:`~python:os.stat()` result.
+
+    :returns: The modification time in integer nanoseconds, computed from the
+              floating point value on platforms without ``st_mtime_ns``.
+    """
+    try:
+        return st.st_mtime_ns
+    except AttributeError:
+        return int(st.st_mtime * 1e9)
+
+def ctime_ns(st):
+    "Like :func:`~cache.mtime_ns()` for the inode change time."
+    try:
+        return st.st_ctime_ns
+    except AttributeError:
+        return int(st.st_ctime * 1e9)
+
+def fingerprint(path, st=None):
+    """
+    :param string path: The path of a file.
+
+    :param st: Optional. A :func:`~python:os.stat()` result for ``path``, if
+               the caller already has one.
+
+    :returns: A tuple of the device, inode, size, modification time, and inode
+              change time of ``path``.
+
+    The fingerprint identifies one version of a file's content without
+    reading it. The change time catches tools (e.g. ``cp -p`` or ``touch
+    -d``) that rewrite a file in place and then restore its old modification
+    time.
+    """
+    if st is None:
+        st = os.stat(path)
+
+    return (st.st_dev, st.st_ino, st.st_size, mtime_ns(st), ctime_ns(st))
+
+def cacheable(fp, now=None):
+    """
+    :param tuple fp: A fingerprint from :func:`~cache.fingerprint()`.
+
+    :returns: ``False`` if the file was modified within :data:`RACY_WINDOW`
+              seconds, and ``True`` otherwise.
+    """
+    if now is None:
+        now = time.time()
+
+    return fp[3] < (now - RACY_WINDOW) * 1e9
+
+class DtfCache(object):
+    """
+    :param string namespace: The name of the cache, and of its directory
+                             beneath the cache root.
+
+    :param string path: Optional. The cache root. Defaults to
+                        :data:`CACHE_DIR`, as set when the cache is first
+                        used.
+
+    :param int max_entries: Optional. The number of entries the cache may
+                            hold before :meth:`~cache.DtfCache.evict()`
+                            removes the least recently used entries.
+
+    Keys may be any value with a stable :func:`repr()`, typically tuples of
+    strings and integers. Values may be any picklable object.
+    """
+
+    evict_interval = 256
+    "Check the size of the cache after this many writes."
+
+    touch_interval = 3600
+    """Mark an entry read from disk as recently used only if its modification
+    time is older than this many seconds, rather than on every read."""
+
+    def __init__(self, namespace, path=None, max_entries=10000):
+        self.namespace = namespace
+        "The name of this cache."
+
+        self.root = path
+        "The cache root, or ``None`` to use :data:`CACHE_DIR`."
+
+        self.max_entries = max_entries
+        "The maximum number of entries that the cache retains."
+
+        self.enabled = True
+        "When ``False``, :meth:`get()` always misses and :meth:`set()` does nothing."
+
+        self.memo = {}
+        "Entries read or written by this process."
+
+        self.lock = Lock()
+        "A :class:`python:Lock()` that protects :attr:`memo` and the counters."
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @property
+    def path(self):
+        "The directory that holds this namespace's entries."
+        if self.root is None:
+            return os.path.join(CACHE_DIR, self.namespace)
+        else:
+            return os.path.join(self.root, self.namespace)
+
+    def _entry(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.path, digest[:2], digest[2:])
+
+    def get(self, key, default=None):
+        """
+        :param key: The key of the entry.
+
+        :param default: Optional. Returned when ``key`` is not in the cache.
+
+        Returns the value of ``key``, reading it from disk if this process has
+        not seen it yet. Unreadable or mismatched entries count as misses.
+        Reading an entry refreshes its modification time, which
+        :meth:`~cache.DtfCache.evict()` uses to find the least recently used
+        entries, at most once per :attr:`touch_interval`.
+        """
+        if self.enabled is False:
+            return default
+
+        with self.lock:
+            if key in self.memo:
+                self.hits += 1
+                return self.memo[key]
+
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                modified = os.fstat(f.fileno()).st_mtime
+                stored_key, value = pickle.load(f)
+        except Exception:
+            stored_key = None
+
+        if stored_key == key and modified < time.time() - self.touch_interval:
+            try:
+                os.utime(entry, None)
+            except OSError:
+                # e.g. a read-only cache: the entry is still valid.
+                pass
+
+        with self.lock:
+            if stored_key != key:
+                self.misses += 1
+                return default
+            else:
+                self.hits += 1
+                self.memo[key] = value
+                return value
+
+    def set(self, key, value):
+        """
+        :param key: The key of the entry.
+
+        :param value: A picklable value.
+
+        Writes ``value`` to a temporary file and renames it into place, so
+        readers see either the previous entry or the new one. Failures to
+        write only produce a log message: the cache is never required for
+        correct results.
+        """
+        if self.enabled is False:
+            return
+
+        with self.lock:
+            self.memo[key] = value
+            self.writes += 1
+            check = self.writes % self.evict_interval == 0
+
+        entry = self._entry(key)
+        try:
+            shard = os.path.dirname(entry)
+            if not os.path.isdir(shard):
+                try:
+                    os.makedirs(shard)
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+
+            fd, tmp = tempfile.mkstemp(dir=shard, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((key, value), f, 2)
+            os.rename(tmp, entry)
+        except (IOError, OSError) as e:
+            logger.warning('could not write {0} cache entry: {1}'.format(self.namespace, e))
+            return
+
+        if check:
+            self.evict()
+
+    def entries(self):
+        "Returns a list of two-tuples of the modification time and path of every entry."
+        found = []
+        if not os.path.isdir(self.path):
+            return found
+
+        for shard in os.listdir(self.path):
+            shard = os.path.join(self.path, shard)
+            if not os.path.isdir(shard):
+                continue
+            for name in os.listdir(shard):
+                entry = os.path.join(shard, name)
+                try:
+                    found.append((os.stat(entry).st_mtime, entry))
+                except OSError:
+                    # removed by a concurrent eviction.
+                    continue
+
+        return found
+
+    def evict(self, max_entries=None):
+        """
+        :param int max_entries: Optional. Defaults to :attr:`max_entries`.
+
+        Removes the least recently used entries, until the cache holds 90% of
+        ``max_entries``, and any temporary files abandoned by interrupted
+        writers.
+        """
+        if max_entries is None:
+            max_entries = self.max_entries
+
+        found = self.entries()
+        stale = time.time() - 3600
+        remove = [ e for e in found if e[1].endswith('.tmp') and e[0] < stale ]
+
+        found = [ e for e in found if not e[1].endswith('.tmp') ]
+        if len(found) > max_entries:
+            found.sort()
+            remove.extend(found[:len(found) - int(max_entries * 0.9)])
+
+        for mtime, entry in remove:
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+
+        if remove:
+            logger.info('evicted {0} entries from the {1} cache.'.format(len(remove), self.namespace))
+
+        return len(remove)
+
+    def clear(self):
+        "Removes every entry in the cache, and forgets all memoized entries."
+        with self.lock:
+            self.memo = {}
+
+        self.evict(max_entries=0)
@@ -14,12 +14,11 @@
 
 from __future__ import absolute_import
 
-import yaml
 import logging
 
 logger = logging.getLogger(__name__)
 
-from dtf.dtf import results
+from dtf.results import results
 from dtf.err import DtfException, DtfTestException, DtfNotImplemented, DtfDeprecated
 
 class DtfCase(object):
@@ -66,7 +65,9 @@ class DtfCase(object):
            A list of top level keys that :attr:`test_spec` must have
            to be considered valid by :meth:`validate()`.
 
-        Currently does not implement recursive key checking.
+        Only checks top-level keys. To check nested keys and the types of
+        values, for every test before the run starts, declare a ``schema``
+        in the case module: see :mod:`schema`.
         """
         for key in keys:
             self.keys.append(key)
@@ -105,13 +106,7 @@ class DtfCase(object):
         if test_keys is None:
             test_keys = self.test_spec.keys()
 
-        t = True
-        for key in keys:
-            if key in test_keys:
-                pass
-            else:
-                t = False
-                break
+        t = set(keys).issubset(test_keys)
 
         if t is True:
             msg = '"{0}" is a valid "{1}" test spec.'.format(self.name, 
@@ -151,6 +146,8 @@ class DtfCase(object):
             if valid[0] is False:
                 raise DtfException(valid[1])
 
+        import yaml
+
         logger.info('writing test_spec to path: {0}'.format(path))
         with open(path, 'w') as f:
             f.write(yaml.dump(test_spec, default_flow_style=False))
@@ -225,8 +222,10 @@ class DtfCase(object):
            element returned by :meth:`~cases.DtfCase.test()`.
 
         3. Calls :meth:`~cases.DtfCase.response()` passing the results from
-           :meth:`~cases.DtfCase.test()` :data:`~dtf.VEBOSE` and
-           :data:`~dtf.FATAL` as appropriate.
+           :meth:`~cases.DtfCase.test()`, which reports to
+           :data:`~results.results` according to
+           :attr:`~context.RunContext.verbose` and
+           :attr:`~context.RunContext.fatal`.
         """
         logger.info('running test {0}'.format(self.name))
 
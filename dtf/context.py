@@ -0,0 +1,189 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`context` holds the configuration of a ``dtf`` run in a
+:class:`~context.RunContext` object, rather than in module globals set when
+:mod:`dtf` is imported. Importing any :mod:`dtf` module has no side effects:
+:func:`dtf.main()` builds a context from the command line, and scripts that
+embed :mod:`dtf` may build one directly:
+
+.. code-block:: python
+
+   from dtf.context import RunContext
+   from dtf.dtf import run_many
+
+   RunContext(verbose=True, multi='thread', jobs=4).configure()
+   run_many(['cases/'], ['tests/'], 'thread', 4)
+
+:mod:`context` only imports the standard library modules it needs, and the
+modules it configures only when :meth:`~context.RunContext.configure()`
+runs.
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RunContext(object):
+    """
+    The options of one ``dtf`` run. Keyword arguments set the attributes of
+    the same name; see :doc:`/man/dtf` for the meaning of each option.
+    """
+
+    def __init__(self, **options):
+        self.verbose = False
+        "Report passing tests. See :option:`dtf --verbose`."
+
+        self.fatal = False
+        "Stop at the first failing test. See :option:`dtf --fatal`."
+
+        self.passing = False
+        "Report passing documents for failed tests. See :option:`dtf --passing`."
+
+        self.multi = None
+        """The parallelism model: ``None``, ``thread``, ``process``,
+        ``event`` or ``threadpool``. See :option:`dtf --multi`."""
+
+        self.jobs = 2
+        "The size of the worker pool. See :option:`dtf --jobs`."
+
+        self.timeout = None
+        "The number of seconds after which a test fails. See :option:`dtf --timeout`."
+
+        self.single = False
+        "Run one test, rather than a suite. See :option:`dtf --single`."
+
+        self.yamltest = None
+        "In single mode, the path of the test specification."
+
+        self.casedef = None
+        "In single mode, the path of the case module."
+
+        self.casedirs = ['cases/']
+        "The directories that hold case modules. See :option:`dtf --casedir`."
+
+        self.testdirs = ['tests/']
+        "The directories that hold test specifications. See :option:`dtf --testdir`."
+
+        self.watch = False
+        "Re-run tests when files change. See :option:`dtf --watch`."
+
+        self.changed = None
+        "The paths of changed files, to run only the tests that depend on them."
+
+        self.changed_since = None
+        "A git revision, to add the files changed since then to :attr:`changed`."
+
+        self.cachedir = None
+        "The cache root, or ``None`` for the default. See :option:`dtf --cachedir`."
+
+        self.cache = True
+        "Reuse stored test results. See :option:`dtf --no-cache`."
+
+        self.block_size = None
+        "The number of bytes to read at a time when hashing files, or ``None``."
+
+        self.log_level = logging.WARNING
+        "The level of the log."
+
+        self.logfile = None
+        "The file to write the log to, or ``None`` for standard error."
+
+        for name, value in options.items():
+            if not hasattr(self, name):
+                raise TypeError('{0} is not a dtf option'.format(name))
+            setattr(self, name, value)
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        :param args: The :class:`~python:argparse.Namespace` returned by
+                     :func:`~dtf.interface()`.
+
+        :returns: A :class:`~context.RunContext` with the options in ``args``.
+        """
+        if args.debug is True:
+            log_level = logging.DEBUG
+        elif args.info is True:
+            log_level = logging.INFO
+        else:
+            log_level = logging.WARNING
+
+        context = cls(verbose=args.verbose, fatal=args.fatal, passing=args.passing,
+                      multi=args.multi, jobs=args.jobs, timeout=args.timeout, single=args.single,
+                      yamltest=args.yamltest, casedef=args.casedef, watch=args.watch,
+                      changed=args.changed, changed_since=args.changed_since,
+                      cachedir=args.cachedir, cache=args.cache,
+                      block_size=args.block_size, log_level=log_level,
+                      logfile=args.logfile or None)
+
+        if args.casedir is not None:
+            context.casedirs = args.casedir
+        if args.testdir is not None:
+            context.testdirs = args.testdir
+
+        return context
+
+    def configure(self):
+        """
+        Applies the options that live outside the context: the log, the
+        cache root, the result cache, the hashing block size and the
+        reporting options of :data:`~results.results`. Makes this context
+        :data:`~context.current`.
+        """
+        global current
+
+        if self.logfile is not None:
+            logging.basicConfig(filename=self.logfile, level=self.log_level)
+        else:
+            logging.basicConfig(level=self.log_level)
+        logger.info('configuring logger. level {0}'.format(self.log_level))
+
+        from dtf import cache, digest, resultcache
+        from dtf.results import results
+
+        if self.cachedir is not None:
+            cache.CACHE_DIR = self.cachedir
+
+        resultcache.stored.enabled = self.cache
+
+        if self.block_size is not None:
+            digest.BLOCK_SIZE = self.block_size
+
+        results.verbose = self.verbose
+        results.fatal = self.fatal
+        results.passing = self.passing
+
+        current = self
+        return self
+
+    def changed_files(self):
+        """
+        :returns: The paths in :attr:`changed`, and the files changed since
+                  :attr:`changed_since`, or ``None`` to run every test.
+
+        Raises :exc:`~err.DtfException` if ``git`` cannot list the changed
+        files.
+        """
+        if self.changed_since is None:
+            return self.changed
+
+        from dtf.gitdiff import changed_since
+        return changed_since(self.changed_since) + (self.changed or [])
+
+current = RunContext()
+"The :class:`~context.RunContext` of the current run. Defaults to the default options."
@@ -22,20 +22,29 @@ classes as a starting point.
 
 from __future__ import absolute_import
 
-# third-party modules
-import yaml
-
 # standard library
 import sys
 import os
+import copy
 from importlib import import_module
 import logging
 
+try:
+    from importlib import reload
+except ImportError:
+    # python 2 provides reload() as a builtin.
+    pass
+
 logger = logging.getLogger(__name__)
 
 # internal modules
-from dtf.utils import get_name, expand_tree, get_module_path
+from dtf.utils import get_name, expand_tree, get_module_path, spec_inputs
 from dtf.err import DtfDiscoveryException
+from dtf.digest import hashed_paths, prefetch
+from dtf.snapshot import Snapshot, activate
+from dtf.specs import iter_spec, load_all
+from dtf.registry import CaseRegistry, discover
+from dtf import digest
 
 class CaseDefinition(object):
     """
@@ -101,6 +110,40 @@ class CaseDefinition(object):
         self.modules.update({get_name(f): path})
         logger.debug('added file {0} to '.format(f))
 
+    def reload(self, name):
+        """
+        :param string name: The name of a case module.
+
+        :returns: A list of the names of the modules reloaded.
+
+        Re-imports a case module that changed after :mod:`dtf` loaded it, or
+        loads a new module added with :meth:`~core.CaseDefinition._add()`,
+        and then reloads the loaded case modules that use objects from it
+        (e.g. sub-classes of its case class), so that they pick up the change.
+        """
+        if name not in sys.modules:
+            self._load_case(name, self.modules.get(name))
+            return [name]
+
+        module = reload(sys.modules[name])
+        self.cases[name] = module.main
+        reloaded = [name]
+        logger.debug('reloaded case named "{0}"'.format(name))
+
+        for case in list(self.cases):
+            if case in reloaded or case not in sys.modules:
+                continue
+
+            dependent = sys.modules[case]
+            for value in list(vars(dependent).values()):
+                if getattr(value, '__module__', None) == name:
+                    self.cases[case] = reload(dependent).main
+                    reloaded.append(case)
+                    logger.debug('reloaded case named "{0}", which depends on "{1}"'.format(case, name))
+                    break
+
+        return reloaded
+
     def load(self):
         "Not implemented in the base class. Raises a :exc:`NotImplemented` exception"
         raise NotImplemented('CaseDefinition is a base class. Instantiate one of its sub-classes or implement a load().')
@@ -170,15 +213,25 @@ class MultiCaseDefinition(CaseDefinition):
     the current :mod:`dtf` process. Use in conjunction with
     :attr:`~core.CaseDefinition.case_paths` to load a directory of
     case modules.
+
+    :attr:`~core.CaseDefinition.cases` is a :class:`~registry.CaseRegistry`,
+    which imports each case module the first time a test uses it, and also
+    provides the cases of installed packages.
     """
 
+    def __init__(self, case_paths=[]):
+        super(MultiCaseDefinition, self).__init__(case_paths)
+        self.cases = CaseRegistry(self)
+
     def add(self):
         """
         Adds all modules, recursively, in
         :attr:`~core.CaseDefinition.case_paths` and calls
         :meth:`~core.CaseDefinition._add()` for each module. No
         arguments required when
-        :attr:`~core.CaseDefinition.case_paths` is set.
+        :attr:`~core.CaseDefinition.case_paths` is set. Uses
+        :func:`~registry.discover()` to avoid walking unchanged case
+        directories.
         """
 
         logger.debug('adding cases to a multi-case definition object')
@@ -186,7 +239,7 @@ class MultiCaseDefinition(CaseDefinition):
             module_path = get_module_path(path)
 
             logger.debug('adding cases in: {0}'.format(path))
-            for f in expand_tree(path, 'py'):
+            for f in discover(path):
                 self._add(f, module_path)
             logger.debug('added cases in: {0}'.format(path))
         logger.debug('added all cases to a multi-case definition object.')
@@ -194,14 +247,21 @@ class MultiCaseDefinition(CaseDefinition):
     def load(self):
         """
         If :attr:`~core.CaseDefinition.modules` is empty, calls
-        :meth:`~core.MultiCaseDefinition.add()` before iterating
-        through :attr:`~core.CaseDefinition.modules` and loading all
-        relevant modules.
+        :meth:`~core.MultiCaseDefinition.add()`. Does not import any case
+        module: :attr:`~core.CaseDefinition.cases` imports each module when
+        a test first needs it. Call :meth:`~core.MultiCaseDefinition.load_all()`
+        to import every case module at once.
         """
 
         if not self.modules:
             self.add()
 
+        logger.debug('registered {0} cases in a multi-case definition object.'.format(len(self.modules)))
+
+    def load_all(self):
+        "Imports every case module in :attr:`~core.CaseDefinition.modules`."
+        self.load()
+
         logger.debug('loading cases into multi-case definition object.')
         for case in self.modules:
             self._load_case(case, self.modules[case])
@@ -264,14 +324,78 @@ class TestRunner(object):
         :attr:`:attr:`~core.TestRunner.queue` attributes of the
         :class:`~core.TestRunner` object.
         """
-        with open(spec) as f:
-            test = get_name(spec)
-            specs = yaml.load_all(f)
+        for job in self._merge(spec, iter_spec(spec)):
+            continue
+
+    def _merge(self, spec, docs, keep=True):
+        """
+        :param spec: The filename of a test spec.
+
+        :param iterable docs: The documents in ``spec``.
 
-            for spec in specs:
-                self.test_specs.update( { test: spec } )
-                self._add_to_queue(test, spec['type'])
-                logger.debug('added {0} to TestRunner test queue'.format(test))
+        :param bool keep: Optional. If ``False``, yield the items without
+                          adding them to the runner.
+
+        A generator that adds each test in ``docs`` to
+        :attr:`~core.TestRunner.test_specs` and
+        :attr:`~core.TestRunner.queue`, as ``docs`` produces it, and yields
+        the new item of :attr:`~core.TestRunner.queue`. Each document is a
+        test, named by :meth:`~utils.get_name()`.
+        """
+        for index, doc in enumerate(docs):
+            test = get_name(spec, index)
+            if keep is False:
+                yield (doc['type'], test, doc)
+                continue
+
+            self.test_specs.update( { test: doc } )
+            self._add_to_queue(test, doc['type'])
+            logger.debug('added {0} to TestRunner test queue'.format(test))
+            yield self.queue[-1]
+
+    def reload(self, spec):
+        """
+        :param spec: The filename of a test spec.
+
+        :returns: The names of the tests that ``spec`` defined before, and
+                  defines now.
+
+        Removes the tests loaded from ``spec`` from
+        :attr:`~core.TestRunner.test_specs` and
+        :attr:`~core.TestRunner.queue`, and loads ``spec`` again if it still
+        exists.
+        """
+        test = get_name(spec)
+        names = set(n for n in self.test_specs if n == test or n.startswith(test + ':'))
+
+        for name in names:
+            self.test_specs.pop(name, None)
+        self.queue = [ job for job in self.queue if job[1] not in names ]
+
+        if os.path.exists(spec):
+            names.update(job[1] for job in self._merge(spec, iter_spec(spec)))
+            logger.debug('reloaded tests in {0}'.format(spec))
+        else:
+            logger.debug('removed tests in {0}'.format(spec))
+
+        return sorted(names)
+
+    def select(self, names):
+        """
+        :param iterable names: The names of tests.
+
+        :returns: A copy of the :class:`~core.TestRunner` object whose
+                  :attr:`~core.TestRunner.test_specs` and
+                  :attr:`~core.TestRunner.queue` only contain the tests in
+                  ``names``.
+        """
+        names = set(names)
+
+        t = copy.copy(self)
+        t.test_specs = dict((k, v) for k, v in self.test_specs.items() if k in names)
+        t.queue = [ job for job in self.queue if job[1] in names ]
+
+        return t
 
     def _load_tree(self, path):
         """
@@ -321,6 +445,55 @@ class TestRunner(object):
         """
         self.queue.append((func, name, self.test_specs[name]))
 
+    def prefetch(self, jobs=2):
+        """
+        :param int jobs: Optional. The number of threads used to hash files.
+
+        A pre-run stage that collects every file that the tests in
+        :attr:`~core.TestRunner.queue` will hash, and hashes them all at
+        once, in disk order, with :meth:`~digest.prefetch()`. Cases then
+        find these digests without reading the files again.
+        """
+        paths = []
+        for job in self.queue:
+            paths.extend(hashed_paths(job[2]))
+
+        logger.info('found {0} files to hash in {1} queued tests.'.format(len(paths), len(self.queue)))
+        return prefetch(paths, jobs)
+
+    def snapshot(self):
+        """
+        :returns: The active :class:`~snapshot.Snapshot`.
+
+        A pre-run stage that walks every file and directory that the tests in
+        :attr:`~core.TestRunner.queue` name as inputs (see
+        :meth:`~utils.spec_inputs()`) once, refreshing the snapshot saved by
+        the previous run, and activates the snapshot for the rest of the
+        run. Digests recorded in the previous snapshot for unchanged files
+        become available to cases without reading the files.
+        """
+        roots = []
+        for job in self.queue:
+            roots.extend(spec_inputs(job[2]))
+
+        s = Snapshot(roots).refresh()
+        digest.table.update(s.digests)
+        activate(s)
+
+        return s
+
+    def save_snapshot(self, s):
+        """
+        :param s: The :class:`~snapshot.Snapshot` returned by
+                  :meth:`~core.TestRunner.snapshot()`.
+
+        Adds the digests computed during the run to the snapshot, and saves
+        it for the next run.
+        """
+        s.digests.update(digest.table)
+        s.save()
+        logger.info('saved {0}'.format(s))
+
     def load(self):
         """
         :raises: :exc:`NotImplementedError`.
@@ -404,23 +577,67 @@ class MultiTestRunner(TestRunner):
     intended as a base class for test runner implementations that run more than
     one test at a time.
     """
+    parse_jobs = 1
+    """The number of processes that parse test specifications. See
+    :func:`~specs.load_all()`."""
+
+    def iter_load(self, path=None, keep=True):
+        """
+        :param string path: Optional. A relative or absolute path that
+                            contains test specifications. Defaults to every
+                            path in :attr:`~core.TestRunner.test_paths`.
+
+        :param bool keep: Optional. If ``False``, only yield the tests, and
+                          do not add them to the runner.
+
+        A generator that discovers and parses the ``.yaml`` test files within
+        ``path``, using :attr:`~core.MultiTestRunner.parse_jobs` processes,
+        adds each to :attr:`~core.TestRunner.test_specs` and
+        :attr:`~core.TestRunner.queue` in a deterministic order, and yields
+        each new item of the queue. Pass the generator to the ``run()``
+        method of a :class:`~multi.PoolTestRunner` to start running tests
+        before the last specification is parsed. With ``keep`` set to
+        ``False``, the runner holds no test after it runs, so the documents
+        of a large bundle (see :func:`~specs.iter_spec()`) are never all in
+        memory at once.
+        """
+        if path is None:
+            paths = self.test_paths
+        else:
+            paths = [ path ]
+
+        found = ( spec for p in paths for spec in expand_tree(p) )
+        for spec, docs in load_all(found, self.parse_jobs):
+            for job in self._merge(spec, docs, keep):
+                yield job
+
     def load(self, path=None):
         """
         :param string path: A relative or absolute path that contains test
                             specifications.
 
         This :meth:`~core.MultiTestRunner.load()` loads, (by way of
-        :meth:`~core.TestRunner._load_tree()`, all ``.yaml`` test files within
-        the specified ``path``.
+        :meth:`~core.MultiTestRunner.iter_load()`, all ``.yaml`` test files
+        within the specified ``path``.
         """
         logger.info('loading test specification in {0} tree'.format(path))
-        if path is None:
-            for p in self.test_paths:
-                self._load_tree(p)
-        else:
-            self._load_tree(path)
+        for job in self.iter_load(path):
+            continue
         logger.info('loaded all test specification in {0} tree'.format(path))
 
+    def load_specs(self, specs):
+        """
+        :param list specs: The filenames of test specifications.
+
+        Loads only the test specifications in ``specs`` (e.g. those returned
+        by :meth:`~index.DependencyIndex.dependents()`,) instead of every
+        specification in :attr:`~core.TestRunner.test_paths`.
+        """
+        for spec, docs in load_all(specs, self.parse_jobs):
+            for job in self._merge(spec, docs):
+                continue
+        logger.info('loaded {0} selected test specifications'.format(len(specs)))
+
 class SuiteTestRunner(MultiTestRunner):
     """
     :class:`~core.SuiteTestRunner()` is a sub-class of
@@ -0,0 +1,411 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`digest` computes content digests of files for change-detection cases,
+and remembers them between runs in a :class:`~cache.DtfCache`, so that
+hashing a file that has not changed since the last run costs a single
+:func:`~python:os.stat()`.
+
+Before a suite runs, :func:`~digest.prefetch()` hashes every file that the
+queued tests will hash in one pass, ordered for sequential disk access, and
+records the results in :data:`table` for the cases to look up.
+
+All functions take an ``algorithm`` name: any algorithm that
+:func:`python:hashlib.new()` supports (e.g. ``md5``, ``sha256``, or
+``blake2b``), or, when the optional :mod:`xxhash` package is installed, one of
+the much faster non-cryptographic ``xxh64``, ``xxh3_64`` and ``xxh128``
+digests.
+
+Files larger than :data:`LARGE_FILE` are read into a single reused buffer,
+rather than into a new string for every block, with hints to the kernel to
+read ahead and to release the pages once hashed, so that hashing a very large
+file does not evict the rest of the page cache.
+
+Specs with ``mode: tree`` use a tree digest instead:
+:func:`~digest.tree_digest()` splits the file into segments of
+``segment_size`` bytes, hashes the segments concurrently, and hashes the
+segment digests into a root digest, so that hashing one very large file uses
+every core.
+"""
+
+from __future__ import absolute_import
+
+import io
+import os
+import hashlib
+import logging
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+from dtf import snapshot
+from dtf.err import DtfException, DtfMissingOptionalDependency
+
+DEFAULT_ALGORITHM = 'md5'
+"The digest algorithm of specs that do not specify an ``algorithm``."
+
+XXHASH_ALGORITHMS = ('xxh32', 'xxh64', 'xxh3_64', 'xxh3_128', 'xxh128')
+"Algorithms provided by the optional :mod:`xxhash` package."
+
+BLOCK_SIZE = 2**20
+"The number of bytes read at a time. Set with :option:`dtf --block-size`."
+
+LARGE_FILE = 2**24
+"Files of at least this many bytes use :func:`~digest.hash_large_file()`."
+
+SEGMENT_SIZE = 2**26
+"The default segment size of tree digests."
+
+SEGMENT_THREADS = cpu_count()
+"The number of threads that hash the segments of a tree digest."
+
+digests = DtfCache('digest')
+"The :class:`~cache.DtfCache` that holds file digests."
+
+table = {}
+"""A dictionary, populated by :func:`~digest.prefetch()`, in the form of ``{
+(<path>, <algorithm>, <segment_size>): (<fingerprint>, <digest>) }``, where
+``segment_size`` is ``None`` for ordinary digests."""
+
+def new_hash(algorithm=DEFAULT_ALGORITHM):
+    """
+    :param string algorithm: Optional. The name of a digest algorithm.
+
+    :returns: A new hash object for ``algorithm``.
+
+    Raises :exc:`~err.DtfMissingOptionalDependency` if ``algorithm`` requires
+    :mod:`xxhash` and it is not installed, and :exc:`~err.DtfException` for
+    unknown algorithms.
+    """
+    if algorithm in XXHASH_ALGORITHMS:
+        try:
+            import xxhash
+        except ImportError:
+            raise DtfMissingOptionalDependency('xxhash')
+
+        if not hasattr(xxhash, algorithm):
+            raise DtfException('the installed xxhash does not support "{0}".'.format(algorithm))
+
+        return getattr(xxhash, algorithm)()
+
+    try:
+        return hashlib.new(algorithm)
+    except (ValueError, TypeError):
+        raise DtfException('"{0}" is not a supported digest algorithm.'.format(algorithm))
+
+def _advise(fd, offset, length, advice):
+    # posix_fadvise is only a hint: ignore platforms and file systems without it.
+    if advice is None:
+        return
+
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except (AttributeError, OSError):
+        pass
+
+def hash_large_file(f, h, block_size):
+    """
+    :param file f: A file object opened in unbuffered binary mode.
+
+    :param h: A hash object, as returned by :func:`~digest.new_hash()`.
+
+    :param int block_size: The size of the read buffer.
+
+    Reads ``f`` with :meth:`~python:io.RawIOBase.readinto()` into one
+    preallocated buffer, and passes slices of a :class:`python:memoryview`
+    over that buffer to ``h``, so that no block is ever copied. Advises the
+    kernel that reads are sequential, and that it may drop the pages of each
+    block after hashing it.
+    """
+    _advise(f.fileno(), 0, 0, getattr(os, 'POSIX_FADV_SEQUENTIAL', None))
+    dontneed = getattr(os, 'POSIX_FADV_DONTNEED', None)
+
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    offset = 0
+
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            break
+
+        h.update(view[:n])
+        _advise(f.fileno(), offset, n, dontneed)
+        offset += n
+
+    return h
+
+def compute_digest(path, algorithm=DEFAULT_ALGORITHM, block_size=None):
+    """
+    :param string path: The path of a file.
+
+    :param string algorithm: Optional. The name of a digest algorithm.
+
+    :param int block_size: Optional. The number of bytes to read at a
+                           time. Defaults to :data:`BLOCK_SIZE`.
+
+    :returns: The hexadecimal digest of the content of ``path``.
+
+    Reads and hashes the entire file, without consulting the cache.
+    """
+    if block_size is None:
+        block_size = BLOCK_SIZE
+
+    h = new_hash(algorithm)
+    with io.open(path, 'rb', buffering=0) as f:
+        if os.fstat(f.fileno()).st_size >= LARGE_FILE:
+            hash_large_file(f, h, block_size)
+        else:
+            for chunk in iter(lambda: f.read(block_size), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+def _hash_segment(job):
+    fd, algorithm, offset, length, block_size = job
+
+    h = new_hash(algorithm)
+    start = offset
+    end = offset + length
+    while offset < end:
+        data = os.pread(fd, min(block_size, end - offset), offset)
+        if not data:
+            break
+        h.update(data)
+        offset += len(data)
+
+    _advise(fd, start, length, getattr(os, 'POSIX_FADV_DONTNEED', None))
+    return h.digest()
+
+def tree_digest(path, algorithm=DEFAULT_ALGORITHM, segment_size=None, block_size=None, threads=None):
+    """
+    :param string path: The path of a file.
+
+    :param string algorithm: Optional. The name of a digest algorithm.
+
+    :param int segment_size: Optional. The size of each segment. Defaults to
+                             :data:`SEGMENT_SIZE`.
+
+    :param int block_size: Optional. The number of bytes to read at a time.
+                           Defaults to :data:`BLOCK_SIZE`.
+
+    :param int threads: Optional. The number of threads that hash
+                        segments. Defaults to :data:`SEGMENT_THREADS`.
+
+    :returns: The hexadecimal root digest of ``path``.
+
+    Splits the file into segments of ``segment_size`` bytes, and hashes each
+    segment with :func:`python:os.pread()` on a shared descriptor, in a pool
+    of threads. The root digest is the digest of the concatenated binary
+    digests of all segments, in order. An empty file has one empty segment.
+
+    Tree digests differ from ordinary digests of the same file, and from
+    tree digests with a different ``segment_size``.
+    """
+    if segment_size is None:
+        segment_size = SEGMENT_SIZE
+    if block_size is None:
+        block_size = BLOCK_SIZE
+    if threads is None:
+        threads = SEGMENT_THREADS
+
+    if not hasattr(os, 'pread'):
+        raise DtfException('tree digests require os.pread(), which this platform does not provide.')
+
+    if segment_size < 1:
+        raise DtfException('"{0}" is not a valid segment size.'.format(segment_size))
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        jobs = [ (fd, algorithm, offset, segment_size, block_size)
+                 for offset in range(0, max(size, 1), segment_size) ]
+
+        if threads > 1 and len(jobs) > 1:
+            pool = ThreadPool(min(threads, len(jobs)))
+            try:
+                leaves = pool.map(_hash_segment, jobs, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            leaves = [ _hash_segment(job) for job in jobs ]
+    finally:
+        os.close(fd)
+
+    logger.debug('hashed {0} segments of {1}'.format(len(leaves), path))
+
+    root = new_hash(algorithm)
+    for leaf in leaves:
+        root.update(leaf)
+    return root.hexdigest()
+
+def digest_options(test_spec):
+    """
+    :param dict test_spec: A test specification.
+
+    :returns: A two-tuple of the digest algorithm and the segment size that
+              ``test_spec`` selects.
+
+    The algorithm is the spec's ``algorithm``, or :data:`DEFAULT_ALGORITHM`.
+    The segment size is ``None`` unless the spec has ``mode: tree``, in which
+    case it is the spec's ``segment_size``, or :data:`SEGMENT_SIZE`.
+    """
+    algorithm = test_spec.get('algorithm', DEFAULT_ALGORITHM)
+
+    if test_spec.get('mode', 'flat') == 'tree':
+        segment_size = int(test_spec.get('segment_size', SEGMENT_SIZE))
+    else:
+        segment_size = None
+
+    return algorithm, segment_size
+
+def file_digest(path, algorithm=DEFAULT_ALGORITHM, block_size=None, segment_size=None):
+    """
+    :param string path: The path of a file.
+
+    :param string algorithm: Optional. The name of a digest algorithm.
+
+    :param int block_size: Optional. The number of bytes to read at a time.
+
+    :param int segment_size: Optional. When set, returns the
+                             :func:`~digest.tree_digest()` of ``path`` with
+                             segments of this size.
+
+    :returns: The hexadecimal digest of the content of ``path``.
+
+    Returns the cached digest when the :func:`~cache.fingerprint()` of
+    ``path`` matches a previous run. Otherwise hashes the file, and caches the
+    digest unless the file changed while hashing or too recently to trust its
+    modification time. Takes the fingerprint from the active
+    :class:`~snapshot.Snapshot` when it covers ``path``.
+    """
+    fp = snapshot.current_fingerprint(path)
+    key = (os.path.normpath(path), algorithm, segment_size)
+
+    entry = table.get(key)
+    if entry is not None and entry[0] == fp:
+        return entry[1]
+
+    digest, stable = _cached_digest(path, algorithm, segment_size, fp, block_size)
+    if stable:
+        table[key] = (fp, digest)
+
+    return digest
+
+def _cached_digest(path, algorithm, segment_size, fp, block_size=None):
+    if segment_size is None:
+        key = (algorithm, fp)
+    else:
+        key = (algorithm, 'tree', segment_size, fp)
+
+    digest = digests.get(key)
+    if digest is not None:
+        logger.debug('using cached digest of {0}'.format(path))
+        return digest, True
+
+    if segment_size is None:
+        digest = compute_digest(path, algorithm, block_size)
+    else:
+        digest = tree_digest(path, algorithm, segment_size, block_size)
+    stable = fingerprint(path) == fp
+
+    if stable and cacheable(fp):
+        digests.set(key, digest)
+    else:
+        logger.debug('not caching digest of recently modified file {0}'.format(path))
+
+    return digest, stable
+
+def hashed_paths(test_spec):
+    """
+    :param dict test_spec: A test specification.
+
+    :returns: A list of three-tuples of the path, algorithm and segment size
+              of each file that a change-detection case will hash for
+              ``test_spec``.
+
+    Recognizes a top-level ``file`` beside a top-level ``hash`` (e.g.
+    ``change``), and any top-level mapping with ``path`` and ``hash`` keys
+    (e.g. ``file0`` and ``file1`` in ``paired``, or ``file`` in
+    ``directory_paired``.) See :func:`~digest.digest_options()` for the
+    algorithm and segment size.
+    """
+    paths = []
+    algorithm, segment_size = digest_options(test_spec)
+
+    if 'hash' in test_spec and 'file' in test_spec and not isinstance(test_spec['file'], dict):
+        paths.append((test_spec['file'], algorithm, segment_size))
+
+    for value in test_spec.values():
+        if isinstance(value, dict) and 'path' in value and 'hash' in value:
+            paths.append((value['path'], algorithm, segment_size))
+
+    return paths
+
+def _prefetch_one(job):
+    path, algorithm, segment_size = job
+    try:
+        file_digest(path, algorithm, segment_size=segment_size)
+    except (IOError, OSError, DtfException) as e:
+        # leave the error for the case to report.
+        logger.debug('could not prefetch digest of {0}: {1}'.format(path, e))
+
+def prefetch(paths, jobs=2):
+    """
+    :param iterable paths: Three-tuples of the path of a file to hash, the
+                           name of the digest algorithm, and the segment size,
+                           as returned by :func:`~digest.hashed_paths()`.
+
+    :param int jobs: Optional. The number of threads that hash files.
+
+    :returns: The number of files hashed.
+
+    Removes duplicate paths, orders the files by device, directory, and inode,
+    so that reads proceed through the disk in sequence, and then hashes all
+    files on a thread pool and records the results in :data:`table`. Hashing
+    releases the interpreter lock, so the threads overlap both I/O and
+    computation.
+    """
+    order = []
+    for path, algorithm, segment_size in set((os.path.normpath(p), a, s) for p, a, s in paths):
+        try:
+            fp = snapshot.current_fingerprint(path)
+        except OSError:
+            continue
+
+        order.append(((fp[0], os.path.dirname(path), fp[1], path),
+                      (path, algorithm, segment_size)))
+
+    order.sort(key=lambda o: o[0])
+    order = [ o[1] for o in order ]
+
+    logger.info('prefetching digests of {0} files with {1} threads.'.format(len(order), jobs))
+
+    if jobs > 1 and len(order) > 1:
+        pool = ThreadPool(jobs)
+        try:
+            pool.map(_prefetch_one, order, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for job in order:
+            _prefetch_one(job)
+
+    logger.info('prefetched digests of {0} files.'.format(len(order)))
+
+    return len(order)
@@ -21,25 +21,33 @@ input from users with the actual behavior of ``dtf`` as implemented in
 
 See :doc:`/man/dtf` for complete documentation of the command-line
 interface of ``dtf``.
+
+Importing :mod:`dtf` has no side effects, and only imports the standard
+library modules that it needs to parse the command line: :meth:`main()`
+collects the options in a :class:`~context.RunContext`, and the functions
+that run tests import the rest of :mod:`dtf`, and the optional parallelism
+backends, when they need them. Cases report to :data:`results`, the same
+object as :data:`results.results`.
 """
 
 from __future__ import absolute_import
 
-import os.path
-import sys
 import logging
 
 logger = logging.getLogger(__name__)
 
-from dtf.multi import ProcessTestRunner, ThreadedTestRunner, EventTestRunner
-from dtf.core import SingleCaseDefinition, MultiCaseDefinition, SingleTestRunner, SuiteTestRunner
-from dtf.utils import expand_tree, get_name
-from dtf.err import DtfMissingOptionalDependency
+from dtf.context import RunContext
+from dtf.err import DtfException, DtfMissingOptionalDependency
+from dtf.results import results
+from dtf import context
 
 import argparse
 
-def interface():
+def interface(argv=None):
     """
+    :param list argv: Optional. The command line arguments. Defaults to
+                      :data:`python:sys.argv`.
+
     :returns: Parsed :class:`~python:argparse.ArgumentParser` object
               that contains user input.
 
@@ -55,6 +63,12 @@ def interface():
                         help='Increases internal operational logging verbosity')
     parser.add_argument('--debug', action='store_true', default=False,
                         help='Enables the most verbose logging of internal operations.')
+    parser.add_argument('--cachedir', action='store', default=None,
+                        help='directory for the persistent cache of file digests. Defaults to ".dtf-cache/" or $DTF_CACHE_DIR.')
+    parser.add_argument('--no-cache', action='store_false', default=True, dest='cache',
+                        help='run every test, instead of reusing the stored results of unchanged tests.')
+    parser.add_argument('--block-size', action='store', type=int, default=None, dest='block_size',
+                        help='number of bytes to read at a time when hashing files. Default value is 1048576.')
 
     # options for running larger test suites.
     parser.add_argument('--casedir', '-c', action='append',
@@ -74,6 +88,8 @@ def interface():
     # behavioral operations. some passed to tests.
     parser.add_argument('--multi', '-m', action='store',
                         default=None, help='Run tests in a threaded or multi-rocessing environment. Specify "thread" or "process" to determine parallelism model. Disabled by default.')
+    parser.add_argument('--timeout', action='store', type=float, default=None,
+                        help='with "--multi thread", fail tests that run for longer than this many seconds.')
     parser.add_argument('--jobs', '-j', action='store', type=int,
                         default=2, help='Number of parallel tests to run. Must run with "--multi". Default value is 2.')
     parser.add_argument('--verbose', '-v', action='store_true',
@@ -82,10 +98,16 @@ def interface():
                         default=False, help='terminate following first unsucessful test. False by default.')
     parser.add_argument('--passing', '-p', action='store_true',
                         default=False, help='return a passing document for failed tests.')
+    parser.add_argument('--watch', '-w', action='store_true',
+                        default=False, help='after running the suite, re-run tests when their inputs, specs, or cases change.')
+    parser.add_argument('--changed', action='store', nargs='+', default=None,
+                        help='only run the tests that depend on these files.')
+    parser.add_argument('--changed-since', action='store', default=None, dest='changed_since',
+                        help='only run the tests that depend on files changed since this git revision.')
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
-def run_many(case_paths=['cases/'], test_paths=['tests/'], multi=None, jobs=2):
+def run_many(case_paths=['cases/'], test_paths=['tests/'], multi=None, jobs=2, changed=None, timeout=None):
     """
     :param list case_paths:
 
@@ -104,8 +126,11 @@ def run_many(case_paths=['cases/'], test_paths=['tests/'], multi=None, jobs=2):
         ``multi`` contrails the parallelism model for :mod:`dtf`. The
         default mode is ``None``, which runs all tests
         sequentially. You may also specify ``thread`` to run tests in
-        parallel using a thread pool, or ``process`` to run tests in
-        parallel using a pool of separate processes.
+        parallel using a thread pool (see
+        :class:`~multi.FuturesTestRunner`), or ``process`` to run tests in
+        parallel using a pool of separate processes. ``threadpool`` uses
+        the thread pool of the :mod:`threadpool` package, as ``thread``
+        did in earlier versions.
 
     :param int jobs:
 
@@ -113,19 +138,57 @@ def run_many(case_paths=['cases/'], test_paths=['tests/'], multi=None, jobs=2):
         value of the ``jobs`` value controls the size of the thread or
         process worker pool. The default value is ``2``.
 
+    :param list changed:
+
+        Optional. If specified, only load and run the tests that depend on
+        the files in ``changed``, as determined by a
+        :class:`~index.DependencyIndex` of ``test_paths``.
+
+    :param float timeout:
+
+        Optional. With the ``thread`` ``multi`` option, the number of
+        seconds after which a running test fails. See
+        :attr:`~multi.FuturesTestRunner.timeout`.
+
     You must specify values to the ``case_paths`` value that contain
     the cases to support the test in the ``test_paths``.  You may
     achieve additional control over test operation by breaking tests,
     into folders and running those tests separately.
 
+    With :option:`dtf --no-cache` and a parallel ``multi`` option,
+    :meth:`run_many()` uses :meth:`stream_many()` instead.
+
     :meth:`run_many()` performs all testing for ``dtf`` when running
     a suite of tests. By default :meth:`run_many()` runs test
     sequentially; however, you can optionally run tests using a simple
     parallel model using the ``multi`` and ``jobs`` options.
 
+    Before running any tests, :meth:`run_many()` checks every test
+    specification against the schema of its case, in one pass (see
+    :class:`~schema.Preflight`), and reports the invalid tests instead of
+    running them. Then :meth:`run_many()` records a
+    :class:`~snapshot.Snapshot` of all files and directories that the tests
+    read, and hashes all files that the tests will hash, using a pool of
+    ``jobs`` threads. See :meth:`~core.TestRunner.snapshot()` and
+    :meth:`~core.TestRunner.prefetch()`. Tests whose specification, case and
+    inputs are unchanged since a passing run reuse the stored result instead
+    of running; see :class:`~resultcache.ResultCache`. Parallel runners start
+    the tests that took longest in previous runs first; see :mod:`history`.
+
     The options to :meth:`run_many()` are controllable using the
     :doc:`command line options </man/dtf>`.
+
+    Returns a two-tuple of the :class:`~core.TestRunner` and the
+    :class:`~core.CaseDefinition` objects, which :meth:`~watch.watch()`
+    reuses.
     """
+    from dtf.core import MultiCaseDefinition, SuiteTestRunner
+    from dtf.multi import ProcessTestRunner, ThreadedTestRunner, EventTestRunner, FuturesTestRunner
+    from dtf.index import DependencyIndex
+    from dtf.resultcache import ResultCache
+    from dtf.schema import Preflight
+    from dtf import resultcache, specs
+
     logger.debug('creating case definition object. loading cases from "{0}"'.format(case_paths))
     dfn = MultiCaseDefinition(case_paths)
 
@@ -137,6 +200,9 @@ def run_many(case_paths=['cases/'], test_paths=['tests/'], multi=None, jobs=2):
         logger.info('configuring test runner to execute tests serially.')
         t = SuiteTestRunner(test_paths)
     elif multi == 'thread':
+        logger.info('configuring test runner to execute tests using a thread executor. {0} workers'.format(str(jobs)))
+        t = FuturesTestRunner(test_paths, jobs, timeout)
+    elif multi == 'threadpool':
         logger.info('configuring test runner to execute tests using a threadpool. {0} workers'.format(str(jobs)))
         t = ThreadedTestRunner(test_paths, jobs)
     elif multi == 'process':
@@ -147,23 +213,102 @@ def run_many(case_paths=['cases/'], test_paths=['tests/'], multi=None, jobs=2):
         t = EventTestRunner(test_paths, jobs)
     logger.debug('test runner configured.')
 
+    if changed is None and multi is not None and resultcache.stored.enabled is False:
+        # without stored results to reuse, tests start as soon as they load.
+        return stream_many(t, dfn)
 
     logger.debug('loading tests.')
-    t.load()
+    if changed is None:
+        t.load()
+    else:
+        index = DependencyIndex(test_paths, case_paths).refresh()
+        t.load_specs(index.dependents(changed, dfn.cases))
     logger.debug('loaded tests.')
+    logger.info(specs.stats())
 
     logger.debug('passing case definitions to test runner...')
     t.definitions(dfn.cases)
     logger.debug('cases loaded in test runner.')
 
+    logger.debug('validating test specifications.')
+    preflight = Preflight(dfn.cases)
+    invalid = preflight.check(t.queue)
+    preflight.report(invalid, results)
+    if invalid and results.fatal is True:
+        results.render(invalid)
+    valid = t.select(n for n in t.test_specs if n not in invalid)
+    logger.debug('validated test specifications.')
+
+    logger.debug('recording file system snapshot.')
+    snapshot = t.snapshot()
+    logger.debug('recorded file system snapshot.')
+
+    logger.debug('reusing stored test results.')
+    stored = ResultCache(dfn.cases)
+    pending = valid.select(stored.reuse(valid.queue, results))
+    logger.debug('{0} tests to run.'.format(len(pending.queue)))
+
+    logger.debug('prefetching file digests.')
+    pending.prefetch(jobs)
+    logger.debug('prefetched file digests.')
+
     try:
         logger.debug('starting test run.')
-        t.run()
+        pending.run()
         logger.debug('test run complete.')
     except DtfMissingOptionalDependency as err:
         logger.error('encountered a missing optional dependency attempting to run tests. Install {0} or use a different builder'.format(err.msg))
         exit(1)
 
+    stored.save(results)
+    t.save_snapshot(snapshot)
+
+    if context.current.verbose is True:
+        print('[dtf]: {0}'.format(stored.stats()))
+        if multi is not None:
+            print('[dtf]: {0}'.format(pending.stats()))
+
+    return t, dfn
+
+
+def stream_many(t, dfn):
+    """
+    :param t: A :class:`~multi.PoolTestRunner` with no tests loaded.
+
+    :param dfn: The loaded :class:`~core.CaseDefinition`.
+
+    Discovers, parses and runs the tests at once: the pool starts each test
+    as soon as :meth:`~core.MultiTestRunner.iter_load()` loads it, rather
+    than after the last test specification loads. Checks each test against
+    the schema of its case as it loads (see
+    :meth:`~schema.Preflight.filter()`). Does not record a
+    snapshot, prefetch digests, or reuse stored results, all of which need
+    the complete queue first. Unless :option:`dtf --watch` needs the
+    queue, the runner does not keep the tests it has passed to the pool
+    (see :meth:`~core.MultiTestRunner.iter_load()`).
+
+    Returns the same two-tuple as :meth:`run_many()`.
+    """
+    from dtf.schema import Preflight
+    from dtf import specs
+
+    t.definitions(dfn.cases)
+
+    try:
+        logger.debug('loading and running tests.')
+        jobs = t.iter_load(keep=context.current.watch)
+        t.run(Preflight(dfn.cases).filter(jobs, results))
+        logger.debug('test run complete.')
+    except DtfMissingOptionalDependency as err:
+        logger.error('encountered a missing optional dependency attempting to run tests. Install {0} or use a different builder'.format(err.msg))
+        exit(1)
+
+    logger.info(specs.stats())
+
+    if context.current.verbose is True:
+        print('[dtf]: {0}'.format(t.stats()))
+
+    return t, dfn
 
 def run_one(case, test):
     """
@@ -179,6 +324,9 @@ def run_one(case, test):
 
     Use :meth:`run_one()` to run a single, specific ``dtf`` test.
     """
+    from dtf.core import SingleCaseDefinition, SingleTestRunner
+    from dtf.utils import get_name
+
     logger.debug('creating case definition object.')
     dfn = SingleCaseDefinition()
 
@@ -201,79 +349,36 @@ def run_one(case, test):
     t.run(get_name(case))
     logger.debug('test run complete.')
 
-######################################################################
-#
-# The following allows sphinx.ext.autodoc to parse this module.
-
-if sys.argv[0] == 'test.py' or sys.argv[0].rsplit('/', 1)[1] == 'sphinx-build':
-    VERBOSE,  FATAL, PASSING, MULTI, JOBS, \
-      SINGLE, YAMLTEST, CASEDEF, CASEDIR, TESTDIR = [ None ] * 10
-
-    logging.basicConfig(level=logging.CRITICAL)
-    logging.info('running in non-interactive mode. only possible for tests and doc parsing')
-else:
-    logger.debug('calling user interface to collect input on command line.')
-    user_input = interface()
-
-    VERBOSE = user_input.verbose
-    FATAL = user_input.fatal
-    PASSING = user_input.passing
-    MULTI = user_input.multi
-    JOBS = user_input.jobs
-    SINGLE = user_input.single
-    YAMLTEST = user_input.yamltest
-    CASEDEF = user_input.casedef
-
-    if user_input.casedir is None:
-        CASEDIR = ['cases/']
-    else:
-        CASEDIR = user_input.casedir
-
-    if user_input.testdir is None:
-        TESTDIR = ['tests/']
-    else:
-        TESTDIR = user_input.testdir
-
-    logger.info('set default test and case dirs')
-
-    if user_input.debug == True:
-        log_level = logging.DEBUG
-    elif user_input.info == True:
-        log_level = logging.INFO
-    else:
-        log_level = logging.WARNING
-
-    logger.debug('configuring log level based on user input.')
-
-    if user_input.logfile is not False:
-       logging.basicConfig(filename=user_input.logfile, level=log_level)
-    else:
-       logging.basicConfig(level=log_level)
-
-    logger.info('configuring logger. level {0}'.format(log_level))
-
-from dtf.results import DtfResults
-results = DtfResults()
-
-if MULTI == 'process':
-    results.sync = True
-
-def main():
+def main(argv=None):
     """
+    :param list argv: Optional. The command line arguments. Defaults to
+                      :data:`python:sys.argv`.
+
     :meth:`main()` is the main entry point for the :doc:`dtf
     </man/dtf>` script. Based on the user input collected by
-    :meth:`interface()`, :meth:`main()` will call either
-    :meth:`run_one()` or :meth:`run_many()` with the appropriate
-    arguments, as collected by :meth:`interface()`.
+    :meth:`interface()`, :meth:`main()` configures a
+    :class:`~context.RunContext` and calls either :meth:`run_one()` or
+    :meth:`run_many()` with the appropriate arguments.
     """
+    run = RunContext.from_args(interface(argv)).configure()
+
+    if run.single is False:
+        try:
+            changed = run.changed_files()
+        except DtfException as err:
+            logger.error(str(err))
+            exit(1)
 
-    if SINGLE is False:
         logger.info('running a test suite.')
-        run_many(CASEDIR, TESTDIR, MULTI, JOBS)
+        runner, dfn = run_many(run.casedirs, run.testdirs, run.multi, run.jobs, changed, run.timeout)
         results.render()
+
+        if run.watch is True:
+            from dtf.watch import watch
+            watch(runner, dfn, run.casedirs, run.testdirs, results)
     else:
-        logger.info('running {0} test with case {1}'.format(YAMLTEST, CASEDEF))
-        run_one(CASEDEF, YAMLTEST)
+        logger.info('running {0} test with case {1}'.format(run.yamltest, run.casedef))
+        run_one(run.casedef, run.yamltest)
         results.render()
 
 if __name__ == '__main__':
@@ -0,0 +1,166 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`gitdiff` asks the local ``git`` which files and lines changed since a
+base revision, so that :mod:`dtf` can limit tests to changed files (see
+:option:`dtf --changed-since`) or to changed lines (e.g. ``line_length``
+specs with a ``base``.)
+
+All paths are relative to the current directory, and all comparisons are
+between the base revision and the working tree, including untracked files.
+"""
+
+from __future__ import absolute_import
+
+import os
+import re
+import bisect
+import subprocess
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf.err import DtfException
+
+hunks = {}
+"""A dictionary of the changed line ranges found in this run, in the form of
+``{ <base>: <ranges> }``, as returned by :func:`~gitdiff.changed_lines()`."""
+
+revisions = {}
+"""A dictionary of the commits that revisions resolved to in this run, in the
+form of ``{ <base>: <commit> }``, as returned by :func:`~gitdiff.resolve()`."""
+
+HUNK = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+def git(*args):
+    """
+    :returns: The output of ``git`` with the arguments ``args``, as a string.
+
+    Raises :exc:`~err.DtfException`, with the error message of ``git``, if
+    ``git`` fails.
+    """
+    command = ['git', '-c', 'core.quotepath=false'] + list(args)
+    try:
+        p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, error = p.communicate()
+    except OSError as e:
+        raise DtfException('cannot run "{0}": {1}'.format(' '.join(command), e))
+
+    if p.returncode != 0:
+        # the first line of git's message, without any usage text after it.
+        lines = error.decode('utf-8', 'replace').strip().splitlines()
+        error = lines[0] if lines else 'exit status {0}'.format(p.returncode)
+        raise DtfException('cannot run "{0}": {1}'.format(' '.join(command), error))
+
+    return output.decode('utf-8')
+
+def untracked():
+    ":returns: The untracked, unignored files beneath the current directory."
+    return [ line for line in git('ls-files', '--others', '--exclude-standard').splitlines() if line ]
+
+def resolve(rev):
+    """
+    :param string rev: A git revision (e.g. ``HEAD``, ``origin/master``.)
+
+    :returns: The full hash of the commit that ``rev`` names. Resolves each
+              ``rev`` once per run.
+
+    Raises :exc:`~err.DtfException` if ``git`` fails.
+    """
+    if rev not in revisions:
+        revisions[rev] = git('rev-parse', '--verify', '--quiet', rev + '^{commit}').strip()
+
+    return revisions[rev]
+
+def changed_since(rev):
+    """
+    :param string rev: A git revision (e.g. ``HEAD``, ``origin/master``.)
+
+    :returns: The files that differ between ``rev`` and the working tree,
+              including untracked files, relative to the current directory.
+
+    Raises :exc:`~err.DtfException` if ``git`` fails.
+    """
+    paths = [ line for line in git('diff', '--name-only', '--relative', rev).splitlines() if line ]
+    paths.extend(untracked())
+
+    logger.info('{0} files changed since {1}.'.format(len(paths), rev))
+    return paths
+
+def parse_hunks(diff):
+    """
+    :param string diff: The output of ``git diff -U0``.
+
+    :returns: A dictionary of the form ``{ <path>: [ (<first>, <last>), ... ]
+              }``, of the sorted ranges of line numbers, in the new version of
+              every file, of added or modified lines. Removed files, and
+              files with only removed lines, have no entry.
+    """
+    ranges = {}
+    path = None
+    for line in diff.splitlines():
+        if line.startswith('+++ '):
+            target = line[4:]
+            if target == '/dev/null':
+                path = None
+            else:
+                path = os.path.normpath(target[2:] if target.startswith('b/') else target)
+        elif line.startswith('@@') and path is not None:
+            m = HUNK.match(line)
+            if m is None:
+                continue
+
+            start = int(m.group(1))
+            count = 1 if m.group(2) is None else int(m.group(2))
+            if count > 0:
+                ranges.setdefault(path, []).append((start, start + count - 1))
+
+    for path in ranges:
+        ranges[path].sort()
+
+    return ranges
+
+def changed_lines(base):
+    """
+    :param string base: A git revision.
+
+    :returns: A dictionary of the form ``{ <path>: <ranges> }``, where
+              ``<ranges>`` is a list of ranges as returned by
+              :func:`~gitdiff.parse_hunks()`, or ``None`` for untracked files,
+              every line of which is new.
+
+    Runs ``git diff -U0`` once per ``base`` in each run, and reuses the
+    result for all tests with the same ``base``.
+    """
+    if base not in hunks:
+        ranges = parse_hunks(git('diff', '-U0', '--no-color', '--no-ext-diff', '--relative', base))
+        for path in untracked():
+            ranges[os.path.normpath(path)] = None
+
+        logger.info('{0} files have changed lines since {1}.'.format(len(ranges), base))
+        hunks[base] = ranges
+
+    return hunks[base]
+
+def in_ranges(ln, ranges):
+    """
+    :returns: ``True`` if line number ``ln`` falls in one of the sorted,
+              non-overlapping ``ranges``, or if ``ranges`` is ``None``.
+    """
+    if ranges is None:
+        return True
+
+    i = bisect.bisect_right(ranges, (ln, float('inf'))) - 1
+    return i >= 0 and ranges[i][0] <= ln <= ranges[i][1]
@@ -0,0 +1,194 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`history` records how long each test takes, so that the parallel test
+runners in :mod:`multi` can start the longest tests first. When a pool
+receives tests in an arbitrary order, a few long tests that start last
+determine the duration of the whole run; submitting the longest first
+(the "longest processing time" rule) lets the short tests fill the gaps.
+
+:data:`durations` stores a moving average of the duration of every test
+that a pool ran, keyed by the test's suite (the test directories of the
+run), type and name, so that tests with the same name in different suites
+keep separate histories. Tests without a history have an estimated duration that
+is proportional to the size of their input files (see
+:func:`~history.input_size()`), at the rate observed for the tests that
+have both.
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache
+from dtf.utils import spec_inputs
+from dtf import snapshot
+
+durations = DtfCache('history', max_entries=100000)
+"The :class:`~cache.DtfCache` that holds the duration of each test."
+
+FORMAT = 2
+"Increment to invalidate all stored durations when their meaning changes."
+
+WEIGHT = 0.5
+"The weight of the latest duration in the stored moving average."
+
+DEFAULT_RATE = 2**27
+"The bytes per second assumed for new tests before any test has a history."
+
+def _key(suite, kind, name):
+    return (FORMAT, suite, kind, name)
+
+def input_size(spec):
+    """
+    :param dict spec: A test specification.
+
+    :returns: The total size in bytes of the files that ``spec`` names as
+              inputs (see :func:`~utils.spec_inputs()`).
+
+    Uses the sizes recorded by the active :class:`~snapshot.Snapshot`,
+    including the files beneath input directories. Outside the snapshot,
+    only counts input files, to avoid walking directories.
+    """
+    size = 0
+    for path in spec_inputs(spec):
+        s = snapshot.current
+        if s is not None and s.covers(path):
+            for p, fp in s.stamps(path):
+                if p in s.files:
+                    size += fp[2]
+        elif os.path.isfile(path):
+            try:
+                size += os.stat(path).st_size
+            except OSError:
+                pass
+
+    return size
+
+class Estimator(object):
+    """
+    :param list queue: A :attr:`~core.TestRunner.queue`.
+
+    :param tuple suite: Optional. The suite of the tests in ``queue``, as
+                        in :func:`~history.record()`.
+
+    Reads the stored durations of the tests in ``queue``, and estimates
+    the duration of the rest from their input sizes.
+    """
+
+    def __init__(self, queue, suite=()):
+        self.known = {}
+        "A dictionary of the stored duration of each test with a history."
+
+        self.sizes = {}
+        "A dictionary of the input size of each test without a history."
+
+        rate_bytes = 0
+        rate_seconds = 0.0
+        for job in queue:
+            name = job[1]
+            seconds = durations.get(_key(suite, job[0], name))
+
+            if seconds is None:
+                self.sizes[name] = input_size(job[2])
+                continue
+
+            self.known[name] = seconds
+            size = input_size(job[2])
+            if size > 0:
+                rate_bytes += size
+                rate_seconds += seconds
+
+        if rate_bytes > 0 and rate_seconds > 0:
+            self.rate = rate_bytes / rate_seconds
+        else:
+            self.rate = float(DEFAULT_RATE)
+        "The bytes per second of the tests that have a history."
+
+        if self.known:
+            self.base = sorted(self.known.values())[len(self.known) // 2]
+        else:
+            self.base = 0.0
+        "The median duration of the tests that have a history."
+
+        logger.info('{0} of {1} queued tests have a duration history.'.format(len(self.known), len(queue)))
+
+    def cost(self, job):
+        ":returns: The estimated duration, in seconds, of the test ``job``."
+        name = job[1]
+        if name in self.known:
+            return self.known[name]
+
+        size = self.sizes.get(name, 0)
+        if size > 0:
+            return size / self.rate
+        else:
+            return self.base
+
+def lpt(queue, workers, cost):
+    """
+    :param list queue: A :attr:`~core.TestRunner.queue`.
+
+    :param int workers: The size of the worker pool.
+
+    :param callable cost: A function that returns the duration of a job.
+
+    :returns: A two-tuple of the jobs in ``queue``, longest first, and the
+              predicted duration of the run on ``workers`` workers that
+              take jobs in that order.
+    """
+    costs = [ (cost(job), i) for i, job in enumerate(queue) ]
+    costs.sort(key=lambda c: (-c[0], c[1]))
+
+    loads = [0.0] * max(workers, 1)
+    for seconds, i in costs:
+        heapq.heapreplace(loads, loads[0] + seconds)
+
+    return [ queue[i] for seconds, i in costs ], max(loads)
+
+def timed(func, name, spec):
+    """
+    Calls ``func(name, spec)``, i.e. runs a test, and returns a two-tuple of
+    ``name`` and the duration of the test in seconds. Picklable, for worker
+    processes.
+    """
+    start = time.time()
+    func(name, spec)
+    return name, time.time() - start
+
+def record(measured, suite=()):
+    """
+    :param dict measured: The durations, in seconds, of tests, in the form
+                          ``{ (<type>, <name>): <seconds> }``.
+
+    :param tuple suite: Optional. The suite of the tests, e.g. the absolute
+                        paths of the test directories of the run.
+
+    Adds ``measured`` to the moving average of each test's duration in
+    :data:`durations`.
+    """
+    for (kind, name), seconds in measured.items():
+        key = _key(suite, kind, name)
+        previous = durations.get(key)
+        if previous is not None:
+            seconds = WEIGHT * seconds + (1 - WEIGHT) * previous
+        durations.set(key, seconds)
+
+    logger.debug('recorded the durations of {0} tests.'.format(len(measured)))
@@ -0,0 +1,309 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`ignore` implements ``.dtfignore`` files, which name files and
+directories that :func:`~utils.expand_tree()` skips when it discovers cases,
+test specifications and the files that tests check. Ignored directories are
+pruned: :mod:`dtf` never lists their contents.
+
+``.dtfignore`` files use the syntax and semantics of ``.gitignore`` files:
+
+- blank lines and lines that begin with ``#`` have no effect.
+
+- patterns are globs, where ``*`` and ``?`` do not match ``/``, and ``**``
+  matches any number of directories.
+
+- a pattern that contains a ``/`` other than at the end is relative to the
+  directory of the ``.dtfignore`` file; other patterns match at any depth.
+
+- a pattern that ends with ``/`` only matches directories.
+
+- a pattern that begins with ``!`` re-includes paths that an earlier pattern
+  excluded. The last matching pattern wins, and patterns in deeper
+  ``.dtfignore`` files take precedence over patterns in shallower files.
+
+Paths are relative to the current directory, where :mod:`dtf` reads the
+first ``.dtfignore``. :data:`DEFAULT_PATTERNS` always apply.
+"""
+
+from __future__ import absolute_import
+
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+IGNORE_FILE = '.dtfignore'
+"The name of ignore files."
+
+DEFAULT_PATTERNS = [ '.git/', '.hg/', '.svn/', '.bzr/', '.dtf-cache/' ]
+"Patterns that apply before any ``.dtfignore`` file."
+
+def translate(pattern):
+    """
+    :param string pattern: A ``.gitignore`` style glob, without a leading or
+                           trailing ``/``.
+
+    :returns: A regular expression, as a string, that matches the same
+              relative paths as ``pattern``.
+    """
+    out = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == n:
+            out.append('/.*')
+            i += 3
+        elif pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif c == '*':
+            out.append('[^/]*')
+            i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+
+    return ''.join(out)
+
+class IgnoreRules(object):
+    """
+    :param list patterns: Optional. Patterns that apply to every path.
+
+    An ordered set of ignore patterns. Call
+    :meth:`~ignore.IgnoreRules.ignored()` to test a path.
+    """
+
+    def __init__(self, patterns=[]):
+        self.rules = []
+        "A list of three-tuples of a compiled pattern, negation and directory-only flags."
+
+        self._combined = None
+
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, line, base=''):
+        """
+        :param string line: A line from an ignore file.
+
+        :param string base: Optional. The directory of the ignore file,
+                            relative to the current directory.
+        """
+        line = line.rstrip('\n').rstrip('\r')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+
+        if not line or line.startswith('#'):
+            return
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\#') or line.startswith('\\!'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return
+
+        if base in ('', os.curdir):
+            prefix = ''
+        else:
+            prefix = re.escape(base.rstrip('/') + '/')
+
+        if '/' in line:
+            regex = '^' + prefix + translate(line.lstrip('/')) + '$'
+        else:
+            regex = '^' + prefix + '(?:.*/)?' + translate(line) + '$'
+
+        self.rules.append((re.compile(regex), negate, dir_only))
+        self._combined = None
+
+    def load(self, path, base=''):
+        """
+        :param string path: The path of an ignore file.
+
+        :param string base: Optional. The directory of the ignore file,
+                            relative to the current directory.
+        """
+        with open(path) as f:
+            for line in f:
+                self.add(line, base)
+        logger.debug('loaded ignore patterns from {0}'.format(path))
+
+    def child(self, path, base):
+        """
+        :returns: A new :class:`~ignore.IgnoreRules` with these rules, followed
+                  by the rules in the ignore file ``path``, which apply to the
+                  directory ``base``.
+        """
+        rules = IgnoreRules()
+        rules.rules = list(self.rules)
+        try:
+            rules.load(path, base)
+        except (IOError, OSError) as e:
+            logger.warning('cannot read {0}: {1}'.format(path, e))
+        return rules
+
+    def _compile(self):
+        # without negations, one alternation per kind of path answers every
+        # query in a single match.
+        if any(negate for regex, negate, dir_only in self.rules):
+            self._combined = False
+            return
+
+        def alternation(rules):
+            if not rules:
+                return None
+            return re.compile('|'.join('(?:{0})'.format(r.pattern) for r in rules))
+
+        self._combined = (alternation([ r for r, negate, dir_only in self.rules ]),
+                          alternation([ r for r, negate, dir_only in self.rules if not dir_only ]))
+
+    def ignored(self, path, is_dir=False):
+        """
+        :param string path: A normalized path, relative to the current
+                            directory.
+
+        :param bool is_dir: ``True`` if ``path`` is a directory.
+
+        :returns: ``True`` if the last pattern that matches ``path`` excludes
+                  it.
+        """
+        if self._combined is None:
+            self._compile()
+
+        if self._combined is not False:
+            regex = self._combined[0] if is_dir else self._combined[1]
+            return regex is not None and regex.match(path) is not None
+
+        result = False
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path):
+                result = not negate
+        return result
+
+class PathSet(object):
+    """
+    :param list paths: Paths, globs (e.g. ``docs/*.txt`` or ``**/build``),
+                       and directories (e.g. ``docs/``), relative to the
+                       current directory. May also be a single string.
+
+    A set of paths for :func:`~utils.expand_tree()` to exclude. Exact paths
+    are held in a set, and globs and directories are compiled into one
+    regular expression, so each test costs the same however many paths
+    there are. A path that names a directory, or a glob that matches one,
+    excludes everything beneath it.
+    """
+
+    def __init__(self, paths=[]):
+        if isinstance(paths, string_types):
+            paths = [ paths ] if paths else []
+
+        self.exact = set()
+        "The set of normalized paths without glob characters."
+
+        patterns = []
+        for path in paths:
+            if any(c in path for c in '*?['):
+                patterns.append(translate(relative(path)))
+            elif path.endswith('/'):
+                patterns.append(re.escape(relative(path)))
+            else:
+                self.exact.add(relative(path))
+
+        self.regex = None
+        "A compiled pattern that matches every glob and directory, or ``None``."
+
+        if patterns:
+            self.regex = re.compile('^(?:{0})(?:/.*)?$'.format('|'.join(patterns)))
+
+    def ignored(self, path, is_dir=False):
+        """
+        :param string path: A normalized path, relative to the current
+                            directory.
+
+        :param bool is_dir: Unused; for compatibility with
+                            :meth:`~ignore.IgnoreRules.ignored()`.
+
+        :returns: ``True`` if ``path`` is in the set, or matches a glob or
+                  directory in the set.
+        """
+        if path in self.exact:
+            return True
+        return self.regex is not None and self.regex.match(path) is not None
+
+def relative(path):
+    ":returns: ``path``, normalized and relative to the current directory."
+    if os.path.isabs(path):
+        return os.path.relpath(path)
+    else:
+        return os.path.normpath(path)
+
+def rules_for(path):
+    """
+    :param string path: A directory.
+
+    :returns: The :class:`~ignore.IgnoreRules` that apply to the contents of
+              ``path``: the :data:`DEFAULT_PATTERNS`, followed by the patterns
+              in the ``.dtfignore`` files of the current directory and of each
+              directory between it and ``path``, but not of ``path`` itself.
+    """
+    rules = IgnoreRules(DEFAULT_PATTERNS)
+
+    rel = relative(path)
+    if rel == os.curdir or rel.startswith(os.pardir) or os.path.isabs(rel):
+        return rules
+
+    parts = rel.split(os.sep)[:-1]
+    for i in range(len(parts) + 1):
+        base = os.path.join(*parts[:i]) if i > 0 else os.curdir
+
+        ignore_file = os.path.join(base, IGNORE_FILE)
+        if os.path.isfile(ignore_file):
+            rules = rules.child(ignore_file, base)
+
+    return rules
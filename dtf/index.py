@@ -0,0 +1,187 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`index` maps files to the tests that depend on them, so that
+:option:`dtf --changed` and :option:`dtf --changed-since` can load and run
+only the tests affected by a set of changed files.
+
+A test depends on its own specification, on the case module that implements
+its ``type`` and every case module that it uses (e.g. the module of the case
+class it subclasses), and on every file and directory that its specification names
+as an input (see :func:`~utils.spec_inputs()`). A test that names a
+directory (e.g. ``tree_line_length`` tests) depends on every file beneath
+that directory.
+
+The index persists in the cache between runs, and only re-reads
+specifications whose :func:`~cache.fingerprint()` changed.
+"""
+
+from __future__ import absolute_import
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+from dtf.utils import expand_tree, get_name, spec_inputs
+from dtf.specs import iter_spec
+from dtf.resultcache import case_sources
+
+indexes = DtfCache('index', max_entries=64)
+"The :class:`~cache.DtfCache` that holds dependency indexes between runs."
+
+class DependencyIndex(object):
+    """
+    :param list test_paths: The directories that hold test specifications.
+
+    :param list case_paths: The directories that hold case modules.
+
+    Call :meth:`~index.DependencyIndex.refresh()` to read the
+    specifications.
+    """
+
+    def __init__(self, test_paths, case_paths=[]):
+        self.test_paths = test_paths
+        self.case_paths = [ os.path.normpath(p) for p in case_paths ]
+
+        self.specs = {}
+        """A dictionary of the form ``{ <spec>: (<fingerprint>, [<type>, ...],
+        [<input>, ...]) }``."""
+
+        self.inputs = {}
+        """The reverse index, of the form ``{ <input>: set([<spec>, ...])
+        }``, with normalized paths."""
+
+        self.types = {}
+        "A dictionary of the form ``{ <type>: set([<spec>, ...]) }``."
+
+    @property
+    def key(self):
+        return tuple(os.path.abspath(p) for p in self.test_paths)
+
+    def refresh(self):
+        """
+        Lists the specifications in :attr:`~index.DependencyIndex.test_paths`,
+        reuses the entries of the saved index for unchanged specifications,
+        reads the others, and saves the index if it changed.
+        """
+        saved = indexes.get(self.key, {})
+
+        self.specs = {}
+        modified = False
+        for path in self.test_paths:
+            for spec in expand_tree(path):
+                spec = os.path.normpath(spec)
+                try:
+                    fp = fingerprint(spec)
+                except OSError:
+                    continue
+
+                entry = saved.get(spec)
+                if entry is None or entry[0] != fp or not cacheable(fp):
+                    entry = self._read(spec, fp)
+                    modified = True
+
+                self.specs[spec] = entry
+
+        if modified or set(saved) != set(self.specs):
+            indexes.set(self.key, self.specs)
+
+        self.inputs = {}
+        self.types = {}
+        for spec, (fp, types, inputs) in self.specs.items():
+            for path in inputs:
+                self.inputs.setdefault(path, set()).add(spec)
+            for t in types:
+                self.types.setdefault(t, set()).add(spec)
+
+        logger.info('indexed {0} test specifications with {1} inputs.'.format(len(self.specs), len(self.inputs)))
+        return self
+
+    @staticmethod
+    def _read(spec, fp):
+        types = []
+        inputs = []
+        for doc in iter_spec(spec):
+            if not isinstance(doc, dict):
+                continue
+            types.append(doc.get('type'))
+            inputs.extend(os.path.normpath(p) for p in spec_inputs(doc))
+
+        logger.debug('indexed test specification {0}'.format(spec))
+        return fp, types, inputs
+
+    def dependents(self, changed, definitions=None):
+        """
+        :param iterable changed: The paths of changed files.
+
+        :param dict definitions: Optional. The
+                                 :attr:`~core.CaseDefinition.cases` of the
+                                 run. If specified, a changed case module
+                                 selects the tests of every case that uses
+                                 it, as found by
+                                 :func:`~resultcache.case_sources()`, which
+                                 imports the case modules of the indexed
+                                 types. Otherwise, only the tests of the case
+                                 with the same name as the module.
+
+        :returns: A sorted list of the specifications of the tests that
+                  depend on any of the files in ``changed``.
+        """
+        changed = list(changed)
+
+        specs = set()
+        modules = set()
+        for path in changed:
+            path = os.path.normpath(path)
+
+            if path in self.specs:
+                specs.add(path)
+
+            if path.endswith('.py') and self._is_case(path):
+                specs.update(self.types.get(get_name(path), ()))
+                modules.add(os.path.realpath(path))
+
+            # the path itself, and every directory that contains it.
+            parent = path
+            while True:
+                specs.update(self.inputs.get(parent, ()))
+                head = os.path.dirname(parent)
+                if head == parent or not head:
+                    break
+                parent = head
+
+            # a changed directory affects every input beneath it.
+            if os.path.isdir(path):
+                prefix = '' if path == os.curdir else path.rstrip(os.sep) + os.sep
+                for i in self.inputs:
+                    if i.startswith(prefix):
+                        specs.update(self.inputs[i])
+
+        if modules and definitions is not None:
+            for t in self.types:
+                sources = set(os.path.realpath(p) for p in case_sources(definitions, t))
+                if sources & modules:
+                    specs.update(self.types[t])
+
+        logger.info('{0} tests depend on {1} changed files.'.format(len(specs), len(changed)))
+        return sorted(specs)
+
+    def _is_case(self, path):
+        for p in self.case_paths:
+            if path.startswith(p.rstrip(os.sep) + os.sep):
+                return True
+        return False
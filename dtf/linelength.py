@@ -0,0 +1,543 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`linelength` finds lines longer than a maximum length in files of any
+size, for the ``line_length`` and ``tree_line_length`` cases.
+
+Files are read in binary chunks of :data:`CHUNK_SIZE` bytes into one reused
+buffer, so memory use does not depend on the size of the file or the length
+of its lines. Within a chunk, lines that are too long are found without a
+Python-level step per line: with :func:`numpy.flatnonzero()` over the
+newline offsets when the optional :mod:`numpy` package is installed, and
+otherwise with a regular expression that only matches newlines followed by
+more than ``max_length`` other bytes.
+
+:func:`~linelength.scan_files()` finds every long line in a group of files,
+scanning files concurrently in a pool of worker processes, and
+:func:`~linelength.segmented_long_lines()` splits one large file into segments
+that worker processes scan concurrently.
+
+Every scan records the lengths of all lines longer than :data:`FLOOR` in a
+per-file line index, kept in a :class:`~cache.DtfCache` under the file's
+:func:`~cache.fingerprint()`, so that checks of the same file at any
+``max_length`` reuse one scan, in the same run and in later runs, until the
+file changes (see :func:`~linelength.line_index()`).
+
+Lengths are in characters, not counting the line ending (``\\n`` or
+``\\r\\n``), with files decoded as UTF-8. A line is never longer in
+characters than in bytes, so only lines that are too long in bytes need an
+exact count.
+"""
+
+from __future__ import absolute_import
+
+import io
+import os
+import re
+import logging
+from array import array
+from collections import deque
+from itertools import chain
+from multiprocessing import Pool, cpu_count, current_process
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+from dtf import snapshot
+from dtf.gitdiff import in_ranges
+
+CHUNK_SIZE = 2**20
+"The number of bytes read at a time."
+
+SEGMENT_SIZE = 2**26
+"The default segment size of :func:`~linelength.segmented_long_lines()`."
+
+JOBS = cpu_count()
+"The default number of worker processes of :func:`~linelength.scan_files()`."
+
+WINDOW = 4
+"""The number of files per worker process that :func:`~linelength.scan_files()`
+submits ahead of the results it has collected."""
+
+POOL_BYTES = 2**23
+"""Work of fewer bytes than this runs in the current process: for a small
+tree or file, starting a pool of processes costs more than it saves."""
+
+LOOKAHEAD = 4096
+"""The number of files or segments read ahead, to measure the work before
+deciding whether to start a pool."""
+
+FLOOR = 72
+"""Line indexes record every line longer than this many characters, or than
+the smallest ``max_length`` checked, if smaller."""
+
+indexes = DtfCache('linelength')
+"The :class:`~cache.DtfCache` that holds line indexes between runs."
+
+NEWLINE = 0x0a
+CARRIAGE_RETURN = 0x0d
+
+_CONTINUATION = bytes(bytearray(range(0x80, 0xc0)))
+
+def _continuation(data):
+    # the number of UTF-8 continuation bytes, which do not start a character.
+    return len(data) - len(data.translate(None, _CONTINUATION))
+
+def line_length(data):
+    """
+    :param data: The bytes of one line, without the newline.
+
+    :returns: The length of the line in characters, without a trailing
+              carriage return.
+    """
+    n = len(data) - _continuation(data)
+    if data[-1:] == b'\r':
+        n -= 1
+    return n
+
+def _regex_runs(buf, start, end, max_length):
+    # a newline followed by too many other bytes: the regular expression
+    # engine skips ahead to each newline, and gives up on short lines at the
+    # next newline.
+    pattern = re.compile('\\n[^\\n]{{{0}}}'.format(max_length + 1).encode('ascii'))
+
+    line = 0
+    counted = start
+    pos = start - 1
+    while True:
+        m = pattern.search(buf, pos, end)
+        if m is None:
+            break
+
+        line_start = m.start() + 1
+        line_end = buf.find(b'\n', m.end(), end + 1)
+
+        line += buf.count(b'\n', counted, line_start)
+        counted = line_start
+        pos = line_end
+
+        yield line, line_start, line_end
+
+def _numpy_runs(buf, start, end, max_length):
+    newlines = numpy.flatnonzero(numpy.frombuffer(buf, dtype=numpy.uint8)[start - 1:end + 1] == NEWLINE)
+    newlines += start - 1
+
+    lengths = numpy.diff(newlines) - 1
+    for line in numpy.flatnonzero(lengths > max_length):
+        yield int(line), int(newlines[line]) + 1, int(newlines[line + 1])
+
+def long_runs(buf, start, end, max_length):
+    """
+    :param bytearray buf: A chunk of a file.
+
+    :param int start: The offset of the first byte of a line in ``buf``,
+                      which must follow a newline.
+
+    :param int end: The offset of a newline in ``buf``.
+
+    :param int max_length: The maximum length of a line, in bytes.
+
+    Yields a three-tuple of the index of the line, counting from the line at
+    ``start``, and the start and end offsets of every line between ``start``
+    and ``end`` that is longer than ``max_length`` bytes.
+    """
+    if numpy is None:
+        return _regex_runs(buf, start, end, max_length)
+    else:
+        return _numpy_runs(buf, start, end, max_length)
+
+def _part(data):
+    # the size, number of UTF-8 continuation bytes, and last byte of part of
+    # a line.
+    return len(data), _continuation(data), data[-1] if data else None
+
+def _join(a, b):
+    return a[0] + b[0], a[1] + b[1], b[2] if b[0] else a[2]
+
+def _length(part):
+    n, continuation, last = part
+    return n - continuation - (1 if last == CARRIAGE_RETURN else 0)
+
+def summarize(chunk, max_length):
+    """
+    :param bytearray chunk: Consecutive bytes of a file.
+
+    :param int max_length: The maximum length of a line, in characters.
+
+    :returns: A summary of ``chunk``, as a four-tuple of:
+
+              - the number of newlines in ``chunk``,
+
+              - the part of a line before the first newline,
+
+              - the part of a line after the last newline, or ``None`` if
+                there are no newlines, and
+
+              - a list of two-tuples of the index and length of each line
+                longer than ``max_length`` between the first and last
+                newline, where the line after the first newline has index
+                ``0``.
+
+    Summaries of consecutive chunks combine with
+    :func:`~linelength.combine()`.
+    """
+    first = chunk.find(b'\n')
+    if first == -1:
+        return 0, _part(chunk), None, []
+
+    last = chunk.rfind(b'\n')
+
+    found = []
+    for line, start, end in long_runs(chunk, first + 1, last, max_length):
+        length = line_length(chunk[start:end])
+        if length > max_length:
+            found.append((line, length))
+
+    return chunk.count(b'\n'), _part(chunk[:first]), _part(chunk[last + 1:]), found
+
+def combine(a, b, max_length):
+    """
+    :returns: The summary of the bytes summarized by ``a`` followed by the
+              bytes summarized by ``b``. See :func:`~linelength.summarize()`.
+    """
+    lines_a, head_a, tail_a, found_a = a
+    lines_b, head_b, tail_b, found_b = b
+
+    if lines_a == 0:
+        return lines_b, _join(head_a, head_b), tail_b, found_b
+    elif lines_b == 0:
+        return lines_a, head_a, _join(tail_a, head_b), found_a
+
+    found = list(found_a)
+    length = _length(_join(tail_a, head_b))
+    if length > max_length:
+        found.append((lines_a - 1, length))
+    found.extend((lines_a + line, length) for line, length in found_b)
+
+    return lines_a + lines_b, head_a, tail_b, found
+
+def _fold(summaries, max_length, until=None):
+    # yields the line numbers and lengths of long lines from the summaries of
+    # consecutive chunks, starting at the beginning of a file, and stops
+    # after the chunk that completes line number until.
+    ln = 1
+    carried = (0, 0, None)
+
+    for lines, head, tail, found in summaries:
+        if lines == 0:
+            carried = _join(carried, head)
+            continue
+
+        length = _length(_join(carried, head))
+        if length > max_length:
+            yield ln, length
+
+        for line, length in found:
+            yield ln + 1 + line, length
+
+        ln += lines
+        carried = tail
+
+        if until is not None and ln > until:
+            return
+
+    # a last line without a newline.
+    if carried[0] > 0 and _length(carried) > max_length:
+        yield ln, _length(carried)
+
+def _chunks(f, chunk_size, size=None):
+    # reads up to size bytes from f into one reused buffer.
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+
+    while size is None or size > 0:
+        want = chunk_size if size is None else min(chunk_size, size)
+        n = f.readinto(view[:want])
+        if not n:
+            break
+        elif size is not None:
+            size -= n
+
+        if n < chunk_size:
+            yield buf[:n]
+        else:
+            yield buf
+
+def long_lines(path, max_length, chunk_size=None, until=None):
+    """
+    :param string path: The path of a file.
+
+    :param int max_length: The maximum length of a line, in characters.
+
+    :param int chunk_size: Optional. Defaults to :data:`CHUNK_SIZE`.
+
+    :param int until: Optional. Stop reading the file once every line up to
+                      this line number is complete.
+
+    Yields a two-tuple of the line number (starting at ``1``) and the length
+    of every line in ``path`` that is longer than ``max_length``.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+
+    with io.open(path, 'rb', buffering=0) as f:
+        summaries = (summarize(chunk, max_length) for chunk in _chunks(f, chunk_size))
+        for violation in _fold(summaries, max_length, until):
+            yield violation
+
+def _summarize_segment(job):
+    path, start, size, max_length, chunk_size = job
+
+    summary = (0, (0, 0, None), None, [])
+    with io.open(path, 'rb', buffering=0) as f:
+        f.seek(start)
+        for chunk in _chunks(f, chunk_size, size):
+            summary = combine(summary, summarize(chunk, max_length), max_length)
+
+    return summary
+
+def segmented_long_lines(path, max_length, segment_size=None, jobs=None, chunk_size=None):
+    """
+    :param string path: The path of a file.
+
+    :param int max_length: The maximum length of a line, in characters.
+
+    :param int segment_size: Optional. The number of bytes in each segment.
+                             Defaults to :data:`SEGMENT_SIZE`.
+
+    :param int jobs: Optional. The number of worker processes. Defaults to
+                     :data:`JOBS`.
+
+    :param int chunk_size: Optional. Defaults to :data:`CHUNK_SIZE`.
+
+    Yields the same results as :func:`~linelength.long_lines()`, after
+    splitting ``path`` into segments of ``segment_size`` bytes at arbitrary
+    byte offsets, and summarizing the segments concurrently in a pool of
+    worker processes. Lines that span segments, and the line numbers of every
+    segment, are reconciled when combining the summaries in order.
+    """
+    if segment_size is None:
+        segment_size = SEGMENT_SIZE
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+
+    size = os.path.getsize(path)
+    if size <= segment_size:
+        for violation in long_lines(path, max_length, chunk_size):
+            yield violation
+        return
+
+    segments = [ (path, start, min(segment_size, size - start), max_length, chunk_size)
+                 for start in range(0, size, segment_size) ]
+
+    logger.info('scanning {0} in {1} segments.'.format(path, len(segments)))
+    for violation in _fold(_map(_summarize_segment, segments, lambda segment: segment[2], jobs), max_length):
+        yield violation
+
+def line_index(path, max_length, segment_size=None):
+    """
+    :param string path: The path of a file.
+
+    :param int max_length: The smallest line length that the index must be
+                           able to answer.
+
+    :param int segment_size: Optional. If specified, scan ``path`` with
+                             :func:`~linelength.segmented_long_lines()`.
+
+    :returns: The line index of ``path``, as a four-tuple of the floor, the
+              length of the longest line (or the floor, if no line is
+              longer), and two arrays of the line numbers and lengths of
+              every line longer than the floor, in order.
+
+    Returns the stored index if the file's fingerprint is unchanged and the
+    stored floor is no larger than ``max_length``. Otherwise scans the file,
+    with a floor of the smaller of ``max_length`` and :data:`FLOOR`, and
+    stores the index unless the file changed too recently.
+    """
+    fp = snapshot.current_fingerprint(path)
+
+    index = indexes.get(fp)
+    if index is not None and index[0] <= max_length:
+        return index
+
+    floor = min(max_length, FLOOR)
+    if index is not None:
+        floor = min(floor, index[0])
+
+    if segment_size is None:
+        found = long_lines(path, floor)
+    else:
+        found = segmented_long_lines(path, floor, segment_size)
+
+    lines = array('L')
+    lengths = array('L')
+    for ln, length in found:
+        lines.append(ln)
+        lengths.append(length)
+
+    index = (floor, max(lengths) if lengths else floor, lines, lengths)
+    if fingerprint(path) == fp and cacheable(fp):
+        indexes.set(fp, index)
+    else:
+        logger.debug('not storing the line index of recently modified file {0}'.format(path))
+
+    return index
+
+def indexed_long_lines(path, max_length, segment_size=None):
+    """
+    :returns: A list of two-tuples of the line number and length of every
+              line in ``path`` longer than ``max_length``, from the
+              :func:`~linelength.line_index()` of ``path``.
+    """
+    floor, longest, lines, lengths = line_index(path, max_length, segment_size)
+    if longest <= max_length:
+        return []
+
+    return [ (ln, length) for ln, length in zip(lines, lengths) if length > max_length ]
+
+def changed_long_lines(path, max_length, ranges):
+    """
+    :param string path: The path of a file.
+
+    :param int max_length: The maximum length of a line, in characters.
+
+    :param list ranges: Sorted two-tuples of the first and last line numbers
+                        of changed lines, as returned by
+                        :func:`~gitdiff.changed_lines()`, or ``None`` if every
+                        line changed.
+
+    :returns: A list of two-tuples of the line number and length of every
+              changed line in ``path`` longer than ``max_length``.
+
+    Counts newlines up to the last changed line, a chunk at a time, and only
+    measures the long lines in ``ranges``; stops reading after the last
+    range, rather than scanning the whole file.
+    """
+    if ranges is None:
+        return indexed_long_lines(path, max_length)
+    elif not ranges:
+        return []
+
+    return [ (ln, length) for ln, length in long_lines(path, max_length, until=ranges[-1][1])
+             if in_ranges(ln, ranges) ]
+
+def first_long_line(path, max_length, segment_size=None):
+    """
+    :param int segment_size: Optional. If specified, scan ``path`` in
+                             segments of ``segment_size`` bytes in parallel,
+                             with :func:`~linelength.segmented_long_lines()`.
+
+    :returns: The line number of the first line in ``path`` longer than
+              ``max_length`` characters, or ``None``.
+    """
+    for ln, length in indexed_long_lines(path, max_length, segment_size):
+        logger.debug('line {0} of {1} is {2} characters long.'.format(ln, path, length))
+        return ln
+
+    return None
+
+def _map(func, items, weight, jobs=None):
+    # yields func(item) for every item, in order, from a process pool with a
+    # bounded number of items in flight. weight(item) is the size of an item
+    # in bytes: small work runs here, and the pool is no larger than the
+    # number of items.
+    if jobs is None:
+        jobs = JOBS
+
+    items = iter(items)
+    ahead = []
+    total = 0
+    if jobs > 1 and not current_process().daemon:
+        for item in items:
+            ahead.append(item)
+            total += weight(item)
+            if (total >= POOL_BYTES and len(ahead) >= jobs) or len(ahead) >= LOOKAHEAD:
+                break
+        else:
+            # every item is in ahead.
+            jobs = min(jobs, len(ahead))
+            if total < POOL_BYTES:
+                jobs = 1
+
+    items = chain(ahead, items)
+    if jobs < 2 or current_process().daemon:
+        for item in items:
+            yield func(item)
+        return
+
+    pool = Pool(jobs)
+    pending = deque()
+    complete = False
+    try:
+        for item in items:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= jobs * WINDOW:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+        complete = True
+    finally:
+        if complete:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+def _scan(job):
+    path, max_length = job
+    return path, indexed_long_lines(path, max_length)
+
+def _scan_size(job):
+    try:
+        return snapshot.current_fingerprint(job[0])[2]
+    except OSError:
+        return 0
+
+def scan_files(paths, max_length, jobs=None):
+    """
+    :param iterable paths: The paths of files.
+
+    :param int max_length: The maximum length of a line, in characters.
+
+    :param int jobs: Optional. The number of worker processes. Defaults to
+                     :data:`JOBS`.
+
+    :returns: A sorted list of three-tuples of the path, line number and
+              length of every line longer than ``max_length`` in any of
+              ``paths``.
+
+    Scans files in a :class:`~python:multiprocessing.pool.Pool`, with at most
+    :data:`WINDOW` files per worker submitted ahead of the collected results,
+    so that a very large ``paths`` iterator is consumed as the scan
+    proceeds. Scans files in the current process when ``jobs`` is ``1``,
+    when the files hold fewer than :data:`POOL_BYTES` bytes in total, or
+    when running within a daemonic process (e.g. a worker of
+    :class:`~multi.ProcessTestRunner`), which cannot start processes. The
+    pool has no more workers than there are files.
+    """
+    found = []
+    n = 0
+    for path, lines in _map(_scan, ((path, max_length) for path in paths), _scan_size, jobs):
+        found.extend((path, ln, length) for ln, length in lines)
+        n += 1
+
+    logger.info('found {0} long lines in {1} files.'.format(len(found), n))
+    return sorted(found)
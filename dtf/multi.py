@@ -20,14 +20,24 @@ For most moderate deployments, running tests in serial will out perform any of
 the methods provided here. However, because the workloads of tests are not
 uniform, and good test performance is crucial for usability, :mod:`dtf` provides
 these options, largely for testing and research.
+
+Every runner records the duration of each test in :mod:`history`, and when
+it runs the whole :attr:`~core.TestRunner.queue`, submits the tests that
+took the longest in previous runs first. See
+:meth:`~multi.PoolTestRunner.schedule()`.
 """
 
 from __future__ import absolute_import
 
 from dtf.err import DtfMissingOptionalDependency
 from dtf.core import MultiTestRunner
+from dtf.results import results
+from dtf import history
 
+import os
+import time
 import logging
+from collections import OrderedDict, deque
 
 logger = logging.getLogger(__name__)
 
@@ -50,8 +60,81 @@ class PoolTestRunner(MultiTestRunner):
         super(PoolTestRunner, self).__init__(test_paths)
         self.pool_size = pool_size
         "The size of the worker thread pool used to run tests."
+
+        self.durations = {}
+        "The duration, in seconds, of each test of the last run."
+
+        self.predicted = None
+        "The predicted duration of the last run, or ``None`` if not scheduled."
+
+        self.makespan = None
+        "The duration of the last run, from the first submission to the last result."
+
         logger.info('initiated a pool-based TestRunner instance. Pool Size: {0}'.format(str(pool_size)))
 
+    def schedule(self):
+        """
+        :returns: The items of :attr:`~core.TestRunner.queue`, in the order
+                  that the runner should submit them.
+
+        Orders the tests longest first, by the durations in
+        :data:`history.durations`, or estimated from the size of their
+        inputs (see :class:`~history.Estimator`), and sets
+        :attr:`~multi.PoolTestRunner.predicted`.
+        """
+        estimator = history.Estimator(self.queue, self.suite)
+        jobs, self.predicted = history.lpt(self.queue, self.pool_size, estimator.cost)
+        logger.info('scheduled {0} tests longest first. predicted duration {1:.2f}s.'.format(len(jobs), self.predicted))
+        return jobs
+
+    @property
+    def suite(self):
+        "The absolute :attr:`~core.TestRunner.test_paths`, which tell suites apart in :mod:`history`."
+        return tuple(os.path.abspath(p) for p in self.test_paths)
+
+    def _start(self, jobs):
+        # jobs passed in (e.g. streamed as they load) run in the order given.
+        self.durations = {}
+        self.kinds = {}
+        self.predicted = None
+        if jobs is None:
+            jobs = self.schedule()
+
+        self.started = time.time()
+        return self._note(jobs)
+
+    def _note(self, jobs):
+        # remembers the type of each test, for its key in history.
+        for j in jobs:
+            self.kinds[j[1]] = j[0]
+            yield j
+
+    def _record(self, result):
+        name, seconds = result
+        self.durations[name] = seconds
+
+    def _timed(self, func, name, spec):
+        # records tests that raise, as well as tests that report a result.
+        start = time.time()
+        try:
+            func(name, spec)
+        finally:
+            self._record((name, time.time() - start))
+
+    def _finish(self):
+        self.makespan = time.time() - self.started
+        history.record(dict(((self.kinds.get(name), name), seconds) for name, seconds in self.durations.items()),
+                       self.suite)
+        logger.info(self.stats())
+
+    def stats(self):
+        ":returns: A summary of the predicted and actual duration of the last run."
+        msg = 'ran {0} tests in {1:.2f}s'.format(len(self.durations), self.makespan or 0.0)
+        if self.predicted is None:
+            return msg + '.'
+        else:
+            return msg + ', predicted {0:.2f}s.'.format(self.predicted)
+
 class ThreadedTestRunner(PoolTestRunner):
     """
     Uses the :mod:`threadpool` module to run a suite of tests with a pool of
@@ -59,9 +142,17 @@ class ThreadedTestRunner(PoolTestRunner):
     most of the time reading files and computing hashes, which may be common for
     some suites. See :class:`~multi.ProcessTestRunner()` for an alternate
     parallelism strategy.
+
+    The runner for :option:`dtf --multi` ``threadpool``. ``thread`` uses
+    :class:`~multi.FuturesTestRunner()`, which reports the exceptions that
+    tests raise and supports timeouts.
     """
-    def run(self):
+    def run(self, jobs=None):
         """
+        :param iterable jobs: Optional. Items of :attr:`~core.TestRunner.queue`
+                              to run. Defaults to :attr:`~core.TestRunner.queue`,
+                              in the order of :meth:`~multi.PoolTestRunner.schedule()`.
+
         Runs all tests in the :attr:`~core.TestRunner.queue` list using a thread
         pool to run all tests concurrently.
         """
@@ -72,14 +163,209 @@ class ThreadedTestRunner(PoolTestRunner):
 
         logger.info('running tests in using a threadpool.')
 
+        jobs = self._start(jobs)
         pool = threadpool.ThreadPool(self.pool_size)
 
-        for j in self.queue:
-            job = threadpool.WorkRequest(self.case_definition.get(j[0]), args=(j[1], j[2]))
+        for j in jobs:
+            job = threadpool.WorkRequest(self._timed, args=(self.case_definition.get(j[0]), j[1], j[2]))
             pool.putRequest(job)
 
         logger.info('pool seeded. waiting for workers to complete.')
         pool.wait()
+        self._finish()
+
+def _raised(error):
+    return 'raised {0}: {1}'.format(type(error).__name__, error)
+
+def _run_case(func, name, spec):
+    # runs in a worker: returns the result the case reported, which only
+    # exists in the worker when the worker is a process. a test that raises
+    # fails, and still has a duration.
+    start = time.time()
+    try:
+        func(name, spec)
+    except Exception as e:
+        logger.debug('test {0} raised {1}'.format(name, repr(e)))
+        return name, time.time() - start, { 'status': False, 'msg': _raised(e) }
+
+    return name, time.time() - start, results.results.get(name)
+
+class FuturesTestRunner(PoolTestRunner):
+    """
+    :param list test_paths: Defaults to an empty list. Passes through to
+                            :attr:`~core.TestRunner.test_paths`.
+
+    :param int pool_size: Defaults to ``2``. The number of workers.
+
+    :param float timeout: Optional. The default for
+                          :attr:`~multi.FuturesTestRunner.timeout`.
+
+    Runs tests with a :mod:`python:concurrent.futures`
+    :class:`~python:concurrent.futures.ThreadPoolExecutor`. The runner for
+    :option:`dtf --multi` ``thread``. On Python 2, requires the ``futures``
+    package.
+
+    The runner keeps at most :attr:`~multi.FuturesTestRunner.window` tests
+    in the executor, and collects the result of each test as it completes:
+
+    - a test that raises an exception fails, with the exception as its
+      message.
+
+    - a test that runs for longer than its timeout fails. Python cannot
+      stop a running thread or worker, so the test continues in the
+      background, but the run does not wait for it, and the timeout is
+      its final result (see :attr:`~results.DtfResults.final`).
+
+    - with :option:`dtf --fatal`, the first failure, or
+      :meth:`~multi.FuturesTestRunner.cancel()`, cancels the tests that
+      have not started.
+    """
+
+    poll_interval = 0.1
+    "The number of seconds between checks for tests that timed out."
+
+    def __init__(self, test_paths=[], pool_size=2, timeout=None):
+        super(FuturesTestRunner, self).__init__(test_paths, pool_size)
+
+        self.timeout = timeout
+        """The number of seconds after which a running test fails, or
+        ``None``. A ``timeout`` key in a test specification overrides this
+        value for the test."""
+
+        self.window = pool_size * 4
+        "The number of tests submitted to the executor at once."
+
+        self.cancelled = False
+        "``True`` after :meth:`~multi.FuturesTestRunner.cancel()`."
+
+        self.timed_out = []
+        "The names of the tests of the last run that timed out."
+
+    def cancel(self):
+        "Stops submitting tests, and cancels the submitted tests that have not started."
+        self.cancelled = True
+
+    def _executor(self):
+        try:
+            from concurrent import futures
+        except ImportError:
+            raise DtfMissingOptionalDependency('futures')
+
+        return futures, futures.ThreadPoolExecutor(self.pool_size)
+
+    def _complete(self, future, name):
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is not None:
+            logger.debug('test {0} raised {1}'.format(name, repr(error)))
+            results.add(name, False, _raised(error))
+        else:
+            name, seconds, result = future.result()
+            self._record((name, seconds))
+            if result is not None:
+                with results.lock:
+                    if name not in results.final:
+                        results.results[name] = result
+
+        if results.fatal is True and results.results.get(name, {}).get('status') is False:
+            self.cancel()
+
+    def _expire(self, pending, running, now):
+        # executors mark a few queued tests as running before a worker takes
+        # them: only start the clock of as many tests as there are free
+        # workers, in order of submission. abandoned tests keep their worker.
+        self._abandoned = [ future for future in self._abandoned if not future.done() ]
+
+        for future, (name, timeout) in list(pending.items()):
+            if future not in running:
+                if future.running() and len(running) + len(self._abandoned) < self.pool_size:
+                    running[future] = now
+                continue
+
+            if timeout is not None and now - running[future] > timeout:
+                self._record((name, now - running[future]))
+                del pending[future]
+                del running[future]
+                self._abandoned.append(future)
+                self.timed_out.append((name, timeout))
+                results.add(name, False, 'timed out after {0}s.'.format(timeout))
+                results.final.add(name)
+                logger.warning('test {0} timed out after {1}s'.format(name, timeout))
+
+                if results.fatal is True:
+                    self.cancel()
+
+    def run(self, jobs=None):
+        """
+        :param iterable jobs: Optional. Items of :attr:`~core.TestRunner.queue`
+                              to run, e.g. from
+                              :meth:`~core.MultiTestRunner.iter_load()`.
+                              Defaults to :attr:`~core.TestRunner.queue`,
+                              in the order of :meth:`~multi.PoolTestRunner.schedule()`.
+
+        Runs the tests in an executor, and adds their results to
+        :data:`~results.results` as they complete.
+        """
+        futures, executor = self._executor()
+        logger.info('running tests in a thread executor with {0} workers.'.format(self.pool_size))
+
+        jobs = iter(self._start(jobs))
+        self.cancelled = False
+        self.timed_out = []
+        self._abandoned = []
+
+        pending = OrderedDict()
+        running = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and not self.cancelled and len(pending) < self.window:
+                    try:
+                        j = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    results.final.discard(j[1])
+                    future = executor.submit(_run_case, self.case_definition.get(j[0]), j[1], j[2])
+                    pending[future] = (j[1], j[2].get('timeout', self.timeout))
+                    logger.debug('submitted {0} to the executor'.format(j[1]))
+
+                if self.cancelled:
+                    for future in list(pending):
+                        if future.cancel():
+                            del pending[future]
+
+                if not pending:
+                    break
+
+                if any(timeout is not None for name, timeout in pending.values()):
+                    poll = self.poll_interval
+                else:
+                    poll = None
+
+                done, waiting = futures.wait(pending, poll, futures.FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future, None)
+                    self._complete(future, pending.pop(future)[0])
+
+                self._expire(pending, running, time.time())
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+            raise
+
+        executor.shutdown(wait=not self._abandoned)
+        self._finish()
+
+    def stats(self):
+        msg = super(FuturesTestRunner, self).stats()
+        if self.timed_out:
+            msg += ' {0} tests timed out.'.format(len(self.timed_out))
+        return msg
 
 class ProcessTestRunner(PoolTestRunner):
     """
@@ -91,21 +377,60 @@ class ProcessTestRunner(PoolTestRunner):
     Theoretically the :mod:`multiprocessing` approach has more overhead than
     :mod:`threading`; however, in cases where the performance bottlenecks are
     due to the interpreter lock, this approach may afford better performance.
+    The same number of processes parse test specifications; see
+    :attr:`~core.MultiTestRunner.parse_jobs`.
     """
-    def run(self):
+    def __init__(self, test_paths=[], pool_size=2):
+        super(ProcessTestRunner, self).__init__(test_paths, pool_size)
+        self.parse_jobs = pool_size
+
+        self.window = pool_size * 4
+        "The number of tests submitted to the pool at once."
+
+    def _collect(self, result):
+        # results that cases report in a worker exist only in that worker.
+        name, seconds, result = result
+        self._record((name, seconds))
+        if result is not None:
+            with results.lock:
+                results.results[name] = result
+
+    def _failed(self, name, error):
+        # the pool could not run the test, e.g. its spec does not pickle.
+        logger.debug('test {0} raised {1}'.format(name, repr(error)))
+        results.add(name, False, _raised(error))
+
+    def run(self, jobs=None):
         """
+        :param iterable jobs: Optional. Items of :attr:`~core.TestRunner.queue`
+                              to run, e.g. from
+                              :meth:`~core.MultiTestRunner.iter_load()`.
+                              Defaults to :attr:`~core.TestRunner.queue`,
+                              in the order of :meth:`~multi.PoolTestRunner.schedule()`.
+
         Runs all tests in :attr:`~core.TestRunner.queue` using a pool of
-        independent Python processes to run all tests concurrently.
+        independent Python processes to run all tests concurrently, and
+        adds the result of each test to :data:`~results.results` as it
+        completes. Keeps at most :attr:`~multi.ProcessTestRunner.window`
+        tests in the pool, so that the pool does not hold every test of a
+        streamed ``jobs`` at once.
         """
 
         from multiprocessing import Pool
 
+        jobs = self._start(jobs)
         p = Pool(self.pool_size)
 
         logger.info('running tests in using multiprocesing worker pool.')
 
-        for j in self.queue:
-            p.apply_async(self.case_definition.get(j[0]), (j[1], j[2]))
+        pending = deque()
+        for j in jobs:
+            if len(pending) >= self.window:
+                pending.popleft().wait()
+
+            pending.append(p.apply_async(_run_case, (self.case_definition.get(j[0]), j[1], j[2]),
+                                         callback=self._collect,
+                                         error_callback=lambda error, name=j[1]: self._failed(name, error)))
 
             logger.debug("adding {0} to worker queue".format(j[1]))
 
@@ -114,6 +439,7 @@ class ProcessTestRunner(PoolTestRunner):
         logger.info('waiting for jobs to complete.')
         p.join()
         logger.info('worker queue complete.')
+        self._finish()
 
 class EventTestRunner(PoolTestRunner):
     """
@@ -122,8 +448,12 @@ class EventTestRunner(PoolTestRunner):
     overhead in addition to running tests in serial, but may provide the same
     benefits as :class:`~multi.ThreadedTestRuner()` with lower overhead.
     """
-    def run(self):
+    def run(self, jobs=None):
         """
+        :param iterable jobs: Optional. Items of :attr:`~core.TestRunner.queue`
+                              to run. Defaults to :attr:`~core.TestRunner.queue`,
+                              in the order of :meth:`~multi.PoolTestRunner.schedule()`.
+
         Runs all tests in :attr:`~core.TestRunner.queue` using a pool of
         greenlets to run tests concurrently.
         """
@@ -135,8 +465,12 @@ class EventTestRunner(PoolTestRunner):
             raise DtfMissingOptionalDependency('gevent')
 
         logger.info('running dtf tests using a gevent-based (micro) thread pool.')
+        jobs = self._start(jobs)
         p = Pool(self.pool_size)
 
-        for j in self.queue:
+        for j in jobs:
             logger.debug('adding {0} to the job queue'.format(j[1]))
-            p.spawn(self.case_definition.get(j[0]), j[1], j[2])
+            p.spawn(self._timed, self.case_definition.get(j[0]), j[1], j[2])
+
+        p.join()
+        self._finish()
@@ -0,0 +1,206 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`registry` finds case modules without importing them, so that
+:class:`~core.MultiCaseDefinition` only imports the modules that the queued
+tests use, the first time a test needs each one.
+
+Cases come from two places:
+
+- the ``.py`` files in the case directories (see :option:`dtf --casedir`).
+  :func:`~registry.discover()` stores the files found in each directory in a
+  :class:`~cache.DtfCache`, along with the :func:`~cache.fingerprint()` of
+  every directory it listed. Adding, removing or renaming a file changes the
+  modification time of its directory, so while every fingerprint matches,
+  later runs reuse the stored list rather than walking the directory.
+
+- installed packages that register cases under the :data:`ENTRY_POINT_GROUP`
+  entry point group, e.g. in ``setup.py``:
+
+  .. code-block:: python
+
+     entry_points={ 'dtf.cases': [ 'spelling = mypackage.spelling' ] }
+
+  The name of the entry point is the case name, i.e. the ``type`` of tests.
+  The entry point may name a module, whose ``main()`` implements the case,
+  or the callable itself. Case directories take precedence over entry
+  points, which :mod:`dtf` only reads for types not found in a case
+  directory.
+"""
+
+from __future__ import absolute_import
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+from dtf.ignore import IGNORE_FILE
+from dtf.utils import expand_tree
+
+registries = DtfCache('registry', max_entries=64)
+"The :class:`~cache.DtfCache` that holds the case modules of each case directory."
+
+ENTRY_POINT_GROUP = 'dtf.cases'
+"The entry point group of installed case packages."
+
+FORMAT = 1
+"Increment to invalidate all stored registries when their meaning changes."
+
+def _unchanged(stamps):
+    for path, fp in stamps:
+        try:
+            if fingerprint(path) != fp:
+                return False
+        except OSError:
+            return False
+    return True
+
+def discover(path):
+    """
+    :param string path: A case directory.
+
+    :returns: A list of the paths of the ``.py`` files beneath ``path``, in
+              the order of :func:`~utils.expand_tree()`.
+
+    Reuses the list stored by a previous run when no directory beneath
+    ``path``, or ``.dtfignore`` file within them, changed since.
+    """
+    key = (FORMAT, os.path.abspath(path))
+
+    saved = registries.get(key)
+    if saved is not None and _unchanged(saved[0]):
+        logger.debug('using the stored registry of cases in {0}'.format(path))
+        return saved[1]
+
+    visited = []
+    files = list(expand_tree(path, 'py', visited=visited))
+
+    stamps = []
+    try:
+        for d in visited:
+            stamps.append((d, fingerprint(d)))
+            ignore_file = os.path.join(d, IGNORE_FILE)
+            if os.path.isfile(ignore_file):
+                stamps.append((ignore_file, fingerprint(ignore_file)))
+    except OSError:
+        return files
+
+    if all(cacheable(fp) for d, fp in stamps):
+        registries.set(key, (stamps, files))
+    logger.debug('found {0} case modules in {1}'.format(len(files), path))
+
+    return files
+
+def entry_points(group=ENTRY_POINT_GROUP):
+    """
+    :param string group: Optional. The name of an entry point group.
+
+    :returns: A dictionary of the names and entry point objects of the
+              entry points in ``group`` of every installed distribution,
+              or an empty dictionary if neither
+              :mod:`python:importlib.metadata` nor :mod:`pkg_resources` is
+              available.
+    """
+    try:
+        from importlib.metadata import entry_points as installed
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return {}
+        return dict((ep.name, ep) for ep in pkg_resources.iter_entry_points(group))
+
+    eps = installed()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group)
+    else:
+        eps = eps.get(group, [])
+
+    return dict((ep.name, ep) for ep in eps)
+
+def entry_point_module(ep):
+    ":returns: The name of the module that the entry point ``ep`` names."
+    if hasattr(ep, 'value'):
+        return ep.value.split(':')[0].strip()
+    else:
+        return ep.module_name
+
+def load_entry_point(ep):
+    ":returns: The case callable that the entry point ``ep`` names."
+    case = ep.load()
+    return getattr(case, 'main', case)
+
+class CaseRegistry(dict):
+    """
+    :param definition: The :class:`~core.CaseDefinition` that owns the
+                       registry.
+
+    A dictionary of case names and callables, used as
+    :attr:`~core.CaseDefinition.cases`, that imports each case module the
+    first time it is looked up: with ``[]``, :meth:`get()` or ``in``.
+    Iterating over the registry only produces the cases already imported.
+    """
+
+    def __init__(self, definition):
+        super(CaseRegistry, self).__init__()
+        self.definition = definition
+
+        self.entry_points = None
+        "The installed case entry points, read the first time a case is not found."
+
+    @property
+    def modules(self):
+        "The set of names of the modules of every known case, imported or not."
+        names = set(self.definition.modules)
+        names.update(getattr(func, '__module__', None) for func in self.values())
+        return names
+
+    def _installed(self):
+        if self.entry_points is None:
+            self.entry_points = entry_points()
+            logger.debug('found {0} installed case entry points'.format(len(self.entry_points)))
+        return self.entry_points
+
+    def _find(self, name):
+        return name in self.definition.modules or name in self._installed()
+
+    def __missing__(self, name):
+        if name in self.definition.modules:
+            self.definition._load_case(name, self.definition.modules[name])
+        elif self._find(name):
+            ep = self.entry_points[name]
+            self[name] = load_entry_point(ep)
+            logger.debug('loaded case named "{0}" from {1}'.format(name, entry_point_module(ep)))
+        else:
+            raise KeyError(name)
+
+        return dict.__getitem__(self, name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or self._find(name)
+
+    def __bool__(self):
+        # true if any case is available, without importing it.
+        return dict.__len__(self) > 0 or bool(self.definition.modules) or bool(self._installed())
+
+    __nonzero__ = __bool__
@@ -0,0 +1,222 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`resultcache` lets a suite reuse the results of tests that have not
+changed since a previous run, rather than running their cases again.
+
+The key of a stored result covers everything that can change the outcome of
+a test: the test's name and specification, the source of the case module that
+implements its ``type`` (and of the other case modules it uses), and the
+:func:`~cache.fingerprint()` of every file and directory beneath the test's
+inputs (see :func:`~utils.spec_inputs()`), as recorded by the active
+:class:`~snapshot.Snapshot`. Tests with inputs outside the snapshot, or with
+inputs modified too recently to trust their fingerprint, are never stored.
+For tests with a git ``base`` (e.g. ``line_length``), the key also covers the
+commit that ``base`` resolves to (see :func:`~gitdiff.resolve()`), so that
+moving a branch invalidates their results.
+
+By default, only passing results are stored, so failing tests always run.
+Disable the cache with :option:`dtf --no-cache`.
+"""
+
+from __future__ import absolute_import
+
+import sys
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf import __version__
+from dtf import snapshot, gitdiff
+from dtf.err import DtfException
+from dtf.cache import DtfCache, cacheable
+from dtf.digest import file_digest
+from dtf.utils import spec_inputs
+
+stored = DtfCache('result')
+"The :class:`~cache.DtfCache` that holds test results between runs."
+
+FORMAT = 1
+"Increment to invalidate all stored results when their meaning changes."
+
+def spec_digest(name, test_spec):
+    ":returns: A digest of the name and content of a test specification."
+    data = json.dumps([name, test_spec], sort_keys=True, default=repr)
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+def case_sources(definitions, case):
+    """
+    :param dict definitions: A dictionary of case names and callables, as in
+                             :attr:`~core.TestRunner.case_definition`.
+
+    :param string case: The name of a case.
+
+    :returns: A sorted list of the source files of the module that implements
+              ``case``, and of every other case module that it uses.
+    """
+    modules = getattr(definitions, 'modules', None)
+    if modules is None:
+        modules = set(getattr(func, '__module__', None) for func in definitions.values())
+
+    seen = set()
+    sources = []
+    pending = [ getattr(definitions.get(case), '__module__', None) ]
+    while pending:
+        name = pending.pop()
+        if name in seen or name not in sys.modules:
+            continue
+        seen.add(name)
+
+        module = sys.modules[name]
+        path = getattr(module, '__file__', None)
+        if path is not None:
+            if path.endswith(('.pyc', '.pyo')):
+                path = path[:-1]
+            sources.append(path)
+
+        for value in list(vars(module).values()):
+            dependency = getattr(value, '__module__', None)
+            if dependency in modules and dependency not in seen:
+                pending.append(dependency)
+
+    return sorted(sources)
+
+def input_stamps(test_spec):
+    """
+    :returns: A sorted list of the paths and fingerprints of all inputs of
+              ``test_spec``, or ``None`` if the active snapshot does not
+              cover them all.
+    """
+    if snapshot.current is None:
+        return None
+
+    stamps = []
+    for path in spec_inputs(test_spec):
+        if not snapshot.current.covers(path):
+            return None
+        stamps.extend(snapshot.current.stamps(path))
+
+    return sorted(stamps)
+
+class ResultCache(object):
+    """
+    :param dict definitions: A dictionary of case names and callables, as in
+                             :attr:`~core.TestRunner.case_definition`.
+
+    Reuses and stores the results of the tests in a
+    :attr:`~core.TestRunner.queue`.
+    """
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+
+        self.failures = False
+        "If ``True``, store failing results as well as passing results."
+
+        self.hits = 0
+        "The number of results reused."
+
+        self.misses = 0
+        "The number of tests that must run."
+
+        self.keys = {}
+        "A dictionary of the keys of queued tests, in the form ``{ <name>: <key> }``."
+
+    def key(self, job):
+        """
+        :param tuple job: An item of :attr:`~core.TestRunner.queue`.
+
+        :returns: The key of the stored result of ``job``, or ``None`` if its
+                  result cannot be stored.
+        """
+        case, name, test_spec = job
+
+        inputs = input_stamps(test_spec)
+        if inputs is None or not all(cacheable(fp) for path, fp in inputs):
+            return None
+
+        sources = case_sources(self.definitions, case)
+        if not sources:
+            return None
+
+        base = test_spec.get('base') if isinstance(test_spec, dict) else None
+        if base is not None:
+            try:
+                base = gitdiff.resolve(base)
+            except DtfException:
+                return None
+
+        h = hashlib.md5()
+        h.update(repr((FORMAT, __version__, inputs, base)).encode('utf-8'))
+        try:
+            for path in sources:
+                h.update(file_digest(path).encode('utf-8'))
+        except (IOError, OSError):
+            return None
+
+        return (case, spec_digest(name, test_spec), h.hexdigest())
+
+    def reuse(self, queue, results):
+        """
+        :param list queue: A :attr:`~core.TestRunner.queue`.
+
+        :param results: The :class:`~results.DtfResults` object.
+
+        :returns: The set of names of the tests in ``queue`` that must run.
+
+        Adds the stored result of every other test to ``results``.
+        """
+        pending = set()
+        for job in queue:
+            name = job[1]
+            key = self.key(job) if stored.enabled else None
+            result = None if key is None else stored.get(key)
+
+            if result is None:
+                self.keys[name] = key
+                pending.add(name)
+                self.misses += 1
+            else:
+                results.add(name, result['status'], result['msg'])
+                for k, v in result.items():
+                    if k not in ('status', 'msg'):
+                        results.extend(name, k, v)
+                self.hits += 1
+
+        logger.info(self.stats())
+        return pending
+
+    def save(self, results):
+        """
+        :param results: The :class:`~results.DtfResults` object.
+
+        Stores the results of the tests that ran, for reuse in later runs.
+        """
+        n = 0
+        for name, key in self.keys.items():
+            result = results.results.get(name)
+            if key is None or result is None:
+                continue
+            elif result['status'] is True or self.failures is True:
+                stored.set(key, dict(result))
+                n += 1
+
+        logger.info('stored {0} test results.'.format(n))
+
+    def stats(self):
+        ":returns: A summary of the cache hits and misses of the run."
+        return 'reused {0} of {1} test results from the cache.'.format(self.hits, self.hits + self.misses)
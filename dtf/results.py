@@ -15,19 +15,18 @@
 from __future__ import absolute_import
 
 from threading import Lock
-from dtf.dtf import VERBOSE, FATAL, PASSING
-from dtf.utils import set_or_default
+from dtf.err import DtfException
 
 class DtfResults(object):
     def __init__(self, verbose=None, fatal=None, passing=None):
         """An interface to capture and report results from DtfCases."""
-        self.verbose = set_or_default(verbose, VERBOSE)
+        self.verbose = bool(verbose)
         "If ``True`` return verbose results."
 
-        self.fatal = set_or_default(fatal, FATAL)
+        self.fatal = bool(fatal)
         "If ``True``, die on test failure"
 
-        self.passing = set_or_default(passing, PASSING)
+        self.passing = bool(passing)
         "If ``True`` attempt to return passing test cases."
 
         self.results = {}
@@ -38,6 +37,10 @@ class DtfResults(object):
 
         self.sync = False
         "When true, call :meth:`~DtfResults.response() immediately.`"
+
+        self.final = set()
+        """The names of tests whose results no longer change: e.g. tests that
+        timed out, but continue to run in the background."""
         
     def add(self, name, result, msg):
         """
@@ -47,12 +50,15 @@ class DtfResults(object):
 
         :param string msg: A string with a human readable note about the outcome of the test.
 
-        Adds current test results to the internal results structure.
+        Adds current test results to the internal results structure. Ignores
+        tests in :attr:`~results.DtfResults.final`.
         """
 
         # results are a Tuple of a Boolean (pass/fail) and a message. 
 
         with self.lock:
+            if name in self.final:
+                return
             self.results[name] = { 'status': result, 'msg': msg }
 
         if self.sync: 
@@ -78,10 +84,12 @@ class DtfResults(object):
 
         if name not in self.results:
             raise DtfException('{0} must already exist in results array to extend.')
+        elif name in self.final:
+            return
 
         self.results[name][key] = value
 
-        if key is 'passing' and self.sync:
+        if key == 'passing' and self.sync:
             self.response_spec(name, value)
 
     update = extend
@@ -129,15 +137,25 @@ class DtfResults(object):
             print("# passing document for: {0}.yaml".format(name))
             print('{0}...'.format(data))
 
-    def render(self):
+    def render(self, names=None):
         """
+        :param iterable names: Optional. If specified, only render the results
+                               of the tests in ``names``.
+
         Calls :meth:`~results.DtfResults.response()` and
         :meth:`~results.DtfResults.response_spec()` (as needed) for every result
         in :attr:`~results.DtfResults.results`.
         """
 
-        for k, v in self.results.iteritems():
+        for k, v in list(self.results.items()):
+            if names is not None and k not in names:
+                continue
+
             self.response(k, v['status'], v['msg'])
         
             if 'passing' in v:
                 self.response_spec(k, v['passing'])
+
+results = DtfResults()
+"""The :class:`~results.DtfResults` of the current run, which cases report to.
+:meth:`~context.RunContext.configure()` sets its options."""
@@ -0,0 +1,348 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`snapshot` records the state of every file and directory that the tests
+in a run refer to, so that tests share one walk of the file system instead of
+each listing, stating, and hashing the same paths.
+
+A :class:`~snapshot.Snapshot` walks its roots once, and holds a manifest of
+the :func:`~cache.fingerprint()` of every file, the entries of every
+directory, and the digests that tests compute while the run proceeds. While a
+snapshot is active (see :func:`~snapshot.activate()`),
+:func:`~utils.expand_tree()`, :func:`~utils.count_directory()` and
+:func:`~digest.file_digest()` answer from the manifest for any path beneath
+its roots.
+
+Like :func:`~utils.expand_tree()`, a snapshot skips the paths that
+``.dtfignore`` files and :data:`~ignore.DEFAULT_PATTERNS` exclude (e.g.
+``.git/``): it records their names in the listing of their directory, but
+does not stat ignored files or walk ignored directories.
+
+Snapshots persist in the cache between runs. Refreshing a snapshot against
+the previous one only lists directories whose fingerprint changed, stats
+every file, and keeps the digests of files whose fingerprint is unchanged.
+"""
+
+from __future__ import absolute_import
+
+import os
+import fnmatch
+import logging
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+from dtf import ignore
+
+snapshots = DtfCache('snapshot', max_entries=64)
+"The :class:`~cache.DtfCache` that holds snapshots between runs."
+
+current = None
+"The active :class:`~snapshot.Snapshot`, or ``None``."
+
+def activate(snapshot):
+    """
+    :param snapshot: A :class:`~snapshot.Snapshot`, or ``None`` to deactivate
+                     the current snapshot.
+
+    Makes ``snapshot`` the source of file system information for the
+    remainder of the run.
+    """
+    global current
+    current = snapshot
+    logger.info('activated file system snapshot: {0}'.format(snapshot))
+
+def current_fingerprint(path):
+    """
+    :returns: The fingerprint of ``path`` recorded by the active snapshot, or,
+              for paths outside the snapshot, from :func:`~cache.fingerprint()`.
+    """
+    fp = None
+    if current is not None:
+        fp = current.fingerprint(path)
+
+    if fp is None:
+        fp = fingerprint(path)
+
+    return fp
+
+def list_directory(path):
+    """
+    :param string path: The path of a directory.
+
+    Yields a two-tuple of the name of each entry in ``path`` and ``True`` if
+    the entry is a directory (not following symbolic links.) Uses
+    :func:`python:os.scandir()` where available, to avoid building a list of
+    names and a :func:`python:os.stat()` per entry.
+    """
+    if scandir is None:
+        for name in os.listdir(path):
+            full = os.path.join(path, name)
+            yield name, os.path.isdir(full) and not os.path.islink(full)
+    else:
+        for entry in scandir(path):
+            try:
+                yield entry.name, entry.is_dir(follow_symlinks=False)
+            except OSError:
+                yield entry.name, False
+
+def match_any(name, patterns):
+    """
+    :returns: ``True`` if ``patterns`` is ``None``, or if ``name`` matches
+              any of the glob ``patterns``.
+    """
+    if patterns is None:
+        return True
+
+    for pattern in patterns:
+        if fnmatch.fnmatch(name, pattern):
+            return True
+
+    return False
+
+def _count_listing(path, patterns):
+    # counts a tree that the snapshot did not record, from the file system.
+    n = 0
+    try:
+        for name, is_dir in list_directory(path):
+            if is_dir:
+                n += _count_listing(os.path.join(path, name), patterns)
+
+            if patterns is None or (not is_dir and match_any(name, patterns)):
+                n += 1
+    except OSError:
+        pass
+
+    return n
+
+def _join(path, name):
+    # keeps paths beneath the current directory normalized.
+    if path == os.curdir:
+        return name
+    else:
+        return os.path.join(path, name)
+
+class Snapshot(object):
+    """
+    :param list roots: The files and directories to record. Directories are
+                       recorded recursively.
+
+    Call :meth:`~snapshot.Snapshot.refresh()` to walk the roots.
+    """
+
+    def __init__(self, roots=[]):
+        self.roots = self._reduce(roots)
+        "The normalized, de-duplicated list of roots."
+
+        self.files = {}
+        "A dictionary of the form ``{ <path>: <fingerprint> }``."
+
+        self.dirs = {}
+        """A dictionary of the form ``{ <path>: (<fingerprint>, [ (<name>,
+        <is_dir>), ... ]) }``."""
+
+        self.digests = {}
+        """Digests of files in the snapshot, in the same form as
+        :data:`~digest.table`."""
+
+        self.changed = set()
+        """The paths of files added, removed or modified since the previous
+        snapshot, after :meth:`~snapshot.Snapshot.refresh()`."""
+
+    def __repr__(self):
+        return '<Snapshot: {0} files, {1} directories>'.format(len(self.files), len(self.dirs))
+
+    @staticmethod
+    def _reduce(roots):
+        roots = sorted(set(os.path.normpath(r) for r in roots))
+        reduced = []
+        for root in roots:
+            for parent in reduced:
+                if parent == os.curdir and not os.path.isabs(root):
+                    break
+                elif root.startswith(parent.rstrip(os.sep) + os.sep):
+                    break
+            else:
+                reduced.append(root)
+        return reduced
+
+    @property
+    def key(self):
+        return tuple(os.path.abspath(r) for r in self.roots)
+
+    def load(self):
+        """
+        :returns: The :class:`~snapshot.Snapshot` of the same roots saved by a
+                  previous run, or ``None``.
+        """
+        saved = snapshots.get(self.key)
+        if saved is None:
+            return None
+
+        previous = Snapshot()
+        previous.roots = list(self.roots)
+        previous.files, previous.dirs, previous.digests = saved
+        return previous
+
+    def save(self):
+        "Stores the snapshot for :meth:`~snapshot.Snapshot.refresh()` in the next run."
+        digests = dict((k, v) for k, v in self.digests.items()
+                       if self.files.get(k[0]) == v[0])
+        snapshots.set(self.key, (self.files, self.dirs, digests))
+
+    def refresh(self, previous=None):
+        """
+        :param previous: Optional. A :class:`~snapshot.Snapshot` of the same
+                         roots. Defaults to the result of
+                         :meth:`~snapshot.Snapshot.load()`.
+
+        Walks the roots, reusing the directory listings of ``previous`` for
+        directories whose fingerprint has not changed, and records the paths
+        of all changed files in :attr:`~snapshot.Snapshot.changed`.
+        """
+        if previous is None:
+            previous = self.load()
+        if previous is None:
+            previous = Snapshot()
+
+        self.files = {}
+        self.dirs = {}
+
+        for root in self.roots:
+            try:
+                if os.path.isdir(root):
+                    self._walk(root, previous)
+                else:
+                    self.files[root] = fingerprint(root)
+            except OSError as e:
+                logger.debug('cannot add {0} to snapshot: {1}'.format(root, e))
+
+        self.changed = set(path for path in set(self.files) | set(previous.files)
+                           if self.files.get(path) != previous.files.get(path))
+
+        self.digests = dict((k, v) for k, v in previous.digests.items()
+                            if self.files.get(k[0]) == v[0])
+
+        logger.info('refreshed {0}: {1} changed files.'.format(self, len(self.changed)))
+        return self
+
+    def _walk(self, path, previous, rel=None, rules=None):
+        # prunes ignored paths in the same way as utils.expand_tree().
+        if rules is None:
+            rel, rules = ignore.relative(path), ignore.rules_for(path)
+
+        fp = fingerprint(path)
+
+        old = previous.dirs.get(path)
+        if old is not None and old[0] == fp and cacheable(fp):
+            entries = old[1]
+        else:
+            entries = list(list_directory(path))
+
+        self.dirs[path] = (fp, entries)
+
+        if any(name == ignore.IGNORE_FILE for name, is_dir in entries):
+            rules = rules.child(os.path.join(path, ignore.IGNORE_FILE), rel)
+
+        for name, is_dir in entries:
+            child = _join(path, name)
+            child_rel = name if rel == os.curdir else os.path.join(rel, name)
+            if rules.ignored(child_rel, is_dir):
+                continue
+
+            try:
+                if is_dir:
+                    self._walk(child, previous, child_rel, rules)
+                else:
+                    self.files[child] = fingerprint(child)
+            except OSError:
+                # removed or unreadable since listing.
+                continue
+
+    def covers(self, path):
+        ":returns: ``True`` if the snapshot recorded ``path``."
+        path = os.path.normpath(path)
+        return path in self.files or path in self.dirs
+
+    def fingerprint(self, path):
+        ":returns: The recorded fingerprint of the file ``path``, or ``None``."
+        return self.files.get(os.path.normpath(path))
+
+    def stamps(self, path):
+        """
+        :param string path: A file or directory in the snapshot.
+
+        Yields a two-tuple of the path and fingerprint of ``path``, and, for
+        directories, of every directory and file beneath ``path``.
+        """
+        path = os.path.normpath(path)
+        if path in self.files:
+            yield path, self.files[path]
+        elif path in self.dirs:
+            fp, entries = self.dirs[path]
+            yield path, fp
+            for name, is_dir in entries:
+                for stamp in self.stamps(_join(path, name)):
+                    yield stamp
+
+    def expand(self, path, patterns=None):
+        """
+        :param string path: A directory in the snapshot.
+
+        :param list patterns: Optional. Glob patterns that file names must
+                              match.
+
+        Yields the recorded files beneath ``path``, recursively, joined to
+        ``path`` in the same way as :func:`python:os.walk()`.
+        """
+        fp, entries = self.dirs[os.path.normpath(path)]
+        for name, is_dir in entries:
+            child = os.path.join(path, name)
+            if is_dir:
+                if os.path.normpath(child) in self.dirs:
+                    for f in self.expand(child, patterns):
+                        yield f
+            elif match_any(name, patterns) and os.path.normpath(child) in self.files:
+                yield child
+
+    def count(self, path, recursive=False, patterns=None):
+        """
+        :param string path: A directory in the snapshot.
+
+        :returns: The number of entries in ``path``, with the same meaning as
+                  :func:`~utils.count_directory()`.
+        """
+        path = os.path.normpath(path)
+        n = 0
+        for name, is_dir in self.dirs[path][1]:
+            child = _join(path, name)
+            if is_dir and recursive and child in self.dirs:
+                n += self.count(child, recursive, patterns)
+            elif is_dir and recursive:
+                # an ignored directory, which the snapshot did not walk.
+                n += _count_listing(child, patterns)
+
+            if patterns is None or (not is_dir and match_any(name, patterns)):
+                n += 1
+
+        return n
@@ -0,0 +1,268 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`specs` reads test specifications. Parsing YAML dominates the start up
+time of large suites, so :mod:`specs`:
+
+- parses with PyYAML's ``CSafeLoader``, backed by ``libyaml``, when PyYAML
+  has it, and with the pure Python ``SafeLoader`` otherwise.
+
+- stores the documents of every specification in a :class:`~cache.DtfCache`,
+  keyed by the :func:`~cache.fingerprint()` of the file, serialized with
+  :mod:`python:marshal` where possible. Later runs load unchanged
+  specifications without parsing them.
+
+Specifications of at least :data:`STREAM_SIZE` bytes (e.g. bundles of
+thousands of small tests) bypass the cache: :func:`~specs.iter_spec()` parses
+them one document at a time, so that the runner receives each document as
+soon as it is parsed, and the whole file is never read or parsed at once.
+Parallel runs that stream tests to the pool (see :meth:`~dtf.stream_many()`)
+also drop each document once it runs; other runs keep every test in the
+runner's :attr:`~core.TestRunner.queue`.
+
+With more than one job, :func:`~specs.load_all()` loads specifications in a
+pool of processes, while the caller is still discovering them.
+
+Run with :option:`dtf --info` to log the hit rate of the cache.
+"""
+
+from __future__ import absolute_import
+
+import os
+import pickle
+import marshal
+import logging
+from threading import Lock
+from itertools import chain
+from multiprocessing import Pool, current_process
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+
+Loader = None
+"""The YAML loader class: ``CSafeLoader`` if available, or ``SafeLoader``. Set
+by :func:`~specs.loader()`, so that importing :mod:`specs` does not import
+:mod:`yaml`."""
+
+compiled = DtfCache('spec', max_entries=100000)
+"The :class:`~cache.DtfCache` that holds parsed test specifications."
+
+FORMAT = 1
+"Increment to invalidate all stored specifications when their meaning changes."
+
+STREAM_SIZE = 2**20
+"Specifications of at least this many bytes are parsed lazily and not cached."
+
+CHUNK_SIZE = 8
+"The number of specifications that :func:`~specs.load_all()` sends to a worker at once."
+
+POOL_FILES = 256
+"""With at least this many specifications, :func:`~specs.load_all()` parses
+in a pool of processes."""
+
+POOL_BYTES = 2**20
+"""With at least this many bytes of specifications, :func:`~specs.load_all()`
+parses in a pool of processes."""
+
+counts = { 'hits': 0, 'parsed': 0 }
+"The number of specifications loaded from the cache, and parsed, by this process."
+
+_lock = Lock()
+
+def loader():
+    ":returns: :data:`Loader`, importing :mod:`yaml` the first time."
+    global Loader
+    if Loader is None:
+        import yaml
+        Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return Loader
+
+def parse(f):
+    """
+    :param f: A file object or string with one or more YAML documents.
+
+    :returns: A list of the documents, parsed with :data:`Loader`.
+    """
+    import yaml
+    return list(yaml.load_all(f, Loader=loader()))
+
+def _dumps(docs):
+    # marshal is several times faster to load than pickle, but only handles
+    # builtin types: YAML timestamps and other values fall back to pickle.
+    try:
+        return 'marshal', marshal.dumps(docs)
+    except ValueError:
+        return 'pickle', pickle.dumps(docs, 2)
+
+def _loads(data):
+    kind, data = data
+    if kind == 'marshal':
+        return marshal.loads(data)
+    else:
+        return pickle.loads(data)
+
+def _count(key):
+    with _lock:
+        counts[key] += 1
+
+def load_spec(path):
+    """
+    :param string path: The path of a test specification.
+
+    :returns: A list of the documents in ``path``.
+
+    Returns new copies of the stored documents when the
+    :func:`~cache.fingerprint()` of ``path`` matches a previous run, so that
+    callers may modify them. Otherwise parses the file, and stores the
+    documents unless the file changed too recently to trust its fingerprint.
+
+    Always stats ``path``, rather than trusting the active
+    :class:`~snapshot.Snapshot`, which may predate an edit (e.g. in
+    :option:`dtf --watch`).
+    """
+    fp = fingerprint(path)
+    key = (FORMAT, os.path.abspath(path))
+
+    entry = compiled.get(key)
+    if entry is not None and entry[0] == fp:
+        try:
+            docs = _loads(entry[1])
+        except Exception as e:
+            logger.debug('cannot load stored specification {0}: {1}'.format(path, e))
+        else:
+            _count('hits')
+            return docs
+
+    with open(path) as f:
+        docs = parse(f)
+    _count('parsed')
+
+    if cacheable(fp) and fingerprint(path) == fp:
+        compiled.set(key, (fp, _dumps(docs)))
+
+    return docs
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _streamed(path):
+    return _size(path) >= STREAM_SIZE
+
+def iter_spec(path):
+    """
+    :param string path: The path of a test specification.
+
+    Yields the documents in ``path``. Specifications smaller than
+    :data:`STREAM_SIZE` come from :func:`~specs.load_spec()`; larger
+    specifications are parsed one document at a time, as the caller
+    consumes them.
+    """
+    if not _streamed(path):
+        for doc in load_spec(path):
+            yield doc
+        return
+
+    import yaml
+
+    _count('parsed')
+    with open(path) as f:
+        for doc in yaml.load_all(f, Loader=loader()):
+            yield doc
+
+def _load_counted(path):
+    # runs in worker processes, whose counts the parent cannot see. large
+    # specifications return no documents, for the parent to stream.
+    if _streamed(path):
+        return path, None, False
+
+    hits = counts['hits']
+    docs = load_spec(path)
+    return path, docs, counts['hits'] > hits
+
+def load_all(paths, jobs=1):
+    """
+    :param iterable paths: The paths of test specifications.
+
+    :param int jobs: Optional. The number of worker processes.
+
+    Yields a two-tuple of the path and an iterable of the documents of each
+    specification, in the order of ``paths``, as soon as each is loaded.
+    Consume the documents of each specification before the next.
+
+    With more than one job, a pool of processes loads the specifications,
+    and a thread feeds ``paths`` to the pool, so that a lazy ``paths`` (e.g.
+    from :func:`~utils.expand_tree()`) discovers specifications while the
+    workers parse them, and the caller receives the first specifications
+    before the last are found. Starting a pool costs more than parsing a
+    few small files, so :func:`~specs.load_all()` only starts the pool for
+    at least :data:`POOL_FILES` specifications or :data:`POOL_BYTES` bytes,
+    not counting the large specifications that the caller streams.
+    """
+    paths = iter(paths)
+    ahead = []
+    if jobs > 1 and not current_process().daemon:
+        size = 0
+        for path in paths:
+            ahead.append(path)
+            n = _size(path)
+            if n < STREAM_SIZE:
+                size += n
+            if len(ahead) >= POOL_FILES or size >= POOL_BYTES:
+                break
+        else:
+            jobs = 1
+
+    paths = chain(ahead, paths)
+    if jobs < 2 or current_process().daemon:
+        for path in paths:
+            yield path, iter_spec(path)
+        return
+
+    pool = Pool(jobs)
+    complete = False
+    try:
+        for path, docs, hit in pool.imap(_load_counted, paths, CHUNK_SIZE):
+            if docs is None:
+                yield path, iter_spec(path)
+            else:
+                _count('hits' if hit else 'parsed')
+                yield path, docs
+        complete = True
+    finally:
+        if complete:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+def stats():
+    """
+    :returns: A summary of the specifications loaded from the cache and
+              parsed. Does not import :mod:`yaml`: names the loader only if
+              this process parsed a specification.
+    """
+    total = counts['hits'] + counts['parsed']
+    rate = 100.0 * counts['hits'] / total if total else 0.0
+    msg = 'loaded {0} of {1} test specifications from the cache ({2:.1f}%), parsed {3}'.format(
+        counts['hits'], total, rate, counts['parsed'])
+
+    if Loader is None:
+        return msg + '.'
+    else:
+        return msg + ' with {0}.'.format(Loader.__name__)
@@ -17,14 +17,42 @@
 for core :mod:`dtf` operations and functions.
 """
 
+from __future__ import absolute_import
+
 import os
 import sys
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+from dtf.snapshot import list_directory, match_any
+from dtf import snapshot, ignore
 
-def get_name(test):
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+counts = DtfCache('count')
+"The :class:`~cache.DtfCache` that holds directory counts."
+
+def get_name(test, index=0):
     """
-    Returns the base name of a file without the file extension.
+    :param string test: The path of a file.
+
+    :param int index: Optional. The position of a document within a test
+                      specification that holds several documents.
+
+    Returns the base name of a file without the file extension. The second
+    and later documents of a specification are named for the file and the
+    position of the document, e.g. ``suite0:1``.
     """
-    return os.path.basename(test).split('.')[0]
+    name = os.path.basename(test).split('.')[0]
+    if index == 0:
+        return name
+    else:
+        return '{0}:{1}'.format(name, index)
 
 def get_module_path(path):
     """
@@ -41,27 +69,174 @@ def get_module_path(path):
     sys.path.append(r)
     return r
 
-def expand_tree(path, input_extension='yaml'):
+def expand_tree(path, input_extension='yaml', exclude=None, visited=None):
     """
     :param string path: A starting path to begin searching for files.
 
-    :param string input_extension: Optional. A filter.
+    :param input_extension: Optional. An extension (e.g. ``yaml``), a list of
+                            extensions, or ``None`` to include every file.
+
+    :param exclude: Optional. A :class:`~ignore.PathSet` of further paths to
+                    skip, and directories not to descend into.
 
-    :returns: A list of paths starting recursively from the ``path``
-              and only including those objects that end with the
-              ``input_extensions.``
+    :param list visited: Optional. A list to which to append every directory
+                         that :func:`~utils.expand_tree()` lists.
 
-    :meth:`expand_tree()` returns a list of paths, filtered to
+    Yields the paths of files beneath ``path``, recursively, that end with
+    one of the extensions, as it walks the tree. Skips, and does not descend
+    into, paths excluded by ``.dtfignore`` files and
+    :data:`~ignore.DEFAULT_PATTERNS` (e.g. ``.git/``). See :mod:`ignore`.
+
+    When the active :class:`~snapshot.Snapshot` covers ``path``, walks the
+    directory listings recorded in the snapshot rather than the file system,
+    and lists the directories that the snapshot did not record.
     """
 
-    file_list = []
-    for root, subFolders, files in os.walk(path):
-        for file in files:
-            f = os.path.join(root,file)
-            if f.rsplit('.', 1)[1] == input_extension:
-                file_list.append(f)
+    if input_extension is None:
+        suffixes = None
+    elif isinstance(input_extension, string_types):
+        suffixes = ('.' + input_extension,)
+    else:
+        suffixes = tuple('.' + ext for ext in input_extension)
+
+    if snapshot.current is not None and snapshot.current.covers(path):
+        recorded = snapshot.current.dirs
+        def listing(d):
+            # the snapshot may not have recorded every directory, e.g. one
+            # that it could not list: read those from the file system.
+            found = recorded.get(os.path.normpath(d))
+            if found is None:
+                return list(list_directory(d))
+            else:
+                return found[1]
+    else:
+        def listing(d):
+            return list(list_directory(d))
+
+    pending = [ (path, ignore.relative(path), ignore.rules_for(path)) ]
+    while pending:
+        directory, rel, rules = pending.pop()
+
+        try:
+            entries = listing(directory)
+            if visited is not None:
+                visited.append(directory)
+        except OSError as e:
+            logger.debug('cannot list {0}: {1}'.format(directory, e))
+            continue
+
+        if any(name == ignore.IGNORE_FILE for name, is_dir in entries):
+            ignore_file = os.path.join(directory, ignore.IGNORE_FILE)
+            rules = rules.child(ignore_file, rel)
+
+        subdirectories = []
+        for name, is_dir in entries:
+            child_rel = name if rel == os.curdir else os.path.join(rel, name)
+            if rules.ignored(child_rel, is_dir):
+                continue
+            elif exclude is not None and exclude.ignored(child_rel, is_dir):
+                continue
+
+            if is_dir:
+                child = os.path.join(directory, name)
+                subdirectories.append((child, child_rel, rules))
+            elif suffixes is None or name.endswith(suffixes):
+                yield os.path.join(directory, name)
+
+        pending.extend(reversed(subdirectories))
+
+def _count(path, recursive, patterns, stamps):
+    stamps.append((path, fingerprint(path)))
+
+    n = 0
+    for name, is_dir in list_directory(path):
+        if is_dir and recursive:
+            n += _count(os.path.join(path, name), recursive, patterns, stamps)
+
+        if patterns is None or (not is_dir and match_any(name, patterns)):
+            n += 1
+
+    return n
+
+def count_directory(path, recursive=False, extension=None, pattern=None):
+    """
+    :param string path: The path of a directory.
+
+    :param bool recursive: Optional. If ``True``, count the entries in all
+                           sub-directories as well.
+
+    :param extension: Optional. An extension, or a list of extensions. Only
+                      count files with these extensions.
+
+    :param pattern: Optional. A glob pattern, or a list of patterns. Only
+                    count files whose names match.
+
+    :returns: The number of entries in ``path``. Without filters, this
+              includes sub-directories, like ``len(os.listdir(path))``.
+
+    Streams the directory with :func:`python:os.scandir()`, keeping no names
+    in memory. Remembers each count in :data:`counts`, along with the
+    :func:`~cache.fingerprint()` of every directory it read, so that a count
+    of a directory tree that has not changed since the last run costs one
+    :func:`python:os.stat()` per directory. When the active
+    :class:`~snapshot.Snapshot` covers ``path``, counts the entries recorded
+    in the snapshot instead.
+    """
+    patterns = []
+    for value, template in ((extension, '*.{0}'), (pattern, '{0}')):
+        if value is None:
+            continue
+        elif isinstance(value, list):
+            patterns.extend(template.format(v) for v in value)
+        else:
+            patterns.append(template.format(value))
+
+    if patterns:
+        patterns = tuple(patterns)
+    else:
+        patterns = None
+
+    if snapshot.current is not None and os.path.normpath(path) in snapshot.current.dirs:
+        return snapshot.current.count(path, recursive, patterns)
+
+    key = (os.path.abspath(path), recursive, patterns)
+
+    cached = counts.get(key)
+    if cached is not None:
+        stamps, n = cached
+        try:
+            if all(fingerprint(d) == fp for d, fp in stamps):
+                logger.debug('using cached count of {0}'.format(path))
+                return n
+        except OSError:
+            pass
+
+    stamps = []
+    n = _count(path, recursive, patterns, stamps)
+
+    if all(cacheable(fp) for d, fp in stamps):
+        counts.set(key, (stamps, n))
+
+    return n
+
+def spec_inputs(test_spec):
+    """
+    :param dict test_spec: A test specification.
+
+    :returns: A list of the files and directories that ``test_spec`` names
+              as inputs: the values of top-level ``file`` and ``directory``
+              keys, and the ``path`` of any top-level mapping (e.g.
+              ``file0.path``.)
+    """
+    paths = []
+    for key, value in test_spec.items():
+        if isinstance(value, dict):
+            if isinstance(value.get('path'), string_types):
+                paths.append(value['path'])
+        elif key in ('file', 'directory') and isinstance(value, string_types):
+            paths.append(value)
 
-    return file_list
+    return paths
 
 def set_or_default(value, default):
     if value is None:
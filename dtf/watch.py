@@ -0,0 +1,245 @@
+# Copyright 2013 Sam Kleinman
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+:mod:`watch` implements :option:`dtf --watch`: after the first run, ``dtf``
+keeps its cases and test specifications loaded, waits for files to change,
+and re-runs only the tests whose inputs changed.
+
+Watchers only decide *when* to look for changes: either when ``inotify``
+reports an event (with the optional :mod:`inotify_simple` package), or after a
+fixed polling interval. Each time, a refreshed :class:`~snapshot.Snapshot`
+determines exactly which files changed.
+"""
+
+from __future__ import absolute_import
+
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+from dtf.err import DtfException, DtfMissingOptionalDependency
+from dtf.snapshot import Snapshot, activate
+from dtf.utils import spec_inputs, get_name
+
+class PollingWatcher(object):
+    """
+    :param float interval: The number of seconds to wait between checks.
+
+    Checks for changes at a fixed interval. Works on every platform and file
+    system.
+    """
+    def __init__(self, interval=1.0):
+        self.interval = interval
+
+    def watch(self, snapshot):
+        "Does nothing: polling needs no registration."
+        pass
+
+    def wait(self):
+        "Sleeps for :attr:`interval` seconds."
+        time.sleep(self.interval)
+
+class InotifyWatcher(PollingWatcher):
+    """
+    :param float interval: The number of seconds to wait, after the first
+                           event, for related events to arrive.
+
+    Uses :mod:`inotify_simple` to sleep until a watched directory
+    changes. Raises :exc:`~err.DtfMissingOptionalDependency` if
+    :mod:`inotify_simple` is not installed.
+    """
+
+    resync = 60
+    "Check for changes at least this often (seconds), even without events."
+
+    def __init__(self, interval=0.2):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            raise DtfMissingOptionalDependency('inotify_simple')
+
+        super(InotifyWatcher, self).__init__(interval)
+        self.inotify = INotify()
+        self.mask = (flags.CREATE | flags.DELETE | flags.MODIFY | flags.ATTRIB |
+                     flags.CLOSE_WRITE | flags.MOVED_FROM | flags.MOVED_TO |
+                     flags.DELETE_SELF | flags.MOVE_SELF)
+        self.watches = {}
+
+    def watch(self, snapshot):
+        """
+        :param snapshot: A :class:`~snapshot.Snapshot`.
+
+        Watches every directory in ``snapshot``, and the directory of every
+        file root.
+        """
+        paths = set(snapshot.dirs)
+        for root in snapshot.roots:
+            if root not in snapshot.dirs:
+                paths.add(os.path.dirname(root) or os.curdir)
+
+        for path in set(self.watches) - paths:
+            try:
+                self.inotify.rm_watch(self.watches.pop(path))
+            except OSError:
+                continue
+
+        for path in paths - set(self.watches):
+            try:
+                self.watches[path] = self.inotify.add_watch(path, self.mask)
+            except OSError as e:
+                logger.warning('cannot watch {0}: {1}'.format(path, e))
+
+    def wait(self):
+        "Blocks until an event arrives, and then until events stop arriving."
+        events = self.inotify.read(timeout=self.resync * 1000)
+        while events:
+            events = self.inotify.read(timeout=int(self.interval * 1000))
+
+def get_watcher(interval=1.0):
+    """
+    :returns: An :class:`~watch.InotifyWatcher` if :mod:`inotify_simple` is
+              available, otherwise a :class:`~watch.PollingWatcher`.
+    """
+    try:
+        return InotifyWatcher()
+    except (DtfMissingOptionalDependency, OSError) as e:
+        logger.info('using a polling watcher, inotify is unavailable: {0}'.format(e))
+        return PollingWatcher(interval)
+
+def _beneath(path, inputs):
+    for i in inputs:
+        if path == i or path.startswith(i.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+def affected_tests(queue, changed):
+    """
+    :param list queue: A :attr:`~core.TestRunner.queue`.
+
+    :param iterable changed: The paths of changed files.
+
+    :returns: The set of names of tests that name a changed file, or a
+              directory that contains a changed file, as an input.
+    """
+    changed = [ os.path.normpath(p) for p in changed ]
+
+    names = set()
+    for job in queue:
+        inputs = [ os.path.normpath(p) for p in spec_inputs(job[2]) ]
+        for path in changed:
+            if _beneath(path, inputs):
+                names.add(job[1])
+                break
+
+    return names
+
+def _reload(path, runner, definitions, spec_paths, case_dirs):
+    # returns the names of tests defined by the changed spec or case module.
+    if _beneath(path, spec_paths) and path.endswith('.yaml'):
+        return runner.reload(path)
+    elif _beneath(path, case_dirs) and path.endswith('.py') and os.path.exists(path):
+        case = get_name(path)
+        if case not in definitions.modules:
+            definitions._add(path, os.path.dirname(os.path.abspath(path)))
+
+        reloaded = definitions.reload(case)
+        return [ job[1] for job in runner.queue if job[0] in reloaded ]
+    else:
+        return []
+
+def watch(runner, definitions, case_paths, test_paths, results, interval=1.0, watcher=None):
+    """
+    :param runner: A :class:`~core.MultiTestRunner` that has run once.
+
+    :param definitions: The :class:`~core.CaseDefinition` used by ``runner``.
+
+    :param list case_paths: The directories that hold case modules.
+
+    :param list test_paths: The directories that hold test specifications.
+
+    :param results: The :class:`~results.DtfResults` object.
+
+    :param float interval: The polling interval, if ``inotify`` is not
+                           available.
+
+    :param watcher: Optional. A :class:`~watch.PollingWatcher`, or an object
+                    with the same methods. Defaults to the watcher returned
+                    by :func:`~watch.get_watcher()`.
+
+    Runs until interrupted. After each change, reloads changed test
+    specifications and case modules, and re-runs the tests that they define,
+    along with every test whose inputs changed.
+    """
+    if watcher is None:
+        watcher = get_watcher(interval)
+    spec_paths = [ os.path.normpath(p) for p in test_paths ]
+    case_dirs = [ os.path.normpath(p) for p in case_paths ]
+
+    def roots():
+        r = list(spec_paths) + list(case_dirs)
+        for job in runner.queue:
+            r.extend(spec_inputs(job[2]))
+        return r
+
+    current = Snapshot(roots()).refresh()
+    activate(current)
+    watcher.watch(current)
+
+    logger.info('watching {0} for changes.'.format(current))
+    print('[dtf]: watching for changes. Press Control-C to stop.')
+
+    try:
+        while True:
+            watcher.wait()
+
+            latest = Snapshot(roots()).refresh(previous=current)
+            if not latest.changed:
+                current = latest
+                continue
+
+            # reloading must see the new state of the changed files.
+            activate(latest)
+
+            names = set()
+            for path in sorted(latest.changed):
+                # files are often saved mid-edit: report errors and keep watching.
+                try:
+                    names.update(_reload(path, runner, definitions, spec_paths, case_dirs))
+                except Exception as e:
+                    print('[dtf]: cannot reload "{0}": {1}'.format(path, e))
+
+            names.update(affected_tests(runner.queue, latest.changed))
+            names = set(n for n in names if n in runner.test_specs)
+
+            # reloaded specs may name new inputs, which must be in the snapshot.
+            current = Snapshot(roots())
+            if current.roots == latest.roots:
+                current = latest
+            else:
+                current.refresh(previous=latest)
+            activate(current)
+            watcher.watch(current)
+
+            if names:
+                print('[dtf]: {0} changed files, re-running {1} tests.'.format(len(latest.changed), len(names)))
+                try:
+                    runner.select(names).run()
+                    results.render(names)
+                except DtfException as e:
+                    print(str(e))
+    except KeyboardInterrupt:
+        logger.info('stopped watching for changes.')
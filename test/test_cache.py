@@ -0,0 +1,112 @@
+import os
+import time
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf.cache import DtfCache, fingerprint, cacheable
+
+class TestDtfCache(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.c = DtfCache('test', path=self.root, max_entries=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_miss(self):
+        self.assertEqual(self.c.get(('a', 1)), None)
+        self.assertEqual(self.c.misses, 1)
+
+    def test_set_get(self):
+        self.c.set(('a', 1), 'value')
+        self.assertEqual(self.c.get(('a', 1)), 'value')
+
+    def test_persistent(self):
+        self.c.set(('a', 1), 'value')
+        c = DtfCache('test', path=self.root)
+        self.assertEqual(c.get(('a', 1)), 'value')
+
+    def test_namespaces(self):
+        self.c.set(('a', 1), 'value')
+        c = DtfCache('other', path=self.root)
+        self.assertEqual(c.get(('a', 1)), None)
+
+    def test_disabled(self):
+        self.c.enabled = False
+        self.c.set(('a', 1), 'value')
+        self.assertEqual(self.c.get(('a', 1)), None)
+        self.assertEqual(self.c.entries(), [])
+
+    def test_touch(self):
+        self.c.set(('a', 1), 'value')
+        entry = self.c._entry(('a', 1))
+
+        recent = int(time.time()) - 60
+        os.utime(entry, (recent, recent))
+        self.assertEqual(DtfCache('test', path=self.root).get(('a', 1)), 'value')
+        self.assertEqual(os.stat(entry).st_mtime, recent)
+
+        os.utime(entry, (0, 0))
+        self.assertEqual(DtfCache('test', path=self.root).get(('a', 1)), 'value')
+        self.assertTrue(os.stat(entry).st_mtime > recent)
+
+    def test_read_only(self):
+        self.c.set(('a', 1), 'value')
+        os.utime(self.c._entry(('a', 1)), (0, 0))
+
+        def utime(path, times):
+            raise OSError('read-only file system')
+
+        saved = os.utime
+        os.utime = utime
+        try:
+            c = DtfCache('test', path=self.root)
+            self.assertEqual(c.get(('a', 1)), 'value')
+            self.assertEqual(c.hits, 1)
+        finally:
+            os.utime = saved
+
+    def test_evict(self):
+        for i in range(20):
+            self.c.set(('a', i), i)
+        self.c.evict()
+        self.assertEqual(len(self.c.entries()), 9)
+
+    def test_clear(self):
+        self.c.set(('a', 1), 'value')
+        self.c.clear()
+        self.assertEqual(DtfCache('test', path=self.root).get(('a', 1)), None)
+
+class TestFingerprint(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, b'content')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_stable(self):
+        self.assertEqual(fingerprint(self.path), fingerprint(self.path))
+
+    def test_changed(self):
+        fp = fingerprint(self.path)
+        with open(self.path, 'ab') as f:
+            f.write(b'more')
+        self.assertNotEqual(fp, fingerprint(self.path))
+
+    def test_restored_mtime(self):
+        st = os.stat(self.path)
+        fp = fingerprint(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'CONTENT')
+        os.utime(self.path, (st.st_atime, st.st_mtime))
+        self.assertNotEqual(fp, fingerprint(self.path))
+
+    def test_recent_not_cacheable(self):
+        self.assertFalse(cacheable(fingerprint(self.path)))
+
+    def test_old_cacheable(self):
+        os.utime(self.path, (0, 0))
+        self.assertTrue(cacheable(fingerprint(self.path)))
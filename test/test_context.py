@@ -0,0 +1,48 @@
+import sys
+import logging
+import subprocess
+from unittest import TestCase
+
+from dtf import resultcache
+from dtf.context import RunContext
+from dtf.dtf import interface
+from dtf.results import results
+
+class TestRunContext(TestCase):
+    def setUp(self):
+        self.enabled = resultcache.stored.enabled
+        self.options = (results.verbose, results.fatal, results.passing, results.sync)
+
+    def tearDown(self):
+        resultcache.stored.enabled = self.enabled
+        results.verbose, results.fatal, results.passing, results.sync = self.options
+
+    def test_defaults(self):
+        c = RunContext()
+        self.assertEqual(c.casedirs, ['cases/'])
+        self.assertEqual(c.jobs, 2)
+        self.assertIsNone(c.changed_files())
+
+    def test_options(self):
+        self.assertTrue(RunContext(verbose=True).verbose)
+        self.assertRaises(TypeError, RunContext, colour=True)
+
+    def test_from_args(self):
+        c = RunContext.from_args(interface(['--multi', 'process', '-j', '4', '-t', 'a/', '-t', 'b/',
+                                            '--no-cache', '--info', '--changed', 'x.yaml']))
+        self.assertEqual((c.multi, c.jobs), ('process', 4))
+        self.assertEqual(c.testdirs, ['a/', 'b/'])
+        self.assertEqual(c.casedirs, ['cases/'])
+        self.assertEqual(c.log_level, logging.INFO)
+        self.assertEqual(c.changed_files(), ['x.yaml'])
+        self.assertFalse(c.cache)
+
+    def test_configure(self):
+        RunContext(verbose=True, multi='process', cache=False, log_level=logging.CRITICAL).configure()
+        self.assertTrue(results.verbose)
+        self.assertFalse(results.sync)
+        self.assertFalse(resultcache.stored.enabled)
+
+    def test_import(self):
+        code = 'import sys; sys.argv = ["dtf", "--bogus"]; import dtf.dtf; print(sorted(m for m in ("dtf.core", "dtf.multi", "yaml") if m in sys.modules))'
+        self.assertEqual(subprocess.check_output([sys.executable, '-c', code]).strip(), b'[]')
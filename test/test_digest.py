@@ -0,0 +1,115 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from unittest import TestCase
+
+from dtf import digest
+from dtf.cache import DtfCache
+
+class TestDigest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.digests = digest.digests
+        digest.digests = DtfCache('digest', path=self.root)
+        digest.table.clear()
+
+        self.paths = []
+        for i in range(4):
+            path = os.path.join(self.root, 'file{0}'.format(i))
+            with open(path, 'wb') as f:
+                f.write(b'content' * i)
+            os.utime(path, (0, 0))
+            self.paths.append(path)
+
+    def tearDown(self):
+        digest.digests = self.digests
+        digest.table.clear()
+        shutil.rmtree(self.root)
+
+    def test_file_digest(self):
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                self.assertEqual(digest.file_digest(path), hashlib.md5(f.read()).hexdigest())
+
+    def test_file_digest_cached(self):
+        expected = digest.file_digest(self.paths[1])
+        self.assertEqual(DtfCache('digest', path=self.root).get(('md5', digest.fingerprint(self.paths[1]))), expected)
+
+    def test_file_digest_invalidated(self):
+        expected = digest.file_digest(self.paths[1])
+        with open(self.paths[1], 'wb') as f:
+            f.write(b'changed')
+        self.assertNotEqual(digest.file_digest(self.paths[1]), expected)
+
+    def test_hashed_paths(self):
+        spec = { 'type': 'paired',
+                 'file0': { 'path': 'a', 'hash': 'x' },
+                 'file1': { 'path': 'b', 'hash': 'y' } }
+        self.assertEqual(sorted(digest.hashed_paths(spec)), [('a', 'md5', None), ('b', 'md5', None)])
+
+    def test_hashed_paths_change(self):
+        self.assertEqual(digest.hashed_paths({ 'file': 'a', 'hash': 'x' }), [('a', 'md5', None)])
+
+    def test_hashed_paths_none(self):
+        self.assertEqual(digest.hashed_paths({ 'file': 'a', 'max_length': 80 }), [])
+
+    def test_prefetch(self):
+        self.assertEqual(digest.prefetch([ (p, 'md5', None) for p in self.paths * 2 ], jobs=2), 4)
+        for path in self.paths:
+            self.assertEqual(digest.table[(path, 'md5', None)][1], digest.compute_digest(path))
+
+    def test_algorithm(self):
+        with open(self.paths[2], 'rb') as f:
+            expected = hashlib.sha256(f.read()).hexdigest()
+        self.assertEqual(digest.file_digest(self.paths[2], 'sha256'), expected)
+
+    def test_algorithm_cache_key(self):
+        self.assertNotEqual(digest.file_digest(self.paths[2], 'sha256'),
+                            digest.file_digest(self.paths[2], 'md5'))
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(digest.DtfException):
+            digest.new_hash('not-a-hash')
+
+    def test_hashed_paths_algorithm(self):
+        self.assertEqual(digest.hashed_paths({ 'file': 'a', 'hash': 'x', 'algorithm': 'blake2b' }),
+                         [('a', 'blake2b', None)])
+
+    def test_large_file(self):
+        path = os.path.join(self.root, 'large')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(100000))
+
+        large_file = digest.LARGE_FILE
+        digest.LARGE_FILE = 1024
+        try:
+            with open(path, 'rb') as f:
+                expected = hashlib.md5(f.read()).hexdigest()
+            for block_size in (1000, 4096, 2**20):
+                self.assertEqual(digest.compute_digest(path, block_size=block_size), expected)
+        finally:
+            digest.LARGE_FILE = large_file
+
+    def test_tree_digest(self):
+        path = os.path.join(self.root, 'tree')
+        data = os.urandom(10000)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        leaves = b''.join(hashlib.sha256(data[i:i+4096]).digest() for i in range(0, len(data), 4096))
+        expected = hashlib.sha256(leaves).hexdigest()
+
+        for threads in (1, 4):
+            self.assertEqual(digest.tree_digest(path, 'sha256', 4096, block_size=1000, threads=threads), expected)
+
+    def test_tree_digest_empty(self):
+        path = os.path.join(self.root, 'empty')
+        open(path, 'wb').close()
+        self.assertEqual(digest.tree_digest(path, 'md5', 4096),
+                         hashlib.md5(hashlib.md5(b'').digest()).hexdigest())
+
+    def test_digest_options(self):
+        self.assertEqual(digest.digest_options({}), ('md5', None))
+        self.assertEqual(digest.digest_options({ 'mode': 'tree', 'segment_size': 1024 }), ('md5', 1024))
+        self.assertEqual(digest.digest_options({ 'mode': 'tree' }), ('md5', digest.SEGMENT_SIZE))
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from dtf.gitdiff import parse_hunks, in_ranges
+
+DIFF = """diff --git a/docs/a.txt b/docs/a.txt
+index 1111111..2222222 100644
+--- a/docs/a.txt
++++ b/docs/a.txt
+@@ -3 +3 @@ heading
+-old
++new
+@@ -10,0 +11,3 @@ heading
++one
++two
++three
+@@ -20,2 +22,0 @@ heading
+-gone
+-gone
+diff --git a/docs/b.txt b/docs/b.txt
+deleted file mode 100644
+--- a/docs/b.txt
++++ /dev/null
+@@ -1,2 +0,0 @@
+-a
+-b
+"""
+
+class TestParseHunks(TestCase):
+    def setUp(self):
+        self.ranges = parse_hunks(DIFF)
+
+    def test_ranges(self):
+        self.assertEqual(self.ranges, { 'docs/a.txt': [(3, 3), (11, 13)] })
+
+    def test_in_ranges(self):
+        ranges = self.ranges['docs/a.txt']
+        self.assertEqual([ ln for ln in range(1, 16) if in_ranges(ln, ranges) ], [3, 11, 12, 13])
+
+    def test_untracked(self):
+        self.assertTrue(in_ranges(100, None))
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import history
+from dtf.cache import DtfCache
+
+def job(name, **spec):
+    return ('equality', name, spec)
+
+class TestHistory(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.durations = history.durations
+        history.durations = DtfCache('history', path=self.root)
+
+        self.big = os.path.join(self.root, 'big')
+        with open(self.big, 'wb') as f:
+            f.write(b'x' * 4096)
+
+    def tearDown(self):
+        history.durations = self.durations
+        shutil.rmtree(self.root)
+
+    def test_lpt(self):
+        queue = [ job('a'), job('b'), job('c'), job('d') ]
+        cost = { 'a': 1.0, 'b': 4.0, 'c': 2.0, 'd': 3.0 }
+        jobs, makespan = history.lpt(queue, 2, lambda j: cost[j[1]])
+
+        self.assertEqual([ j[1] for j in jobs ], ['b', 'd', 'c', 'a'])
+        self.assertEqual(makespan, 5.0)
+
+    def test_record(self):
+        history.record({ ('equality', 'a'): 2.0 })
+        history.record({ ('equality', 'a'): 4.0 })
+        self.assertEqual(history.durations.get(history._key((), 'equality', 'a')), 3.0)
+
+    def test_suites(self):
+        history.record({ ('equality', 'a'): 2.0 }, ('/one',))
+        history.record({ ('equality', 'a'): 8.0 }, ('/two',))
+        history.record({ ('change', 'a'): 16.0 }, ('/two',))
+
+        self.assertEqual(history.Estimator([ job('a') ], ('/one',)).cost(job('a')), 2.0)
+        self.assertEqual(history.Estimator([ job('a') ], ('/two',)).cost(job('a')), 8.0)
+
+    def test_estimate(self):
+        history.record({ ('equality', 'known'): 8.0, ('equality', 'sized'): 1.0 })
+        queue = [ job('known'), job('sized', file=self.big), job('new', file=self.big), job('empty') ]
+        estimator = history.Estimator(queue)
+
+        self.assertEqual(estimator.cost(queue[0]), 8.0)
+        self.assertEqual(estimator.rate, 4096.0)
+        self.assertEqual(estimator.cost(queue[2]), 1.0)
+        self.assertEqual(estimator.cost(queue[3]), estimator.base)
+
+    def test_timed(self):
+        name, seconds = history.timed(lambda name, spec: None, 'a', {})
+        self.assertEqual(name, 'a')
+        self.assertTrue(seconds >= 0)
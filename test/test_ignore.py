@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import utils
+from dtf.ignore import IgnoreRules, PathSet, translate
+
+class TestIgnoreRules(TestCase):
+    def test_translate(self):
+        self.assertEqual(translate('*.py'), '[^/]*\\.py')
+
+    def test_unanchored(self):
+        rules = IgnoreRules(['*.pyc'])
+        self.assertTrue(rules.ignored('a.pyc'))
+        self.assertTrue(rules.ignored('a/b/c.pyc'))
+        self.assertFalse(rules.ignored('a.py'))
+
+    def test_anchored(self):
+        rules = IgnoreRules(['/build', 'docs/*.txt'])
+        self.assertTrue(rules.ignored('build', is_dir=True))
+        self.assertFalse(rules.ignored('src/build', is_dir=True))
+        self.assertTrue(rules.ignored('docs/a.txt'))
+        self.assertFalse(rules.ignored('docs/sub/a.txt'))
+
+    def test_double_star(self):
+        rules = IgnoreRules(['**/fixtures', 'data/**'])
+        self.assertTrue(rules.ignored('fixtures', is_dir=True))
+        self.assertTrue(rules.ignored('a/b/fixtures', is_dir=True))
+        self.assertTrue(rules.ignored('data/x/y.yaml'))
+
+    def test_directory_only(self):
+        rules = IgnoreRules(['tmp/'])
+        self.assertTrue(rules.ignored('a/tmp', is_dir=True))
+        self.assertFalse(rules.ignored('a/tmp'))
+
+    def test_negation(self):
+        rules = IgnoreRules(['*.yaml', '!keep.yaml'])
+        self.assertTrue(rules.ignored('a.yaml'))
+        self.assertFalse(rules.ignored('sub/keep.yaml'))
+
+    def test_base(self):
+        rules = IgnoreRules()
+        rules.add('/a.yaml', 'sub')
+        self.assertTrue(rules.ignored('sub/a.yaml'))
+        self.assertFalse(rules.ignored('a.yaml'))
+
+    def test_comments(self):
+        rules = IgnoreRules(['# a.yaml', '', '\\#b.yaml'])
+        self.assertFalse(rules.ignored('a.yaml'))
+        self.assertTrue(rules.ignored('#b.yaml'))
+
+class TestPathSet(TestCase):
+    def test_exact(self):
+        paths = PathSet(['dtf/__init__.py', './a.py'])
+        self.assertTrue(paths.ignored('dtf/__init__.py'))
+        self.assertTrue(paths.ignored('a.py'))
+        self.assertFalse(paths.ignored('dtf/utils.py'))
+        self.assertIsNone(paths.regex)
+
+    def test_globs_and_directories(self):
+        paths = PathSet(['docs/*.txt', '**/build', 'vendor/'])
+        self.assertTrue(paths.ignored('docs/a.txt'))
+        self.assertFalse(paths.ignored('docs/sub/a.txt'))
+        self.assertTrue(paths.ignored('a/build/b.py'))
+        self.assertTrue(paths.ignored('vendor/lib/c.py'))
+        self.assertFalse(paths.ignored('vendored.py'))
+
+    def test_string(self):
+        self.assertFalse(PathSet('').ignored('a.py'))
+        self.assertTrue(PathSet('a.py').ignored('a.py'))
+
+class TestExpandTree(TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+
+        for d in ('tree/sub/skip', 'tree/.git', 'tree/build'):
+            os.makedirs(d)
+        for name in ('a.yaml', 'b.py', 'README', 'sub/c.yaml', 'sub/skip/d.yaml',
+                     '.git/e.yaml', 'build/f.yaml'):
+            open(os.path.join('tree', name), 'w').close()
+
+        with open('.dtfignore', 'w') as f:
+            f.write('/tree/build/\n')
+        with open('tree/sub/.dtfignore', 'w') as f:
+            f.write('skip/\n')
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root)
+
+    def test_pruned(self):
+        self.assertEqual(sorted(utils.expand_tree('tree')),
+                         [os.path.join('tree', 'a.yaml'), os.path.join('tree', 'sub', 'c.yaml')])
+
+    def test_nested_root(self):
+        self.assertEqual(list(utils.expand_tree('tree/sub')), [os.path.join('tree/sub', 'c.yaml')])
+
+    def test_extensions(self):
+        self.assertEqual(sorted(os.path.basename(f) for f in utils.expand_tree('tree', ['py', 'yaml'])),
+                         ['a.yaml', 'b.py', 'c.yaml'])
+
+    def test_no_extension(self):
+        self.assertIn(os.path.join('tree', 'README'), list(utils.expand_tree('tree', None)))
+        self.assertNotIn(os.path.join('tree', 'README'), list(utils.expand_tree('tree')))
+
+    def test_exclude(self):
+        exclude = PathSet(['tree/sub', 'tree/*.py'])
+        self.assertEqual(list(utils.expand_tree('tree', ['py', 'yaml'], exclude)),
+                         [os.path.join('tree', 'a.yaml')])
+
+    def test_lazy(self):
+        self.assertFalse(isinstance(utils.expand_tree('tree'), list))
@@ -0,0 +1,81 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import index
+from dtf.cache import DtfCache
+from dtf.index import DependencyIndex
+
+SPECS = { 'change0.yaml': 'type: change\nfile: {root}/docs/a.txt\n',
+          'paired0.yaml': 'type: paired\nfile0:\n  path: {root}/docs/a.txt\nfile1:\n  path: {root}/docs/b.txt\n',
+          'tree0.yaml': 'type: tree_line_length\ndirectory: {root}/docs/\n',
+          'equal0.yaml': 'type: equality\nvalue0: 1\nvalue1: 1\n',
+          'base0.yaml': 'type: index_base_case\n',
+          'sub0.yaml': 'type: index_sub_case\n' }
+
+CASES = { 'index_base_case.py': 'class Base(object):\n    pass\n\ndef main(name, spec):\n    pass\n',
+          'index_sub_case.py': 'from index_base_case import Base\n\nclass Sub(Base):\n    pass\n\ndef main(name, spec):\n    pass\n' }
+
+class TestDependencyIndex(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.indexes = index.indexes
+        index.indexes = DtfCache('index', path=os.path.join(self.root, 'cache'))
+
+        self.tests = os.path.join(self.root, 'tests')
+        self.cases = os.path.join(self.root, 'cases')
+        os.makedirs(os.path.join(self.root, 'docs', 'sub'))
+        os.makedirs(self.tests)
+        for name, spec in SPECS.items():
+            with open(os.path.join(self.tests, name), 'w') as f:
+                f.write(spec.format(root=self.root))
+
+        os.makedirs(self.cases)
+        for name, source in CASES.items():
+            with open(os.path.join(self.cases, name), 'w') as f:
+                f.write(source)
+
+        self.i = DependencyIndex([self.tests], [self.cases]).refresh()
+
+    def tearDown(self):
+        index.indexes = self.indexes
+        for name in CASES:
+            sys.modules.pop(name[:-3], None)
+        shutil.rmtree(self.root)
+
+    def names(self, *paths, **kwargs):
+        changed = [ os.path.join(self.root, p) for p in paths ]
+        return [ os.path.basename(s) for s in self.i.dependents(changed, kwargs.get('definitions')) ]
+
+    def test_file(self):
+        self.assertEqual(self.names('docs/b.txt'), ['paired0.yaml', 'tree0.yaml'])
+
+    def test_prefix(self):
+        self.assertEqual(self.names('docs/sub/c.txt'), ['tree0.yaml'])
+
+    def test_spec(self):
+        self.assertEqual(self.names('tests/equal0.yaml'), ['equal0.yaml'])
+
+    def test_case(self):
+        self.assertEqual(self.names('cases/paired.py'), ['paired0.yaml'])
+
+    def test_subclass_case(self):
+        sys.path.insert(0, self.cases)
+        try:
+            from index_base_case import main as base
+            from index_sub_case import main as sub
+        finally:
+            sys.path.remove(self.cases)
+
+        definitions = { 'index_base_case': base, 'index_sub_case': sub }
+        self.assertEqual(self.names('cases/index_base_case.py'), ['base0.yaml'])
+        self.assertEqual(self.names('cases/index_base_case.py', definitions=definitions), ['base0.yaml', 'sub0.yaml'])
+        self.assertEqual(self.names('cases/index_sub_case.py', definitions=definitions), ['sub0.yaml'])
+
+    def test_unrelated(self):
+        self.assertEqual(self.names('other.txt'), [])
+
+    def test_persistent(self):
+        self.assertEqual(len(index.indexes.get(self.i.key)), len(SPECS))
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import random
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import linelength, gitdiff
+from dtf.cache import DtfCache
+from dtf.linelength import long_lines, first_long_line, scan_files, segmented_long_lines, line_index, indexed_long_lines, \
+     changed_long_lines
+
+def reference(path, max_length):
+    with io.open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+
+    found = []
+    for ln, line in enumerate(text.split('\n'), 1):
+        if line.endswith('\r'):
+            line = line[:-1]
+        if len(line) > max_length:
+            found.append((ln, len(line)))
+    return found
+
+class TestLongLines(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.numpy = linelength.numpy
+
+    def tearDown(self):
+        linelength.numpy = self.numpy
+        os.remove(self.path)
+
+    def write(self, text):
+        with io.open(self.path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def compare(self, max_length=10):
+        expected = reference(self.path, max_length)
+        for numpy in (self.numpy, None):
+            linelength.numpy = numpy
+            for chunk_size in (1, 2, 3, 7, 64, 2**20):
+                self.assertEqual(list(long_lines(self.path, max_length, chunk_size)), expected)
+
+    def test_segments(self):
+        r = random.Random(7)
+        lines = [ u''.join(r.choice(u'abé☃\r') for i in range(r.randint(0, 30)))
+                  for j in range(300) ]
+        self.write(u'\n'.join(lines))
+
+        expected = list(long_lines(self.path, 12))
+        pool_bytes = linelength.POOL_BYTES
+        linelength.POOL_BYTES = 0
+        try:
+            for segment_size in (1, 5, 64, 1000, 2**20):
+                for jobs in (1, 2):
+                    self.assertEqual(list(segmented_long_lines(self.path, 12, segment_size, jobs, chunk_size=16)), expected)
+        finally:
+            linelength.POOL_BYTES = pool_bytes
+
+        self.assertEqual(first_long_line(self.path, 12, segment_size=100), expected[0][0])
+
+    def test_changed_lines(self):
+        self.write(u'\n'.join(u'x' * n for n in (20, 5, 20, 20, 5, 20)))
+        self.assertEqual(changed_long_lines(self.path, 10, [(2, 3), (6, 6)]), [(3, 20), (6, 20)])
+        self.assertEqual(changed_long_lines(self.path, 10, []), [])
+        self.assertEqual(len(changed_long_lines(self.path, 10, None)), 4)
+
+        self.assertEqual(list(long_lines(self.path, 10, chunk_size=8, until=3)), [(1, 20), (3, 20)])
+
+    def test_empty(self):
+        self.write(u'')
+        self.compare()
+
+    def test_exact_length(self):
+        self.write(u'a' * 10 + u'\n' + u'b' * 11 + u'\n')
+        self.assertEqual(first_long_line(self.path, 10), 2)
+        self.compare()
+
+    def test_no_trailing_newline(self):
+        self.write(u'short\n' + u'c' * 20)
+        self.compare()
+
+    def test_crlf(self):
+        self.write(u'a' * 10 + u'\r\n' + u'b' * 11 + u'\r\n\r\n')
+        self.compare()
+
+    def test_multibyte(self):
+        self.write(u'é' * 10 + u'\n' + u'☃' * 11 + u'\n' + u'x\n')
+        self.compare()
+
+    def test_random(self):
+        r = random.Random(42)
+        lines = [ u''.join(r.choice(u'abé☃\r') for i in range(r.randint(0, 25)))
+                  for j in range(500) ]
+        self.write(u'\n'.join(lines))
+        self.compare(max_length=12)
+
+class TestScanFiles(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(10):
+            path = os.path.join(self.root, '{0}.txt'.format(i))
+            with open(path, 'w') as f:
+                f.write('short\n' + 'long' * i + '\n')
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def expected(self):
+        return [ (path, 2, 4 * i) for i, path in enumerate(self.paths) if 4 * i > 10 ]
+
+    def test_serial(self):
+        self.assertEqual(scan_files(self.paths, 10, jobs=1), self.expected())
+
+    def test_pool(self):
+        pool_bytes = linelength.POOL_BYTES
+        linelength.POOL_BYTES = 0
+        try:
+            self.assertEqual(scan_files(iter(self.paths), 10, jobs=2), self.expected())
+        finally:
+            linelength.POOL_BYTES = pool_bytes
+
+    def test_small_work(self):
+        sizes = []
+
+        class FakePool(object):
+            # runs each item at once, and records the size of the pool.
+            def __init__(self, jobs):
+                sizes.append(jobs)
+
+            def apply_async(self, func, args):
+                result = func(*args)
+                return type('Result', (object,), { 'get': lambda self: result })()
+
+            close = terminate = join = lambda self: None
+
+        pool = linelength.Pool
+        linelength.Pool = FakePool
+        pool_bytes = linelength.POOL_BYTES
+        try:
+            self.assertEqual(scan_files(iter(self.paths), 10, jobs=4), self.expected())
+            self.assertEqual(sizes, [])
+
+            linelength.POOL_BYTES = 0
+            self.assertEqual(scan_files(self.paths[:2], 10, jobs=4), [])
+            self.assertEqual(sizes, [2])
+        finally:
+            linelength.Pool = pool
+            linelength.POOL_BYTES = pool_bytes
+
+class TestLineIndex(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.indexes = linelength.indexes
+        linelength.indexes = DtfCache('linelength', path=os.path.join(self.root, 'cache'))
+
+        self.path = os.path.join(self.root, 'a.txt')
+        with open(self.path, 'w') as f:
+            f.write('\n'.join('x' * n for n in (10, 100, 50, 90, 20)))
+        os.utime(self.path, (0, 0))
+
+    def tearDown(self):
+        linelength.indexes = self.indexes
+        shutil.rmtree(self.root)
+
+    def test_index(self):
+        floor, longest, lines, lengths = line_index(self.path, 80)
+        self.assertEqual((floor, longest, list(lines), list(lengths)), (72, 100, [2, 4], [100, 90]))
+
+    def test_thresholds(self):
+        line_index(self.path, 80)
+        self.assertEqual(indexed_long_lines(self.path, 95), [(2, 100)])
+        self.assertEqual(indexed_long_lines(self.path, 100), [])
+        self.assertEqual(linelength.indexes.writes, 1)
+
+    def test_lower_threshold(self):
+        line_index(self.path, 80)
+        self.assertEqual(indexed_long_lines(self.path, 40), [(2, 100), (3, 50), (4, 90)])
+        self.assertEqual(line_index(self.path, 80)[0], 40)
+
+    def test_changed(self):
+        line_index(self.path, 80)
+        with open(self.path, 'a') as f:
+            f.write('\n' + 'y' * 200)
+        os.utime(self.path, (1, 1))
+        self.assertEqual(first_long_line(self.path, 150), 6)
+
+class TestTreeLineLengthCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, 'a.py'), 'w') as f:
+            f.write('x' * 100 + '\n')
+
+        self.path = list(sys.path)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cases'))
+        import line_length, tree_line_length
+        self.case = tree_line_length.DtfTreeLineLength
+        self.file_case = line_length.DtfLineLength
+
+        self.base = 'base-with-no-changes'
+        gitdiff.hunks[self.base] = {}
+
+    def tearDown(self):
+        sys.path[:] = self.path
+        gitdiff.hunks.pop(self.base, None)
+        shutil.rmtree(self.root)
+
+    def spec(self, **kwargs):
+        spec = { 'name': 'tree', 'type': 'tree_line_length', 'directory': self.root,
+                 'extension': 'py', 'max_length': 80, 'exceptions': [] }
+        spec.update(kwargs)
+        return spec
+
+    def test_long_line(self):
+        self.assertFalse(self.case('tree', self.spec()).test()[0])
+
+    def test_base_without_changes(self):
+        self.assertTrue(self.case('tree', self.spec(base=self.base)).test()[0])
+        self.assertTrue(self.case('tree', self.spec(base=self.base, report='all')).test()[0])
+
+    def test_unknown_base(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            for kwargs in ({}, { 'report': 'all' }):
+                r, msg = self.case('tree', self.spec(base='no-such-revision', **kwargs)).test()
+                self.assertFalse(r)
+                self.assertIn('no-such-revision', msg)
+
+            r, msg = self.file_case('file', { 'name': 'file', 'file': 'a.py', 'max_length': 80,
+                                              'base': 'no-such-revision' }).test()
+            self.assertFalse(r)
+            self.assertIn('cannot run "git', msg)
+        finally:
+            os.chdir(cwd)
+            gitdiff.hunks.pop('no-such-revision', None)
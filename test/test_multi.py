@@ -0,0 +1,119 @@
+import time
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import history
+from dtf.cache import DtfCache
+from dtf.multi import FuturesTestRunner, ProcessTestRunner
+from dtf.results import results
+
+def passing(name, spec):
+    results.add(name, True, 'passed')
+
+def failing(name, spec):
+    raise ValueError('boom')
+
+def slow(name, spec):
+    time.sleep(spec['seconds'])
+    results.add(name, True, 'passed')
+
+class TestFuturesTestRunner(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.durations = history.durations
+        history.durations = DtfCache('history', path=self.root)
+        self.fatal = results.fatal
+        self.saved = dict(results.results)
+        results.results.clear()
+
+    def tearDown(self):
+        history.durations = self.durations
+        results.fatal = self.fatal
+        results.results.clear()
+        results.results.update(self.saved)
+        results.final.clear()
+        shutil.rmtree(self.root)
+
+    def runner(self, specs, timeout=None):
+        t = FuturesTestRunner([], 2, timeout)
+        t.definitions({ 'passing': passing, 'failing': failing, 'slow': slow })
+        for name, spec in specs:
+            t.test_specs[name] = spec
+            t._add_to_queue(name, spec['type'])
+        return t
+
+    def test_results(self):
+        t = self.runner([ ('a', { 'type': 'passing' }), ('b', { 'type': 'failing' }) ])
+        t.run()
+
+        self.assertTrue(results.results['a']['status'])
+        self.assertFalse(results.results['b']['status'])
+        self.assertEqual(results.results['b']['msg'], 'raised ValueError: boom')
+        self.assertEqual(sorted(t.durations), ['a', 'b'])
+        self.assertTrue(t.stats().startswith('ran 2 tests'))
+        self.assertIsNotNone(history.durations.get(history._key(t.suite, 'failing', 'b')))
+
+    def test_timeout(self):
+        t = self.runner([ ('a', { 'type': 'slow', 'seconds': 0.5, 'timeout': 0.1 }),
+                          ('b', { 'type': 'slow', 'seconds': 0.0 }) ], timeout=5)
+        t.run()
+
+        self.assertEqual(t.timed_out, [('a', 0.1)])
+        self.assertFalse(results.results['a']['status'])
+        self.assertTrue(results.results['b']['status'])
+
+    def test_timeout_final(self):
+        t = self.runner([ ('a', { 'type': 'slow', 'seconds': 0.3, 'timeout': 0.1 }) ])
+        t.run()
+        time.sleep(0.4)
+
+        self.assertFalse(results.results['a']['status'])
+        self.assertEqual(results.results['a']['msg'], 'timed out after 0.1s.')
+
+    def test_fatal(self):
+        results.fatal = True
+        t = self.runner([ ('a', { 'type': 'failing' }) ] +
+                        [ ('s{0}'.format(i), { 'type': 'slow', 'seconds': 0.05 }) for i in range(20) ])
+        t.run(iter(t.queue))
+
+        self.assertTrue(t.cancelled)
+        self.assertTrue(len(results.results) < 21)
+
+class TestProcessTestRunner(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.durations = history.durations
+        history.durations = DtfCache('history', path=self.root)
+        self.saved = dict(results.results)
+        results.results.clear()
+
+    def tearDown(self):
+        history.durations = self.durations
+        results.results.clear()
+        results.results.update(self.saved)
+        shutil.rmtree(self.root)
+
+    def test_results(self):
+        t = ProcessTestRunner([], 2)
+        t.definitions({ 'passing': passing })
+        for name in ('a', 'b'):
+            t.test_specs[name] = { 'type': 'passing' }
+            t._add_to_queue(name, 'passing')
+        t.run()
+
+        self.assertEqual(sorted(results.results), ['a', 'b'])
+        self.assertTrue(results.results['a']['status'])
+        self.assertEqual(sorted(t.durations), ['a', 'b'])
+
+    def test_failures(self):
+        t = ProcessTestRunner([], 2)
+        t.definitions({ 'passing': passing, 'failing': failing })
+        for name, spec in (('a', { 'type': 'failing' }), ('b', { 'type': 'passing', 'value': lambda: 0 })):
+            t.test_specs[name] = spec
+            t._add_to_queue(name, spec['type'])
+        t.run()
+
+        self.assertEqual(results.results['a'], { 'status': False, 'msg': 'raised ValueError: boom' })
+        self.assertFalse(results.results['b']['status'])
+        self.assertTrue(results.results['b']['msg'].startswith('raised '))
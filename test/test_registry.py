@@ -0,0 +1,85 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import registry
+from dtf.cache import DtfCache
+from dtf.core import MultiCaseDefinition
+
+class FakeEntryPoint(object):
+    def __init__(self, name, value, obj):
+        self.name = name
+        self.value = value
+        self.obj = obj
+
+    def load(self):
+        return self.obj
+
+def fake_case(name, test_spec):
+    return name
+
+class TestRegistry(TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp()
+        os.chdir(self.root)
+
+        self.registries = registry.registries
+        registry.registries = DtfCache('registry', path=os.path.join(self.root, 'cache'))
+
+        os.makedirs('lazycases/sub')
+        for name in ('lazy_case_a', 'lazy_case_b', 'sub/lazy_case_c'):
+            with open(os.path.join('lazycases', name + '.py'), 'w') as f:
+                f.write('def main(name, test_spec):\n    return name\n')
+        self.age()
+
+    def tearDown(self):
+        registry.registries = self.registries
+        os.chdir(self.cwd)
+        for name in ('lazy_case_a', 'lazy_case_b', 'lazy_case_c'):
+            sys.modules.pop(name, None)
+        sys.path[:] = [ p for p in sys.path if not p.startswith(self.root) ]
+        shutil.rmtree(self.root)
+
+    def age(self):
+        for d in ('lazycases', 'lazycases/sub'):
+            os.utime(d, (0, 0))
+
+    def test_discover(self):
+        self.assertEqual(sorted(registry.discover('lazycases')),
+                         [os.path.join('lazycases', 'lazy_case_a.py'), os.path.join('lazycases', 'lazy_case_b.py'),
+                          os.path.join('lazycases', 'sub', 'lazy_case_c.py')])
+
+    def test_stored(self):
+        registry.discover('lazycases')
+        hits = registry.registries.hits
+        self.assertEqual(len(registry.discover('lazycases')), 3)
+        self.assertEqual(registry.registries.hits, hits + 1)
+
+    def test_invalidated(self):
+        registry.discover('lazycases')
+        open('lazycases/sub/lazy_case_d.py', 'w').close()
+        self.assertEqual(len(registry.discover('lazycases')), 4)
+
+    def test_lazy(self):
+        dfn = MultiCaseDefinition(['lazycases'])
+        dfn.load()
+        self.assertNotIn('lazy_case_a', sys.modules)
+        self.assertTrue(dfn.cases)
+
+        self.assertIn('lazy_case_b', dfn.cases)
+        self.assertEqual(dfn.cases.get('lazy_case_b')('x', {}), 'x')
+        self.assertIn('lazy_case_b', sys.modules)
+        self.assertNotIn('lazy_case_a', sys.modules)
+        self.assertEqual(dfn.cases.modules, set(['lazy_case_a', 'lazy_case_b', 'lazy_case_c']))
+
+    def test_entry_points(self):
+        dfn = MultiCaseDefinition(['lazycases'])
+        dfn.load()
+        dfn.cases.entry_points = { 'fake': FakeEntryPoint('fake', 'test.test_registry:fake_case', fake_case) }
+
+        self.assertEqual(dfn.cases['fake'], fake_case)
+        self.assertIsNone(dfn.cases.get('missing'))
+        self.assertEqual(registry.entry_point_module(dfn.cases.entry_points['fake']), 'test.test_registry')
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import resultcache, snapshot, gitdiff
+from dtf.cache import DtfCache
+from dtf.results import DtfResults
+from dtf.resultcache import ResultCache
+from dtf.snapshot import Snapshot
+
+def main(name, test_spec):
+    pass
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.stored = resultcache.stored
+        resultcache.stored = DtfCache('result', path=os.path.join(self.root, 'cache'))
+
+        self.path = os.path.join(self.root, 'a.txt')
+        with open(self.path, 'w') as f:
+            f.write('a')
+        os.utime(self.path, (0, 0))
+        snapshot.activate(Snapshot([self.path]).refresh(previous=Snapshot()))
+
+        self.queue = [ ('case', 'pass0', { 'type': 'case', 'file': self.path }),
+                       ('case', 'fail0', { 'type': 'case', 'file': self.path }) ]
+
+        self.results = DtfResults(verbose=False, fatal=False, passing=False)
+        self.results.add('pass0', True, 'passed.')
+        self.results.add('fail0', False, 'failed.')
+
+        c = ResultCache({ 'case': main })
+        c.reuse(self.queue, DtfResults())
+        c.save(self.results)
+
+    def tearDown(self):
+        snapshot.activate(None)
+        resultcache.stored = self.stored
+        shutil.rmtree(self.root)
+
+    def test_reuse_passing(self):
+        results = DtfResults()
+        c = ResultCache({ 'case': main })
+        self.assertEqual(c.reuse(self.queue, results), set(['fail0']))
+        self.assertEqual(results.results['pass0']['msg'], 'passed.')
+        self.assertEqual((c.hits, c.misses), (1, 1))
+
+    def test_changed_spec(self):
+        self.queue[0][2]['other'] = 1
+        c = ResultCache({ 'case': main })
+        self.assertEqual(c.reuse(self.queue, DtfResults()), set(['pass0', 'fail0']))
+
+    def test_changed_input(self):
+        os.utime(self.path, (1, 1))
+        snapshot.activate(Snapshot([self.path]).refresh(previous=Snapshot()))
+        c = ResultCache({ 'case': main })
+        self.assertEqual(c.reuse(self.queue, DtfResults()), set(['pass0', 'fail0']))
+
+    def test_moved_base(self):
+        revisions = dict(gitdiff.revisions)
+        try:
+            gitdiff.revisions['base0'] = 'a' * 40
+            self.queue[0][2]['base'] = 'base0'
+            c = ResultCache({ 'case': main })
+            c.reuse(self.queue, DtfResults())
+            c.save(self.results)
+            self.assertEqual(ResultCache({ 'case': main }).reuse(self.queue, DtfResults()), set(['fail0']))
+
+            gitdiff.revisions['base0'] = 'b' * 40
+            self.assertEqual(ResultCache({ 'case': main }).reuse(self.queue, DtfResults()), set(['pass0', 'fail0']))
+        finally:
+            gitdiff.revisions.clear()
+            gitdiff.revisions.update(revisions)
+
+    def test_disabled(self):
+        resultcache.stored.enabled = False
+        c = ResultCache({ 'case': main })
+        self.assertEqual(c.reuse(self.queue, DtfResults()), set(['pass0', 'fail0']))
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from dtf.schema import Optional, Preflight, compile_schema, string
+from dtf.results import DtfResults
+
+paired = {
+    'name': string,
+    'count': int,
+    'file': { 'path': string, 'hash': string },
+    'exceptions': Optional((string, [string])),
+}
+
+def paired_case(name, test_spec):
+    pass
+
+paired_case.schema = paired
+
+def plain_case(name, test_spec):
+    pass
+
+def spec(**kwargs):
+    doc = { 'name': 'a', 'type': 'paired', 'count': 1, 'file': { 'path': 'a', 'hash': 'b' } }
+    doc.update(kwargs)
+    return doc
+
+class TestValidator(TestCase):
+    def setUp(self):
+        self.validator = compile_schema(paired)
+
+    def test_compiled_once(self):
+        self.assertIs(compile_schema(paired), self.validator)
+
+    def test_valid(self):
+        self.assertEqual(self.validator.errors(spec()), [])
+        self.assertEqual(self.validator.errors(spec(exceptions='')), [])
+        self.assertEqual(self.validator.errors(spec(exceptions=['a', 'b'])), [])
+
+    def test_nested(self):
+        self.assertEqual(self.validator.errors(spec(file={ 'path': 'a' })), ['missing key "file.hash"'])
+        self.assertEqual(self.validator.errors(spec(file='a')), ['"file" must be of type mapping'])
+
+    def test_types(self):
+        self.assertEqual(self.validator.errors(spec(count='ten', exceptions=[1])),
+                         ['"count" must be of type int', '"exceptions" must be of type list or string'])
+
+class TestPreflight(TestCase):
+    def setUp(self):
+        self.preflight = Preflight({ 'paired': paired_case, 'plain': plain_case })
+        self.queue = [ ('paired', 'good', spec()), ('paired', 'bad', spec(count=None)),
+                       ('plain', 'plain', {}), ('missing', 'missing', spec(type='missing')) ]
+
+    def test_check(self):
+        invalid = self.preflight.check(self.queue)
+        self.assertEqual(sorted(invalid), ['bad', 'missing'])
+        self.assertEqual(invalid['missing'], ['no case named "missing"'])
+
+    def test_filter(self):
+        results = DtfResults()
+        valid = list(self.preflight.filter(self.queue, results))
+        self.assertEqual([ job[1] for job in valid ], ['good', 'plain'])
+        self.assertFalse(results.results['bad']['status'])
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import snapshot, utils
+from dtf.cache import DtfCache
+from dtf.snapshot import Snapshot
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.snapshots = snapshot.snapshots
+        snapshot.snapshots = DtfCache('snapshot', path=os.path.join(self.root, 'cache'))
+
+        self.path = os.path.join(self.root, 'tree')
+        os.makedirs(os.path.join(self.path, 'sub'))
+        for name in ('a.txt', 'b.rst', 'sub/c.txt'):
+            with open(os.path.join(self.path, name), 'w') as f:
+                f.write(name)
+
+        self.s = Snapshot([self.path, os.path.join(self.path, 'a.txt')]).refresh()
+
+    def tearDown(self):
+        snapshot.activate(None)
+        snapshot.snapshots = self.snapshots
+        shutil.rmtree(self.root)
+
+    def test_roots(self):
+        self.assertEqual(self.s.roots, [self.path])
+
+    def test_files(self):
+        self.assertEqual(len(self.s.files), 3)
+        self.assertEqual(len(self.s.dirs), 2)
+
+    def test_expand(self):
+        self.assertEqual(sorted(self.s.expand(self.path, ['*.txt'])),
+                         [os.path.join(self.path, 'a.txt'), os.path.join(self.path, 'sub', 'c.txt')])
+
+    def test_count(self):
+        self.assertEqual(self.s.count(self.path), 3)
+        self.assertEqual(self.s.count(self.path, recursive=True, patterns=['*.txt']), 2)
+
+    def test_active(self):
+        snapshot.activate(self.s)
+        open(os.path.join(self.path, 'new.txt'), 'w').close()
+        self.assertEqual(len(list(utils.expand_tree(self.path, 'txt'))), 2)
+        self.assertEqual(utils.count_directory(self.path), 3)
+
+    def test_unrecorded_directory(self):
+        del self.s.dirs[os.path.join(self.path, 'sub')]
+        snapshot.activate(self.s)
+        self.assertEqual(sorted(utils.expand_tree(self.path, 'txt')),
+                         [os.path.join(self.path, 'a.txt'), os.path.join(self.path, 'sub', 'c.txt')])
+
+    def test_ignored(self):
+        os.makedirs(os.path.join(self.path, '.git', 'objects'))
+        os.makedirs(os.path.join(self.path, 'build'))
+        for name in ('.git/HEAD', '.git/objects/a.txt', 'build/d.txt', 'sub/e.tmp'):
+            open(os.path.join(self.path, name), 'w').close()
+        with open(os.path.join(self.path, '.dtfignore'), 'w') as f:
+            f.write('build/\n*.tmp\n')
+
+        expected = sorted(utils.expand_tree(self.path, None))
+        counts = [ utils.count_directory(self.path, recursive) for recursive in (False, True) ]
+
+        s = Snapshot([self.path]).refresh(previous=Snapshot())
+        self.assertNotIn(os.path.join(self.path, '.git'), s.dirs)
+        self.assertNotIn(os.path.join(self.path, '.git', 'HEAD'), s.files)
+        self.assertNotIn(os.path.join(self.path, 'build', 'd.txt'), s.files)
+        self.assertNotIn(os.path.join(self.path, 'sub', 'e.tmp'), s.files)
+        self.assertEqual(sorted(s.files), expected)
+
+        snapshot.activate(s)
+        self.assertEqual(sorted(utils.expand_tree(self.path, None)), expected)
+        self.assertEqual([ utils.count_directory(self.path, recursive) for recursive in (False, True) ], counts)
+
+    def test_refresh(self):
+        self.s.save()
+        with open(os.path.join(self.path, 'sub', 'c.txt'), 'a') as f:
+            f.write('changed')
+        open(os.path.join(self.path, 'new.txt'), 'w').close()
+
+        s = Snapshot([self.path]).refresh()
+        self.assertEqual(s.changed, set([os.path.join(self.path, 'new.txt'),
+                                         os.path.join(self.path, 'sub', 'c.txt')]))
+
+    def test_digests_kept(self):
+        a = os.path.join(self.path, 'a.txt')
+        c = os.path.join(self.path, 'sub', 'c.txt')
+        self.s.digests = { (a, 'md5', None): (self.s.files[a], 'x'),
+                           (c, 'md5', None): (self.s.files[c], 'y') }
+        self.s.save()
+        with open(c, 'a') as f:
+            f.write('changed')
+
+        s = Snapshot([self.path]).refresh()
+        self.assertEqual(list(s.digests), [(a, 'md5', None)])
@@ -0,0 +1,142 @@
+import os
+import sys
+import shutil
+import subprocess
+import datetime
+import tempfile
+from unittest import TestCase
+
+from dtf import specs
+from dtf.cache import DtfCache
+from dtf.core import SuiteTestRunner
+
+class TestLoadSpec(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.compiled = specs.compiled
+        specs.compiled = DtfCache('spec', path=self.root)
+        self.counts = dict(specs.counts)
+
+        self.path = os.path.join(self.root, 'test.yaml')
+        with open(self.path, 'w') as f:
+            f.write('name: a\ntype: equality\nwhen: 2013-01-01\n---\nname: b\ntype: equality\n')
+        os.utime(self.path, (0, 0))
+
+    def tearDown(self):
+        specs.compiled = self.compiled
+        specs.counts.update(self.counts)
+        shutil.rmtree(self.root)
+
+    def test_parse(self):
+        docs = specs.load_spec(self.path)
+        self.assertEqual([ d['name'] for d in docs ], ['a', 'b'])
+        self.assertEqual(docs[0]['when'], datetime.date(2013, 1, 1))
+
+    def test_cached(self):
+        specs.load_spec(self.path)
+        hits = specs.counts['hits']
+        self.assertEqual(specs.load_spec(self.path)[1], { 'name': 'b', 'type': 'equality' })
+        self.assertEqual(specs.counts['hits'], hits + 1)
+
+    def test_copies(self):
+        specs.load_spec(self.path)[1]['name'] = 'changed'
+        self.assertEqual(specs.load_spec(self.path)[1]['name'], 'b')
+
+    def test_marshal(self):
+        self.assertEqual(specs._dumps([{ 'a': 1 }])[0], 'marshal')
+        self.assertEqual(specs._loads(specs._dumps([{ 'a': 1 }])), [{ 'a': 1 }])
+
+    def test_changed(self):
+        specs.load_spec(self.path)
+        with open(self.path, 'w') as f:
+            f.write('name: c\ntype: equality\n')
+        os.utime(self.path, (1, 1))
+        self.assertEqual(specs.load_spec(self.path), [{ 'name': 'c', 'type': 'equality' }])
+
+
+    def test_load_all(self):
+        paths = []
+        for i in range(20):
+            path = os.path.join(self.root, 'test{0}.yaml'.format(i))
+            with open(path, 'w') as f:
+                f.write('name: t{0}\ntype: equality\n'.format(i))
+            paths.append(path)
+
+        serial = [ (p, list(docs)) for p, docs in specs.load_all(iter(paths)) ]
+        pool_files = specs.POOL_FILES
+        specs.POOL_FILES = 4
+        try:
+            self.assertEqual([ (p, list(docs)) for p, docs in specs.load_all(iter(paths), jobs=3) ], serial)
+        finally:
+            specs.POOL_FILES = pool_files
+        self.assertEqual([ p for p, docs in serial ], paths)
+        self.assertEqual(serial[4][1], [{ 'name': 't4', 'type': 'equality' }])
+
+    def test_load_few(self):
+        started = []
+        def pool(jobs):
+            started.append(jobs)
+            raise AssertionError('started a pool for {0} jobs'.format(jobs))
+
+        real_pool = specs.Pool
+        specs.Pool = pool
+        try:
+            loaded = [ (p, list(docs)) for p, docs in specs.load_all(iter([self.path]), jobs=3) ]
+        finally:
+            specs.Pool = real_pool
+
+        self.assertEqual(started, [])
+        self.assertEqual(loaded[0][0], self.path)
+
+    def test_stream(self):
+        stream_size = specs.STREAM_SIZE
+        specs.STREAM_SIZE = 0
+        try:
+            docs = specs.iter_spec(self.path)
+            self.assertEqual(next(docs)['name'], 'a')
+            self.assertEqual(next(docs)['name'], 'b')
+            self.assertEqual(specs.compiled.get((specs.FORMAT, os.path.abspath(self.path))), None)
+        finally:
+            specs.STREAM_SIZE = stream_size
+
+    def test_hit_without_yaml(self):
+        code = ('import sys; from dtf import cache, specs; cache.CACHE_DIR = sys.argv[1]; '
+                'specs.load_spec(sys.argv[2]); specs.stats(); print("yaml" in sys.modules)')
+        cachedir = os.path.join(self.root, 'cache')
+        run = lambda: subprocess.check_output([sys.executable, '-c', code, cachedir, self.path]).strip()
+
+        self.assertEqual(run(), b'True')
+        self.assertEqual(run(), b'False')
+
+class TestBundles(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'bundle.yaml')
+        with open(self.path, 'w') as f:
+            f.write('value: 0\ntype: equality\n---\nvalue: 1\ntype: equality\n---\nvalue: 2\ntype: equality\n')
+
+        self.runner = SuiteTestRunner([self.root])
+        self.runner.load()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_identity(self):
+        self.assertEqual(sorted(self.runner.test_specs), ['bundle', 'bundle:1', 'bundle:2'])
+        self.assertEqual([ (job[1], job[2]['value']) for job in self.runner.queue ],
+                         [('bundle', 0), ('bundle:1', 1), ('bundle:2', 2)])
+
+    def test_reload(self):
+        with open(self.path, 'w') as f:
+            f.write('value: 3\ntype: equality\n')
+
+        self.assertEqual(self.runner.reload(self.path), ['bundle', 'bundle:1', 'bundle:2'])
+        self.assertEqual(list(self.runner.test_specs), ['bundle'])
+        self.assertEqual(len(self.runner.queue), 1)
+
+    def test_stream_without_keeping(self):
+        runner = SuiteTestRunner([self.root])
+        jobs = runner.iter_load(keep=False)
+        self.assertEqual(next(jobs)[1], 'bundle')
+        self.assertEqual([ job[1] for job in jobs ], ['bundle:1', 'bundle:2'])
+        self.assertEqual((runner.test_specs, runner.queue), ({}, []))
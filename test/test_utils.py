@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf import utils
+from dtf.cache import DtfCache
+
+class TestCountDirectory(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.counts = utils.counts
+        utils.counts = DtfCache('count', path=os.path.join(self.root, 'cache'))
+
+        self.path = os.path.join(self.root, 'tree')
+        os.makedirs(os.path.join(self.path, 'sub'))
+        for name in ('a.txt', 'b.rst', 'sub/c.txt', 'sub/d.txt'):
+            open(os.path.join(self.path, name), 'w').close()
+
+    def tearDown(self):
+        utils.counts = self.counts
+        shutil.rmtree(self.root)
+
+    def age(self):
+        for d in (self.path, os.path.join(self.path, 'sub')):
+            os.utime(d, (0, 0))
+
+    def test_count(self):
+        self.assertEqual(utils.count_directory(self.path), len(os.listdir(self.path)))
+
+    def test_recursive(self):
+        self.assertEqual(utils.count_directory(self.path, recursive=True), 5)
+
+    def test_extension(self):
+        self.assertEqual(utils.count_directory(self.path, extension='txt'), 1)
+        self.assertEqual(utils.count_directory(self.path, recursive=True, extension=['txt', 'rst']), 4)
+
+    def test_pattern(self):
+        self.assertEqual(utils.count_directory(self.path, recursive=True, pattern='[cd].*'), 2)
+
+    def test_cached(self):
+        self.age()
+        self.assertEqual(utils.count_directory(self.path, recursive=True), 5)
+        self.assertEqual(len(utils.counts.entries()), 1)
+        self.assertEqual(utils.count_directory(self.path, recursive=True), 5)
+
+    def test_invalidated(self):
+        self.age()
+        self.assertEqual(utils.count_directory(self.path, recursive=True), 5)
+        open(os.path.join(self.path, 'sub', 'e.txt'), 'w').close()
+        self.assertEqual(utils.count_directory(self.path, recursive=True), 6)
@@ -0,0 +1,99 @@
+import io
+import os
+import hashlib
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+from dtf.core import MultiCaseDefinition, SuiteTestRunner
+from dtf.results import results
+from dtf import snapshot
+from dtf.watch import affected_tests, watch, PollingWatcher
+
+class TestAffectedTests(TestCase):
+    def setUp(self):
+        self.queue = [ ('change', 'change0', { 'file': 'tests/test0.yaml' }),
+                       ('directory_paired', 'dirhash0', { 'directory': 'cases/',
+                                                          'file': { 'path': 'tests/test0.yaml' } }),
+                       ('equality', 'test0', { 'value0': 1, 'value1': 1 }) ]
+
+    def test_file(self):
+        self.assertEqual(affected_tests(self.queue, ['tests/test0.yaml']),
+                         set(['change0', 'dirhash0']))
+
+    def test_directory(self):
+        self.assertEqual(affected_tests(self.queue, ['cases/new.py']), set(['dirhash0']))
+
+    def test_unrelated(self):
+        self.assertEqual(affected_tests(self.queue, ['tests/test1.yaml']), set())
+
+class FakeWatcher(PollingWatcher):
+    # applies one edit per wait, and stops watching after the last.
+    def __init__(self, edits):
+        self.edits = list(edits)
+
+    def wait(self):
+        if not self.edits:
+            raise KeyboardInterrupt
+        self.edits.pop(0)()
+
+class TestWatch(TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.path = list(sys.path)
+        self.saved = dict(results.results)
+        self.root = tempfile.mkdtemp()
+
+        shutil.copytree(os.path.join(self.cwd, 'cases'), os.path.join(self.root, 'cases'))
+        os.chdir(self.root)
+        os.mkdir('tests')
+        self.write('tests/t.yaml', 'name: t\ntype: equality\nvalue0: 1\nvalue1: 0\n', 0)
+
+    def tearDown(self):
+        snapshot.activate(None)
+        os.chdir(self.cwd)
+        sys.path[:] = self.path
+        results.results.clear()
+        results.results.update(self.saved)
+        shutil.rmtree(self.root)
+
+    def write(self, path, text, mtime):
+        with open(path, 'w') as f:
+            f.write(text)
+        os.utime(path, (mtime, mtime))
+
+    def run_watch(self, edits):
+        dfn = MultiCaseDefinition(['cases'])
+        dfn.load()
+        runner = SuiteTestRunner(['tests'])
+        runner.load()
+        runner.definitions(dfn.cases)
+
+        stdout = sys.stdout
+        sys.stdout = io.StringIO() if sys.version_info >= (3,) else io.BytesIO()
+        try:
+            runner.run()
+            first = dict((k, v['status']) for k, v in results.results.items())
+            watch(runner, dfn, ['cases'], ['tests'], results, watcher=FakeWatcher(edits))
+        finally:
+            sys.stdout = stdout
+
+        return first, dict((k, v['status']) for k, v in results.results.items())
+
+    def test_edited_spec(self):
+        edit = lambda: self.write('tests/t.yaml', 'name: t\ntype: equality\nvalue0: 1\nvalue1: 1\n', 10)
+        first, last = self.run_watch([edit])
+
+        self.assertFalse(first['t'])
+        self.assertTrue(last['t'])
+
+    def test_edited_input(self):
+        self.write('input.txt', 'a', 0)
+        self.write('tests/c.yaml', 'name: c\ntype: change\nfile: input.txt\nhash: {0}\n'.format(hashlib.md5(b'a').hexdigest()), 0)
+        edit = lambda: self.write('input.txt', 'b', 10)
+        first, last = self.run_watch([edit])
+
+        self.assertTrue(first['c'])
+        self.assertFalse(last['c'])
+        self.assertFalse(last['t'])